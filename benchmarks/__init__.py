@@ -0,0 +1,5 @@
+"""Performance benchmarks for the cs143sim package
+
+Each module is a script, run from the repository root as e.g.
+``python -m benchmarks.buffer``.
+"""
@@ -0,0 +1,111 @@
+"""Micro-benchmark of :class:`~cs143sim.actors.Buffer` throughput
+
+Runs a case once to record the sequence of buffer operations it produces,
+then replays that sequence against the former :class:`Queue.Queue` storage
+and against the current :class:`~cs143sim.actors.Buffer`, reporting packets
+per second for each.
+
+Usage: ``python -m benchmarks.buffer -c 2 20 -d 20``
+
+.. moduleauthor:: Jan Van Bruggen <jancvanbruggen@gmail.com>
+"""
+from Queue import Queue
+from timeit import default_timer
+
+from cs143sim.actors import Buffer
+from cs143sim.simulation import Controller
+
+
+class QueueBuffer(Buffer):
+    """:class:`~cs143sim.actors.Buffer` as it was before it dropped the
+    thread-locked :class:`Queue.Queue`, kept for comparison
+    """
+    def __init__(self, env, capacity, link):
+        super(QueueBuffer, self).__init__(env=env, capacity=capacity, link=link)
+        self.packets = Queue()
+
+    def add(self, packet):
+        if self.current_level + packet.size <= self.capacity:
+            self.packets.put(packet)
+            self.current_level = self.current_level + packet.size
+            self.env.controller.record_buffer_occupancy(link=self.link,
+                                                        buffer_occupancy=self.current_level)
+            return True
+        else:
+            self.env.controller.record_packet_loss(link=self.link)
+            self.env.controller.record_buffer_occupancy(link=self.link,
+                                                        buffer_occupancy=self.current_level)
+            return False
+
+    def get(self):
+        packet = self.packets.get()
+        self.current_level = self.current_level - packet.size
+        self.env.controller.record_buffer_occupancy(link=self.link,
+                                                    buffer_occupancy=self.current_level)
+        return packet
+
+
+def record_operations(case, duration):
+    """Run `case` and return the buffer operations it performed
+
+    :param str case: path to simulation input file
+    :param float duration: simulation duration, in ms
+    :return: list of (link name, packet) tuples, where packet is `None` for
+        a `get`
+    """
+    controller = Controller(case=case)
+    operations = []
+    for link in controller.links.values():
+        buffer_ = link.buffer
+
+        def add(packet, add=buffer_.add, name=link.name):
+            operations.append((name, packet))
+            return add(packet)
+
+        def get(get=buffer_.get, name=link.name):
+            operations.append((name, None))
+            return get()
+
+        buffer_.add = add
+        buffer_.get = get
+    controller.run(until=duration)
+    return operations
+
+
+def replay(buffer_class, case, operations):
+    """Replay `operations` on fresh buffers of type `buffer_class`
+
+    :return: packets added per second of wall time
+    """
+    controller = Controller(case=case)
+    buffers = {name: buffer_class(env=controller.env, capacity=link.buffer.capacity, link=link)
+               for name, link in controller.links.items()}
+    adds = sum(1 for _, packet in operations if packet is not None)
+    start = default_timer()
+    for name, packet in operations:
+        if packet is None:
+            buffers[name].get()
+        else:
+            buffers[name].add(packet)
+    return adds / (default_timer() - start)
+
+
+def run():
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument('-c', '--cases', dest='cases', nargs='+', default=['2', '20'],
+                        help='simulation case numbers')
+    parser.add_argument('-d', '--duration', dest='duration', type=float, default=20,
+                        help='simulation duration in seconds')
+    arguments = parser.parse_args()
+    for case in arguments.cases:
+        case_path = 'cs143sim/cases/case' + case + '.txt'
+        operations = record_operations(case_path, arguments.duration * 1000)
+        before = replay(QueueBuffer, case_path, operations)
+        after = replay(Buffer, case_path, operations)
+        print('Case %s: %d operations, Queue.Queue %.0f packets/s, Buffer %.0f packets/s (%.2fx)'
+              % (case, len(operations), before, after, after / before))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,73 @@
+"""Benchmark of the event kernels
+
+Runs every bundled case on the SimPy kernel and on the native kernel of
+:mod:`cs143sim.kernel`, reporting the events processed per second of wall
+time for each.
+
+Usage: ``python -m benchmarks.kernel -d 20``
+
+.. moduleauthor:: Jan Van Bruggen <jancvanbruggen@gmail.com>
+"""
+import glob
+import os
+from timeit import default_timer
+
+from cs143sim.constants import KERNEL_NATIVE
+from cs143sim.constants import KERNEL_SIMPY
+from cs143sim.simulation import Controller
+
+
+def bundled_cases():
+    """Case numbers of the bundled input files, in numeric order"""
+    names = [os.path.basename(path)[len('case'):-len('.txt')]
+             for path in glob.glob('cs143sim/cases/case*.txt')]
+    return sorted((name for name in names if name.isdigit()), key=int)
+
+
+def events_per_second(case, duration, kernel):
+    """Run `case` on `kernel` and measure its event throughput
+
+    :param str case: path to simulation input file
+    :param float duration: simulation duration, in ms
+    :param str kernel: event kernel of the :class:`~cs143sim.simulation.Controller`
+    :return: (events processed, events per second) tuple
+    """
+    controller = Controller(case=case, kernel=kernel)
+    env = controller.env
+    start = default_timer()
+    controller.run(until=duration)
+    elapsed = default_timer() - start
+    if kernel == KERNEL_NATIVE:
+        scheduled = next(env._sequence)
+    else:
+        # SimPy also schedules the event that stops the run
+        scheduled = next(env._eid) - 1
+    events = scheduled - len(env._queue)
+    return events, events / elapsed
+
+
+def run():
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument('-c', '--cases', dest='cases', nargs='+', default=bundled_cases(),
+                        help='simulation case numbers')
+    parser.add_argument('-d', '--duration', dest='duration', type=float, default=20,
+                        help='simulation duration in seconds')
+    parser.add_argument('-r', '--repeat', dest='repeat', type=int, default=3,
+                        help='runs per case and kernel, of which the fastest counts')
+    arguments = parser.parse_args()
+    for case in arguments.cases:
+        case_path = 'cs143sim/cases/case' + case + '.txt'
+        rates = {}
+        for kernel in (KERNEL_SIMPY, KERNEL_NATIVE):
+            runs = [events_per_second(case_path, arguments.duration * 1000, kernel)
+                    for _ in range(arguments.repeat)]
+            events = runs[0][0]
+            rates[kernel] = max(rate for _, rate in runs)
+        print('Case %s: %d events, SimPy %.0f events/s, native %.0f events/s (%.2fx)'
+              % (case, events, rates[KERNEL_SIMPY], rates[KERNEL_NATIVE],
+                 rates[KERNEL_NATIVE] / rates[KERNEL_SIMPY]))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,211 @@
+"""Scaling benchmark suite with regression tracking
+
+``run`` simulates the bundled cases and synthetic chains of increasing size
+from :func:`cs143sim.generator.chain`, each in a fresh worker process, and
+records per run the events processed per second of wall time, the simulated
+seconds per second of wall time, the peak resident memory of the worker and
+the telemetry records kept. Results are
+stored in a JSON file under the commit they were measured at, as given by
+``git rev-parse HEAD``.
+
+``compare`` lists the change of every measurement between two commits and
+flags those that got worse by more than a threshold: a lower rate, or more
+memory or telemetry. It exits with status 1 if any did.
+
+Usage: ``python -m benchmarks.suite run -d 10`` and
+``python -m benchmarks.suite compare <base commit> [<commit>]``
+
+.. moduleauthor:: Jan Van Bruggen <jancvanbruggen@gmail.com>
+"""
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+from multiprocessing import Pool
+from timeit import default_timer
+
+from cs143sim.constants import KERNEL_DEFAULT
+from cs143sim.constants import KERNEL_NATIVE
+from cs143sim.generator import chain
+from cs143sim.simulation import Controller
+from cs143sim.telemetry import FLOW_METRICS
+from cs143sim.telemetry import LINK_METRICS
+
+
+BUNDLED_CASES = ('0', '1', '2', '3', '11', '20')
+"""Bundled case numbers the suite runs"""
+
+CHAIN_SIZES = (4, 16, 32)
+"""Numbers of routers of the synthetic chains the suite runs"""
+
+MEASUREMENTS = (('events_per_second', 1), ('simulated_per_wall_second', 1),
+                ('peak_rss_kb', -1), ('telemetry_records', -1))
+"""Measurements of every run, with 1 if higher is better or -1 if lower is"""
+
+
+def benchmark_cases(directory, chain_sizes=CHAIN_SIZES):
+    """Names and input files of the runs of the suite
+
+    :param str directory: directory to write the synthetic input files to
+    :param chain_sizes: numbers of routers of the synthetic chains
+    :return: list of (name, path) tuples
+    """
+    cases = [('case' + case, 'cs143sim/cases/case' + case + '.txt') for case in BUNDLED_CASES]
+    for size in chain_sizes:
+        path = os.path.join(directory, 'chain%d.txt' % size)
+        chain(size=size).write(path)
+        cases.append(('chain%d' % size, path))
+    return cases
+
+
+def measure(job):
+    """Simulate one case and measure it; runs in a fresh worker process
+
+    :param tuple job: case path, duration in ms and kernel
+    :return: dict of :data:`MEASUREMENTS`
+    """
+    case, duration, kernel = job
+    controller = Controller(case=case, kernel=kernel)
+    env = controller.env
+    start = default_timer()
+    controller.run(until=duration)
+    elapsed = default_timer() - start
+    if kernel == KERNEL_NATIVE:
+        scheduled = next(env._sequence)
+    else:
+        # SimPy also schedules the event that stops the run
+        scheduled = next(env._eid) - 1
+    records = sum(len(probe.series) for metric in LINK_METRICS + FLOW_METRICS
+                  for probe in getattr(controller.telemetry, metric).values())
+    return {'events_per_second': (scheduled - len(env._queue)) / elapsed,
+            'simulated_per_wall_second': duration / 1000 / elapsed,
+            'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            'telemetry_records': records}
+
+
+def run_suite(duration, kernel=KERNEL_DEFAULT, repeat=3, chain_sizes=CHAIN_SIZES):
+    """Measure every run of the suite
+
+    Rates are the best of `repeat` runs and sizes the smallest.
+
+    :param float duration: simulation duration, in ms
+    :param str kernel: event kernel of the
+        :class:`~cs143sim.simulation.Controller`
+    :param int repeat: runs per case
+    :param chain_sizes: numbers of routers of the synthetic chains
+    :return: dict of measurements by case name
+    """
+    directory = tempfile.mkdtemp()
+    pool = Pool(processes=1, maxtasksperchild=1)
+    try:
+        results = {}
+        for name, path in benchmark_cases(directory, chain_sizes):
+            runs = [pool.apply(measure, [(path, duration, kernel)]) for _ in range(repeat)]
+            results[name] = dict((measurement, max(run[measurement] for run in runs) if better > 0
+                                  else min(run[measurement] for run in runs))
+                                 for measurement, better in MEASUREMENTS)
+            print('%-8s %10.0f events/s %8.2f sim s/s %8d KB %9d records'
+                  % (name, results[name]['events_per_second'],
+                     results[name]['simulated_per_wall_second'],
+                     results[name]['peak_rss_kb'], results[name]['telemetry_records']))
+    finally:
+        pool.close()
+        pool.join()
+        shutil.rmtree(directory)
+    return results
+
+
+def current_commit():
+    """Commit the working tree is at"""
+    return subprocess.check_output(['git', 'rev-parse', 'HEAD']).strip()
+
+
+def load_results(path):
+    """Stored results by commit, or an empty dict if there are none yet"""
+    if not os.path.isfile(path):
+        return {}
+    with open(path) as results_file:
+        return json.load(results_file)
+
+
+def case_order(name):
+    """Sort key of a case name, by prefix and then by number"""
+    prefix = name.rstrip('0123456789')
+    return prefix, int(name[len(prefix):] or 0)
+
+
+def compare(base, head, threshold):
+    """Relative change of every measurement between two sets of results
+
+    :param dict base: measurements by case name of the earlier commit
+    :param dict head: measurements by case name of the later commit
+    :param float threshold: relative change beyond which a change for the
+        worse is a regression
+    :return: list of (case, measurement, base value, head value, relative
+        change, whether it regressed) tuples, for the cases in both
+    """
+    rows = []
+    for case in sorted(set(base) & set(head), key=case_order):
+        for measurement, better in MEASUREMENTS:
+            before = base[case].get(measurement)
+            after = head[case].get(measurement)
+            if before is None or after is None:
+                continue
+            change = (after - before) / float(before) if before else 0.0
+            rows.append((case, measurement, before, after, change, -better * change > threshold))
+    return rows
+
+
+def run():
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument('-r', '--results', dest='results', default='benchmarks/results.json',
+                        help='JSON file of results by commit')
+    commands = parser.add_subparsers(dest='command')
+    run_parser = commands.add_parser('run', help='measure the suite at the current commit')
+    run_parser.add_argument('-d', '--duration', dest='duration', type=float, default=10,
+                            help='simulation duration in seconds')
+    run_parser.add_argument('-k', '--kernel', dest='kernel', default=KERNEL_DEFAULT,
+                            help='event kernel')
+    run_parser.add_argument('-n', '--repeat', dest='repeat', type=int, default=3,
+                            help='runs per case')
+    run_parser.add_argument('-s', '--sizes', dest='sizes', type=int, nargs='+',
+                            default=list(CHAIN_SIZES), help='routers of the synthetic chains')
+    run_parser.add_argument('-l', '--label', dest='label',
+                            help='key to store the results under instead of the commit')
+    compare_parser = commands.add_parser('compare', help='compare the results of two commits')
+    compare_parser.add_argument('base', help='commit to compare against')
+    compare_parser.add_argument('head', nargs='?', help='commit to compare; defaults to the '
+                                                       'current commit')
+    compare_parser.add_argument('-t', '--threshold', dest='threshold', type=float, default=0.1,
+                                help='relative change for the worse flagged as a regression')
+    arguments = parser.parse_args()
+    stored = load_results(arguments.results)
+    if arguments.command == 'run':
+        key = arguments.label or current_commit()
+        stored[key] = run_suite(arguments.duration * 1000, kernel=arguments.kernel,
+                                repeat=arguments.repeat, chain_sizes=arguments.sizes)
+        with open(arguments.results, 'w') as results_file:
+            json.dump(stored, results_file, indent=1, sort_keys=True)
+        print('Stored under ' + key)
+        return
+    head = arguments.head or current_commit()
+    for commit in (arguments.base, head):
+        if commit not in stored:
+            sys.exit('No results for ' + commit + ' in ' + arguments.results)
+    regressions = 0
+    for case, measurement, before, after, change, regressed in compare(
+            stored[arguments.base], stored[head], arguments.threshold):
+        regressions += regressed
+        print('%-8s %-26s %12.1f %12.1f %+7.1f%%%s'
+              % (case, measurement, before, after, change * 100,
+                 '  REGRESSION' if regressed else ''))
+    if regressions:
+        sys.exit('%d regressions beyond %.0f%%' % (regressions, arguments.threshold * 100))
+
+
+if __name__ == '__main__':
+    run()
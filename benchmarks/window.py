@@ -0,0 +1,73 @@
+"""Micro-benchmark of the cost of one cumulative acknowledgement
+
+Keeps a window of packets in flight and acknowledges them one at a time,
+sending a new packet after each acknowledgement, on the former list of
+numbers and on :class:`~cs143sim.tla.SendWindow`. Reports the time per
+acknowledgement at each window size.
+
+Usage: ``python -m benchmarks.window -w 10 100 1000``
+
+.. moduleauthor:: Jan Van Bruggen <jancvanbruggen@gmail.com>
+"""
+from timeit import default_timer
+
+from cs143sim.tla import SendWindow
+
+
+def list_ack(sending, n):
+    """Acknowledge `n` on a list of numbers, as the TLAs did before
+    :class:`~cs143sim.tla.SendWindow`
+
+    :return: whether the first number in flight was acknowledged
+    """
+    del_list = list()
+    for x in sending:
+        if x < n:
+            del_list.append(x)
+    first_acked = sending[0] in del_list
+    for x in del_list:
+        sending.remove(x)
+    return first_acked
+
+
+def window_ack(sending, n):
+    """Acknowledge `n` on a :class:`~cs143sim.tla.SendWindow`
+
+    :return: whether the first number in flight was acknowledged
+    """
+    return sending.retire(n) > 0
+
+
+def seconds_per_ack(sending, ack, window_size, acks):
+    """Time `acks` acknowledgements at a constant window of `window_size`
+
+    :param sending: empty list or :class:`~cs143sim.tla.SendWindow`
+    :param ack: :func:`list_ack` or :func:`window_ack`
+    :return: mean seconds per acknowledgement
+    """
+    for number in range(window_size):
+        sending.append(number)
+    start = default_timer()
+    for number in xrange(window_size, window_size + acks):
+        ack(sending, number - window_size + 1)
+        sending.append(number)
+    return (default_timer() - start) / acks
+
+
+def run():
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument('-w', '--windows', dest='windows', type=int, nargs='+',
+                        default=[10, 100, 1000], help='window sizes, in packets')
+    parser.add_argument('-a', '--acks', dest='acks', type=int, default=10000,
+                        help='acknowledgements per measurement')
+    arguments = parser.parse_args()
+    for window_size in arguments.windows:
+        before = seconds_per_ack([], list_ack, window_size, arguments.acks)
+        after = seconds_per_ack(SendWindow(), window_ack, window_size, arguments.acks)
+        print('Window %d: list %.2f us/ack, SendWindow %.2f us/ack (%.1fx)'
+              % (window_size, before * 1e6, after * 1e6, before / after))
+
+
+if __name__ == '__main__':
+    run()
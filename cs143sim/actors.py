@@ -15,16 +15,25 @@
 .. moduleauthor:: Lan Hongjian <lanhongjianlr@gmail.com>
 .. moduleauthor:: Samuel Richerd <dondiego152@gmail.com>
 """
-from Queue import Queue
+from collections import OrderedDict
+from collections import deque
 
 from cs143sim.constants import ACK_PACKET_SIZE
+from cs143sim.constants import BUFFER_DEFAULT_POLICY
+from cs143sim.constants import BUFFER_DROP_FRONT
+from cs143sim.constants import BUFFER_DROP_TAIL
+from cs143sim.constants import BUFFER_PER_CLASS
 from cs143sim.constants import GENERATE_ROUTER_PACKET_DEFAULT_INTERVAL
 from cs143sim.constants import PACKET_SIZE, DYNAMIC_ROUTE_DISTANCE_METRIC
+from cs143sim.constants import ROUTING_FULL_REFRESH_INTERVAL
 from cs143sim.events import LinkAvailable
 from cs143sim.events import PacketReceipt
 from cs143sim.events import RoutingTableOutdated
+from cs143sim.events import TrainReceipt
 from cs143sim.packets import DataPacket
 from cs143sim.packets import RouterPacket
+from cs143sim.routing import ArrayRoutingTable
+from cs143sim.routing import RoutingTable
 from cs143sim.tla import TCPTahoe
 from cs143sim.tla import TCPVegas
 
@@ -48,51 +57,120 @@ class Buffer(Actor):
     """Representation of a data storage container
 
     Buffers store data to be linked while :class:`.Link` is busy sending data.
+    The simulation is single-threaded, so packets are kept in plain
+    :class:`~collections.deque` objects rather than locked queues.
 
     :param int capacity: maximum number of bits that can be stored
     :param link: :class:`.Link` containing this buffer
+    :param str policy: drop policy, one of
+        :data:`~cs143sim.constants.BUFFER_DROP_TAIL`,
+        :data:`~cs143sim.constants.BUFFER_DROP_FRONT` or
+        :data:`~cs143sim.constants.BUFFER_PER_CLASS`
     :ivar int capacity: maximum number of bits that can be stored
     :ivar link: :class:`.Link` containing this buffer
-    :ivar list packets: :class:`Packets <.Packet>` currently in storage
+    :ivar str policy: drop policy
+    :ivar tuple queues: :class:`Packets <.Packet>` currently in storage, one
+        FIFO per packet class in the order they are served
     :ivar int current_level: the current occupancy of the buffer
     """
-    def __init__(self, env, capacity, link):
+    def __init__(self, env, capacity, link, policy=BUFFER_DEFAULT_POLICY):
         super(Buffer, self).__init__(env=env)
         self.link = link
-        self.packets = Queue()
         self.capacity = capacity
         self.current_level = 0
+        self.policy = policy
+        if policy == BUFFER_PER_CLASS:
+            self.queues = (deque(), deque(), deque())
+        elif policy in (BUFFER_DROP_TAIL, BUFFER_DROP_FRONT):
+            self.queues = (deque(),)
+        else:
+            raise ValueError('Unknown buffer policy: ' + repr(policy))
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def classify(self, packet):
+        """Index of the queue in `queues` that stores `packet`
+
+        :param packet: :class:`.Packet` to classify
+        """
+        if self.policy != BUFFER_PER_CLASS:
+            return 0
+        if isinstance(packet, RouterPacket):
+            return 0
+        if packet.acknowledgement:
+            return 1
+        return 2
 
     def add(self, packet):
-        """Adds packet to `packets` if `capacity` will not be exceeded,
+        """Adds packet to `queues` if `capacity` will not be exceeded,
         drops packet if buffer if full.
 
+        With the drop-front policy, the oldest stored packets are dropped
+        instead until the new packet fits.
+
         :param packet: :class:`.Packet` added to buffer.
+        :return: whether `packet` was stored
         """
+        if (self.policy == BUFFER_DROP_FRONT and packet.size <= self.capacity and
+                self.current_level + packet.size > self.capacity):
+            queue = self.queues[0]
+            while self.current_level + packet.size > self.capacity:
+                dropped_packet = queue.popleft()
+                self.length -= 1
+                self.current_level = self.current_level - dropped_packet.size
+                self.drop(dropped_packet)
         if self.current_level + packet.size <= self.capacity:
-            self.packets.put(packet)
+            self.queues[self.classify(packet)].append(packet)
+            self.length += 1
             self.current_level = self.current_level + packet.size
             self.env.controller.record_buffer_occupancy(link=self.link,
                                                         buffer_occupancy=self.current_level)
             return True
         else:
             # The packet cannot be stored, so the packet is dropped
-            self.env.controller.record_packet_loss(link=self.link)
+            self.drop(packet)
             self.env.controller.record_buffer_occupancy(link=self.link,
                                                         buffer_occupancy=self.current_level)
             return False
-                    
-    def get(self, timeout=None):
+
+    def drop(self, packet):
+        """Record the loss of `packet`, and return it to the
+        :class:`.PacketPool` if there is one, since nothing refers to it any
+        more
+        """
+        self.env.controller.record_packet_loss(link=self.link)
+        packet_pool = self.env.controller.packet_pool
+        if packet_pool is not None and isinstance(packet, DataPacket):
+            packet_pool.release(packet)
+
+    def get(self):
         """Link get a packet from its buffer.
-        
-        :param timeout
+
+        Raises :class:`IndexError` if the buffer is empty.
         """
-        packet = self.packets.get(timeout=timeout)
+        for queue in self.queues:
+            if queue:
+                packet = queue.popleft()
+                break
+        else:
+            raise IndexError('get from an empty buffer')
+        self.length -= 1
         self.current_level = self.current_level - packet.size
         self.env.controller.record_buffer_occupancy(link=self.link,
                                                     buffer_occupancy=self.current_level)
         return packet
 
+    def peek(self):
+        """The packet `get` would return next, or `None` if the buffer is
+        empty
+        """
+        for queue in self.queues:
+            if queue:
+                return queue[0]
+        return None
+
 
 class Flow(Actor):
     """Representation of a connection between access points
@@ -103,18 +181,29 @@ class Flow(Actor):
     :param destination: destination :class:`.Host`
     :param float amount: amount of data to transmit
     :param int algorithm: indicate which tla this flow is using
+    :param packet_pool: :class:`.PacketPool` to make packets from, or `None`
+        to allocate every packet
+    :param float start_time: time the flow starts sending
     :ivar source: source :class:`.Host`
     :ivar destination: destination :class:`.Host`
     :ivar float amount: amount of data to transmit
+    :ivar float start_time: time the flow starts sending
     :ivar int algorithm: indicate which tla this flow is using
+    :ivar packet_pool: :class:`.PacketPool` to make packets from, or `None`
     :ivar rcv_expect_to_receive: next packet expect to receive
-    :ivar rcv_received_packets:  list of packets that have been received, but not what we need now.
+    :ivar set rcv_received_packets: numbers of the packets received ahead of
+        `rcv_expect_to_receive`, each discarded once the packets before it
+        arrive
     """
-    def __init__(self, env, name, source, destination, amount, algorithm=0):
+    def __init__(self, env, name, source, destination, amount, algorithm=0, packet_pool=None,
+                 start_time=0):
         super(Flow, self).__init__(env=env, name=name)
         self.source = source
         self.destination = destination
         self.amount = amount
+        self.start_time = start_time
+        self.algorithm = algorithm
+        self.packet_pool = packet_pool
         if algorithm == 0:
             self.tla = TCPTahoe(env=self.env, flow=self)
             self.tla.enable_fast_recovery = False
@@ -135,7 +224,7 @@ class Flow(Actor):
             self.tla.enable_fast = True
         
         self.rcv_expect_to_receive = 0
-        self.rcv_received_packets = list()
+        self.rcv_received_packets = set()
 
     def __str__(self):
         return ('Flow from ' + self.source.address +
@@ -145,10 +234,15 @@ class Flow(Actor):
         """
         Make a packet based on the packet number
         """
-
+        if self.packet_pool is not None:
+            return self.packet_pool.data_packet(number=packet_number, acknowledgement=False,
+                                                timestamp=self.env.now, source=self.source,
+                                                destination=self.destination, size=PACKET_SIZE,
+                                                flow_id=self.name)
         packet = DataPacket(number=packet_number,
                             acknowledgement=False, timestamp=self.env.now,
-                            source=self.source, destination=self.destination)
+                            source=self.source, destination=self.destination,
+                            flow_id=self.name)
         packet.size = PACKET_SIZE
         return packet
         
@@ -162,24 +256,27 @@ class Flow(Actor):
             pass
         elif n == self.rcv_expect_to_receive:
             # This packet is what we expect to receive
-            # Find out next packet expect to receive
+            # Find out next packet expect to receive, past any stored run
             self.rcv_expect_to_receive += 1
-            flag = True
-            while flag:
-                for x in self.rcv_received_packets:
-                    if x == self.rcv_expect_to_receive:
-                        self.rcv_expect_to_receive += 1
-                        continue
-                flag = False
+            while self.rcv_expect_to_receive in self.rcv_received_packets:
+                self.rcv_received_packets.remove(self.rcv_expect_to_receive)
+                self.rcv_expect_to_receive += 1
         else:
             # This packet is not what we expect to receive
             # Store it
-            self.rcv_received_packets.append(n)
+            self.rcv_received_packets.add(n)
         # using the timestamp of packet to be acked as the timestamp of ack packet
         # to calculate RTT
+        if self.packet_pool is not None:
+            return self.packet_pool.data_packet(number=self.rcv_expect_to_receive,
+                                                acknowledgement=True, timestamp=packet.timestamp,
+                                                source=packet.destination,
+                                                destination=packet.source, size=ACK_PACKET_SIZE,
+                                                flow_id=self.name)
         ack_packet = DataPacket(number=self.rcv_expect_to_receive,
                                 acknowledgement=True, timestamp=packet.timestamp,
-                                source=packet.destination, destination=packet.source)
+                                source=packet.destination, destination=packet.source,
+                                flow_id=self.name)
         ack_packet.size = ACK_PACKET_SIZE
         return ack_packet
 
@@ -221,19 +318,59 @@ class Host(Actor):
     :class:`.Router` or to another :class:`.Host`.
 
     :param str address: IP address
+    :param packet_pool: :class:`.PacketPool` to release delivered packets to,
+        or `None`
     :ivar str address: IP address
     :ivar list flows: :class:`Flows <.Flow>` on this :class:`.Host`
+    :ivar dict flow_index: :class:`Flows <.Flow>` on this :class:`.Host` by
+        (peer :class:`.Host`, whether the flow receives acknowledgements here,
+        flow name), which is what an arriving packet is matched on
     :ivar link: :class:`Link` connected to this :class:`.Host`
+    :ivar packet_pool: :class:`.PacketPool` to release delivered packets to,
+        or `None`
     """
-    def __init__(self, env, name, address):
+    def __init__(self, env, name, address, packet_pool=None):
         super(Host, self).__init__(env=env, name=name)
         self.address = address
+        self.packet_pool = packet_pool
         self.flows = []
+        self.flow_index = {}
         self.link = None
 
     def __str__(self):
         return 'Host at ' + self.address
 
+    def flow_keys(self, flow):
+        """Keys of `flow` in :attr:`flow_index`
+
+        A flow is received here as data at its destination and as
+        acknowledgements at its source.
+        """
+        keys = []
+        if flow.source is self:
+            keys.append((flow.destination, True, flow.name))
+        if flow.destination is self:
+            keys.append((flow.source, False, flow.name))
+        return keys
+
+    def add_flow(self, flow):
+        """Deliver the packets of `flow` that arrive at this :class:`.Host`
+
+        :param flow: :class:`.Flow` from or to this :class:`.Host`
+        """
+        self.flows.append(flow)
+        for key in self.flow_keys(flow):
+            self.flow_index[key] = flow
+
+    def remove_flow(self, flow):
+        """Stop delivering the packets of a retired `flow`
+
+        :param flow: :class:`.Flow` added with :meth:`add_flow`
+        """
+        self.flows.remove(flow)
+        for key in self.flow_keys(flow):
+            del self.flow_index[key]
+
     def send(self, packet):
         self.link.add(packet)
 
@@ -241,13 +378,13 @@ class Host(Actor):
         packet = event.value
         if packet.destination == self:
             if isinstance(packet, DataPacket):
-                for f in self.flows:
-                    if packet.acknowledgement:
-                        if packet.source == f.destination and packet.destination == f.source:
-                            f.react_to_packet_receipt(event=event)
-                    else:
-                        if packet.source == f.source and packet.destination == f.destination:
-                            f.react_to_packet_receipt(event=event)
+                flow = self.flow_index.get((packet.source, bool(packet.acknowledgement),
+                                            packet.flow_id))
+                if flow is not None:
+                    flow.react_to_packet_receipt(event=event)
+                if self.packet_pool is not None:
+                    # The flow has consumed the packet
+                    self.packet_pool.release(packet)
 
 
 class Link(Actor):
@@ -255,27 +392,59 @@ class Link(Actor):
 
     Links carry packets from one end to the other.
 
+    A link sends one packet at a time and every packet takes the same delay
+    to cross it, so packets arrive in the order they were sent. Packets on
+    the way are kept in `in_flight` and only the first arrival is scheduled,
+    rather than one :class:`.PacketReceipt` per packet. Likewise
+    :class:`.LinkAvailable` is only scheduled when packets wait in the
+    buffer, to send the next one as soon as the link is free. Under load
+    that is still one event per packet taken from the buffer (see
+    :meth:`react_to_link_available`).
+
+    With a `train_length` over 1, a link into a :class:`.Router` delivers
+    the packets of the same flow sent right behind the first arrival along
+    with it, up to `train_length` in all, as one packet train (see
+    :meth:`pop_train`). Each packet of a train carries the time it would
+    arrive on its own, and the router forwards it as of that time, by
+    sending it with :meth:`add` at that time. Trains only go on while the
+    router would forward every packet at once on arrival, so each is sent
+    at the time it would be on its own, and the records are the same as
+    without trains. :class:`Hosts <.Host>`, and so flows and their TLAs,
+    always receive packets one at a time.
+
     :param source: source :class:`.Host` or :class:`.Router`
     :param destination: destination :class:`.Host` or :class:`.Router`
     :param float delay: amount of time required to transmit a :class:`.Packet`
     :param float rate: speed of removing data from source
     :param int buffer_capacity: :class:`.Buffer` capacity in bits
+    :param str buffer_policy: :class:`.Buffer` drop policy
+    :param int train_length: largest number of packets delivered together
     :ivar source: source :class:`.Host` or :class:`.Router`
     :ivar destination: destination :class:`.Host` or :class:`.Router`
     :ivar float delay: amount of time required to transmit a :class:`.Packet`
     :ivar float rate: speed of removing data from source
-    :ivar list buffer: :class:`Packets <.Packet>` currently in transmission
-    :ivar bool busy: whether currently removing data from source
+    :ivar buffer: :class:`.Buffer` holding packets waiting to be sent
+    :ivar float busy_until: time the link finishes removing the last packet
+        sent from source
+    :ivar in_flight: :class:`~collections.deque` of (arrival time,
+        :class:`.Packet`) tuples of the packets on the way, in arrival order
+    :ivar bool waiting: whether a :class:`.LinkAvailable` is scheduled for
+        the packets in the buffer
+    :ivar int train_length: largest number of packets delivered together
     :ivar float utilization: fraction of capacity in use
     """
-    def __init__(self, env, name, source, destination, delay, rate, buffer_capacity):
+    def __init__(self, env, name, source, destination, delay, rate, buffer_capacity,
+                 buffer_policy=BUFFER_DEFAULT_POLICY, train_length=1):
         super(Link, self).__init__(env=env, name=name)
         self.source = source
         self.destination = destination
         self.delay = delay
         self.rate = rate
-        self.buffer = Buffer(env=env, capacity=buffer_capacity, link=self)
-        self.busy = False
+        self.buffer = Buffer(env=env, capacity=buffer_capacity, link=self, policy=buffer_policy)
+        self.busy_until = env.now
+        self.in_flight = deque()
+        self.waiting = False
+        self.train_length = train_length
         self.utilization = 0
         self.env = env
 
@@ -283,24 +452,133 @@ class Link(Actor):
         return ('Link from ' + self.source.address +
                 ' to ' + self.destination.address)
 
-    def add(self, packet):
-        if self.busy:
-            self.buffer.add(packet)
+    @property
+    def busy(self):
+        """Whether currently removing data from source"""
+        return self.env.now < self.busy_until
+
+    def add(self, packet, time=None):
+        """Send `packet`, or store it in the buffer while the link is busy
+
+        :param packet: :class:`.Packet` to send
+        :param float time: time `packet` reaches the link, if later than
+            now, as in a packet train; it is sent then if the link is free by
+            that time, or else stored now, which :meth:`pop_train` avoids
+        """
+        if (time is not None and time > self.env.now and not self.waiting and
+                self.busy_until <= time):
+            self.send(packet, start=time)
+        elif self.waiting or self.busy:
+            if self.buffer.add(packet) and not self.waiting:
+                self.waiting = True
+                LinkAvailable(env=self.env, delay=self.busy_until - self.env.now, link=self)
         else:
             self.send(packet)
 
     def react_to_link_available(self, event):
-        self.busy = False
-        if not self.buffer.packets.empty():
+        """Send the next packet in the buffer, and wait for the link to be
+        free again if more are left
+
+        The next packet is not sent ahead from the buffer when the one before
+        starts: it is taken out when the link frees up, since buffer
+        occupancy is recorded at the current time, and the room left in the
+        buffer until then decides which later packets are dropped, which
+        ones a drop-front policy pushes out and which ones the per-class
+        policy serves first.
+        """
+        self.waiting = False
+        if self.buffer:
             self.send(self.buffer.get())
+            if self.buffer:
+                self.waiting = True
+                LinkAvailable(env=self.env, delay=self.busy_until - self.env.now, link=self)
 
-    def send(self, packet):
-        self.busy = True
+    def react_to_packet_receipt(self, event):
+        """Hand the first packet on the way to `destination`, with the rest
+        of its packet train, and schedule the arrival of the next one
+        """
+        arrival, packet = self.in_flight.popleft()
+        if self.train_length > 1 and self.in_flight:
+            train = self.pop_train(arrival, packet)
+        else:
+            train = ()
+        if self.in_flight:
+            arrival, packet = self.in_flight[0]
+            PacketReceipt(env=self.env, delay=arrival - self.env.now, receiver=self, packet=packet)
+        self.destination.react_to_packet_receipt(event)
+        for arrival, packet in train:
+            self.destination.react_to_packet_receipt(TrainReceipt(env=self.env, packet=packet,
+                                                                  time=arrival))
+
+    def pop_train(self, arrival, packet):
+        """Take the packets that follow `packet` in its packet train out of
+        `in_flight`
+
+        Trains only form on links into a :class:`.Router`, which forwards
+        `packet` at once when the link it forwards on is free. The train
+        goes on while the next packet in flight belongs to the same flow and
+        direction and was sent right behind the last one, so no other
+        traffic comes between them, and while that link will be free again
+        by the time the packet arrives. It stops before any other packet can
+        reach the router that it would send on the same link, or that could
+        change its routes (see :meth:`.Router.quiet_until`), and before the
+        end of the run.
+
+        :param float arrival: arrival time of `packet`
+        :param packet: first :class:`.Packet` of the train
+        :return: list of (arrival time, :class:`.Packet`) tuples of the
+            other packets of the train
+        """
+        train = []
+        router = self.destination
+        if not isinstance(packet, DataPacket) or not isinstance(router, Router):
+            return train
+        link = router.forwarding.get(packet.destination.address)
+        if link is None or link.waiting or link.busy:
+            return train
+        # The router sends `packet` now, and each packet of the train when it
+        # arrives, as Link.send times them
+        busy_until = self.env.now + 1.0 * packet.size / link.rate
+        in_flight = self.in_flight
+        length = 0
+        for next_arrival, next_packet in in_flight:
+            if (length + 1 >= self.train_length or
+                    next_arrival - arrival > next_packet.size * (1 + 1e-9) / self.rate or
+                    busy_until > next_arrival or
+                    not isinstance(next_packet, DataPacket) or
+                    next_packet.flow_id != packet.flow_id or
+                    next_packet.acknowledgement != packet.acknowledgement or
+                    next_packet.destination is not packet.destination):
+                break
+            length += 1
+            busy_until = next_arrival + 1.0 * next_packet.size / link.rate
+            arrival = next_arrival
+        if length:
+            # Nor does it go past the end of the run
+            quiet_until = min(router.quiet_until(link=self, out_link=link, until=arrival),
+                              self.env.controller.run_until)
+            while length and in_flight[0][0] < quiet_until:
+                train.append(in_flight.popleft())
+                length -= 1
+        return train
+
+    def send(self, packet, start=None):
+        """Start removing `packet` from source
+
+        :param packet: :class:`.Packet` to send
+        :param float start: time the link starts sending `packet`, if later
+            than now
+        """
         d_trans = 1.0 * packet.size / self.rate  # (bits to be tx'ed)/(rate in bits/ms) should give the
                                                  # transit time in ms
-        PacketReceipt(env=self.env, delay=self.delay + d_trans, receiver=self.destination, packet=packet)
-        LinkAvailable(env=self.env, delay=d_trans, link=self)
-        self.env.controller.record_link_rate(link=self, packet_size=packet.size)
+        if start is None:
+            start = self.env.now
+        self.busy_until = start + d_trans
+        arrival = start + (self.delay + d_trans)
+        self.in_flight.append((arrival, packet))
+        if len(self.in_flight) == 1:
+            PacketReceipt(env=self.env, delay=arrival - self.env.now, receiver=self, packet=packet)
+        self.env.controller.record_link_rate(link=self, packet_size=packet.size, time=start)
 
 
 class Router(Actor):
@@ -311,24 +589,72 @@ class Router(Actor):
     :param str address: IP address for router
     :param list links: all connected Links
     :param float update_time: the time interval of updating routing tables
+    :param bool delta_updates: whether to advertise only the routes changed
+        since the last advertisement to the same neighbor
+    :param int full_refresh_interval: number of advertisements to a neighbor
+        in delta mode, of which the first is the whole routing table
+    :param bool snapshots: whether advertisements carry the routes as they
+        are when sent, instead of the live routing table; delta mode
+        advertisements always do
+    :param table: routing table to start from; defaults to an empty dict,
+        or an empty :class:`.RoutingTable` with `snapshots`
     :ivar str address: IP address for router
     :ivar list links: all connected Links
-    :ivar dict table: routing table
+    :ivar list in_links: all Links that end at this router
+    :ivar table: routing table: a dict, :class:`.RoutingTable` or
+        :class:`.ArrayRoutingTable`
+    :ivar dict forwarding: outgoing :class:`.Link` to each destination
+        address in `table`, kept up to date by :meth:`set_route`
     :ivar default_gateway: default out port if can not decide route
     :ivar float update_time: the time interval of updating routing tables
+    :ivar float update_at: time of the next scheduled routing table update,
+        or infinity if there is none
+    :ivar bool delta_updates: whether to advertise only changed routes
+    :ivar int full_refresh_interval: number of advertisements to a neighbor
+        in delta mode, of which the first is the whole routing table
+    :ivar bool snapshots: whether advertisements carry the routes as they
+        are when sent
+    :ivar int version: number of route changes so far, in delta mode
+    :ivar changes: version of the last change of each route, oldest first,
+        in delta mode
+    :ivar dict advertised: (version, advertisements since the last whole
+        table) of the last advertisement to each neighbor address, in delta
+        mode
+    :ivar dict neighbor_tables: routes last advertised by each neighbor
+        address, in delta mode
+    :ivar dict checked: (version, distance to the neighbor) when the routes
+        of each neighbor address were last checked, in delta mode
+    :ivar dict routes_via: destination addresses routed through each
+        next hop address, in delta mode
     """
-    def __init__(self, env, name, address, update_time=GENERATE_ROUTER_PACKET_DEFAULT_INTERVAL):
+    def __init__(self, env, name, address, update_time=GENERATE_ROUTER_PACKET_DEFAULT_INTERVAL,
+                 delta_updates=False, full_refresh_interval=ROUTING_FULL_REFRESH_INTERVAL,
+                 snapshots=False, table=None):
         super(Router, self).__init__(env=env, name=name)
         self.address = address
         self.links = []
-        self.table = {}
+        self.in_links = []
+        if table is None:
+            table = RoutingTable() if snapshots else {}
+        self.table = table
+        self.forwarding = {}
         self.default_gateway = None
         self.update_time = update_time
+        self.update_at = float('inf')
+        self.delta_updates = delta_updates
+        self.full_refresh_interval = full_refresh_interval
+        self.snapshots = snapshots
+        self.version = 0
+        self.changes = OrderedDict()
+        self.advertised = {}
+        self.neighbor_tables = {}
+        self.checked = {}
+        self.routes_via = {}
 
     def __str__(self):
         return self.address
   
-    def initialize_routing_table(self, all_host_ip_addresses):
+    def initialize_routing_table(self, all_host_ip_addresses, routes=None):
         """
         the key of table is destination (IP_address of hosts)
         the first element in value of table is the distance between current router to final host
@@ -336,15 +662,23 @@ class Router(Actor):
 
         If the host destination is not in neighbor links, then set the distance to be inf, the next_hop to be the default_gateway
         If the host destination is in its neighbor links, then set the distance to be 1( dynamic still inf?), the next_hop to be direct host destination
+
+        With static `routes`, those are installed instead and no RouterPacket is sent.
+
+        :param list all_host_ip_addresses: addresses of every :class:`.Host`
+        :param dict routes: static (distance, next hop address) routes by
+            destination address, such as from :func:`.shortest_routes`
         """
         self.default_gateway = self.links[0].destination.address
         for host_ip_address in all_host_ip_addresses:
-            val = float("inf"), self.default_gateway
-            self.table[host_ip_address] = val
+            self.set_route(host_ip_address, float("inf"), self.default_gateway)
+        if routes is not None:
+            for destination, (distance, next_hop) in sorted(routes.items()):
+                self.set_route(destination, distance, next_hop)
+            return
         for link in self.links:
             if isinstance(link.destination, Host):
-                val = 1, link.destination.address
-                self.table[link.destination.address] = val
+                self.set_route(link.destination.address, 1, link.destination.address)
         self.generate_router_packet()
     
     def update_router_table(self, router_packet):
@@ -353,57 +687,225 @@ class Router(Actor):
         Implement Bellman-Ford algorithm here.
         Measurement is number of hops if DYNAMIC_ROUTE_DISTANCE_METRIC = False.
         Measurement is link delay if DYNAMIC_ROUTE_DISTANCE_METRIC = True.
+
+        In delta mode only the routes that can change are checked (see
+        :meth:`delta_routes`), with the same result. Array routing tables are
+        merged whole with :meth:`.ArrayRoutingTable.merge`.
         """
-        for (destination, val) in router_packet.router_table.items():
+        if self.delta_updates:
+            items = self.delta_routes(router_packet=router_packet)
+        elif (isinstance(self.table, ArrayRoutingTable) and
+              isinstance(router_packet.router_table, ArrayRoutingTable)):
+            if DYNAMIC_ROUTE_DISTANCE_METRIC:
+                metric = self.env.now - router_packet.timestamp
+            else:
+                metric = 1
+            neighbor = router_packet.source.address
+            for destination in self.table.merge(table=router_packet.router_table, metric=metric,
+                                                neighbor=neighbor,
+                                                refresh=DYNAMIC_ROUTE_DISTANCE_METRIC):
+                self.update_forwarding(destination, neighbor)
+            return
+        else:
+            items = router_packet.router_table.items()
+        for (destination, val) in items:
             if DYNAMIC_ROUTE_DISTANCE_METRIC:
                 metric = self.env.now - router_packet.timestamp
                 if destination in self.table:
                     if self.table[destination][1] == router_packet.source.address:
-                        update_val = val[0] + metric, router_packet.source.address
-                        self.table[destination] = update_val
+                        self.set_route(destination, val[0] + metric, router_packet.source.address)
                     else:
                         if val[0] + metric < self.table[destination][0]:
-                            update_val = val[0] + metric, router_packet.source.address
-                            self.table[destination] = update_val
+                            self.set_route(destination, val[0] + metric,
+                                           router_packet.source.address)
                 else:
-                    update_val = val[0] + metric, router_packet.source.address
-                    self.table[destination] = update_val
+                    self.set_route(destination, val[0] + metric, router_packet.source.address)
             else:
                 metric = 1
                 if destination in self.table:
                     if val[0] + metric < self.table[destination][0]:
-                        update_val = val[0] + metric, router_packet.source.address
-                        self.table[destination] = update_val
+                        self.set_route(destination, val[0] + metric, router_packet.source.address)
                 else:
-                    update_val = val[0] + metric, router_packet.source.address
-                    self.table[destination] = update_val
+                    self.set_route(destination, val[0] + metric, router_packet.source.address)
+        if self.delta_updates:
+            if DYNAMIC_ROUTE_DISTANCE_METRIC:
+                metric = self.env.now - router_packet.timestamp
+            else:
+                metric = 1
+            self.checked[router_packet.source.address] = self.version, metric
+
+    def delta_routes(self, router_packet):
+        """Routes of the neighbor that sent `router_packet` that can change
+        this router's table, in delta mode
+
+        The packet holds the routes the neighbor changed since its last
+        advertisement to this router (see :meth:`advertisement`), as they
+        were when the neighbor sent it. They are kept with the routes it
+        advertised before, and all of them are checked when they make up its
+        whole table. Routes through the neighbor follow its new distance, so they
+        are checked, and so are the routes this router changed since it last
+        checked this neighbor. Any other route of the neighbor is no shorter
+        than when it was last checked, unless the distance to the neighbor
+        dropped, in which case every route is checked.
+
+        :param router_packet: acknowledgement :class:`.RouterPacket`
+        :return: list of (destination address, route) tuples
+        """
+        neighbor = router_packet.source.address
+        if DYNAMIC_ROUTE_DISTANCE_METRIC:
+            metric = self.env.now - router_packet.timestamp
+        else:
+            metric = 1
+        routes = router_packet.router_table
+        neighbor_table = self.neighbor_tables.setdefault(neighbor, {})
+        neighbor_table.update(routes)
+        version, last_metric = self.checked.get(neighbor, (None, None))
+        if len(routes) >= len(neighbor_table) or version is None or metric < last_metric:
+            destinations = neighbor_table
+        else:
+            destinations = set(routes)
+            destinations.update(self.routes_via.get(neighbor, ()))
+            for destination in reversed(self.changes):
+                if self.changes[destination] <= version:
+                    break
+                destinations.add(destination)
+        return [(destination, neighbor_table[destination]) for destination in destinations
+                if destination in neighbor_table]
+
+    def port(self, address):
+        """The first :class:`.Link` to `address`, or `None` if no link leads
+        there
+
+        :param str address: address of a neighboring :class:`.Host` or
+            :class:`.Router`
+        """
+        for link in self.links:
+            if link.destination.address == address:
+                return link
+        return None
+
+    def set_route(self, destination, distance, next_hop):
+        """Route packets for `destination` through `next_hop`
+
+        The forwarding table is only updated when the next hop changes.
+
+        :param str destination: destination :class:`.Host` address
+        :param float distance: distance to `destination` through `next_hop`
+        :param str next_hop: address of the neighbor to forward packets to
+        """
+        route = self.table.get(destination)
+        self.table[destination] = distance, next_hop
+        if route is None or route[1] != next_hop:
+            self.update_forwarding(destination, next_hop)
+        if self.delta_updates and route != (distance, next_hop):
+            self.version += 1
+            self.changes.pop(destination, None)
+            self.changes[destination] = self.version
+            if route is not None:
+                self.routes_via[route[1]].discard(destination)
+            self.routes_via.setdefault(next_hop, set()).add(destination)
+
+    def quiet_until(self, link, out_link, until):
+        """Earliest time this router may have something else to send on
+        `out_link`: when a packet it would forward there, or any
+        :class:`.RouterPacket`, arrives on another link into it, or when it
+        sends routing updates of its own
+
+        A packet not yet on the way arrives after the delay of its link at
+        the earliest. Packets on the way are only looked at up to `until`.
+
+        :param link: :class:`.Link` into this router to leave out
+        :param out_link: :class:`.Link` out of this router
+        :param float until: latest time of interest
+        """
+        quiet_until = self.update_at
+        forwarding = self.forwarding
+        for in_link in self.in_links:
+            if in_link is link:
+                continue
+            if self.env.now + in_link.delay < quiet_until:
+                quiet_until = self.env.now + in_link.delay
+            for arrival, packet in in_link.in_flight:
+                if arrival >= quiet_until or arrival > until:
+                    break
+                if (not isinstance(packet, DataPacket) or
+                        forwarding.get(packet.destination.address, out_link) is out_link):
+                    quiet_until = arrival
+                    break
+        return quiet_until
+
+    def update_forwarding(self, destination, next_hop):
+        """Forward packets for `destination` on the link to `next_hop`
+
+        :param str destination: destination :class:`.Host` address
+        :param str next_hop: address of the neighbor to forward packets to
+        """
+        link = self.port(next_hop)
+        if link is None:
+            self.forwarding.pop(destination, None)
+        else:
+            self.forwarding[destination] = link
+
+    def advertisement(self, neighbor):
+        """Routes to advertise to `neighbor` in delta mode
+
+        Every :attr:`full_refresh_interval` advertisements to a neighbor, and
+        the first time, the whole routing table is advertised; otherwise only
+        the routes changed since the last advertisement are.
+
+        :param str neighbor: address of the neighboring :class:`.Router`
+        :return: dict of routes by destination address
+        """
+        version, count = self.advertised.get(neighbor, (None, None))
+        if version is None or count + 1 >= self.full_refresh_interval:
+            routes = dict(self.table)
+            count = 0
+        else:
+            routes = {}
+            for destination in reversed(self.changes):
+                if self.changes[destination] <= version:
+                    break
+                routes[destination] = self.table[destination]
+            count += 1
+        self.advertised[neighbor] = self.version, count
+        return routes
 
     def generate_router_packet(self):
         """Design RouterPacket(source,timestamp,routertable) that send the whole router table of this router to communicate with its neighbor
         """
+        router_table = self.table.snapshot() if self.snapshots else self.table
         for l in self.links:
             if isinstance(l.destination, Router):
-                router_packet = RouterPacket(timestamp=self.env.now, router_table=self.table, source=self, acknowledgement=False)
+                router_packet = RouterPacket(timestamp=self.env.now, router_table=router_table, source=self, acknowledgement=False)
                 self.send(link=l, packet=router_packet)
 
     def generate_ack_router_packet(self, router_packet):
         source_packet = router_packet
-        ack_router_packet = RouterPacket(timestamp=source_packet.timestamp, router_table=self.table, source=self, acknowledgement=True)
+        if self.delta_updates:
+            router_table = self.advertisement(neighbor=router_packet.source.address)
+        elif self.snapshots:
+            router_table = self.table.snapshot()
+        else:
+            router_table = self.table
+        ack_router_packet = RouterPacket(timestamp=source_packet.timestamp, router_table=router_table, source=self, acknowledgement=True)
         for l in self.links:
             if l.destination == router_packet.source:
                 self.send(link=l, packet=ack_router_packet)
                 break
 
-    def map_route(self, packet):
-        if packet.destination.address in self.table:
+    def map_route(self, packet, time=None):
+        route_link = self.forwarding.get(packet.destination.address)
+        if route_link is not None:
+            self.send(link=route_link, packet=packet, time=time)
+        elif packet.destination.address in self.table:
             next_hop = self.table[packet.destination.address][1]
             for link in self.links:
                 if next_hop == link.destination.address:
                     route_link = link
                     break
-            self.send(link=route_link, packet=packet)
+            self.send(link=route_link, packet=packet, time=time)
         else:
-            self.send(link=self.links[0], packet=packet)
+            self.send(link=self.links[0], packet=packet, time=time)
 
     def react_to_packet_receipt(self, event):
         """Read packet head to tell whether is a DataPacket or a RouterPacket
@@ -413,22 +915,32 @@ class Router(Actor):
         """
         packet = event.value
         if isinstance(packet, DataPacket):
-            self.map_route(packet=packet)
+            # A packet in a train is forwarded as of its own arrival
+            time = event.time if isinstance(event, TrainReceipt) else None
+            self.map_route(packet=packet, time=time)
         elif isinstance(packet, RouterPacket):
             if not packet.acknowledgement:
                 self.generate_ack_router_packet(router_packet=packet)
             else:   
                 self.update_router_table(router_packet=packet)
 
-    def send(self, link, packet):
+    def send(self, link, packet, time=None):
         """Send packet to certain link
 
         The packet could be normal packet to forward or communication packet to send to all links.
         """
-        link.add(packet=packet)
+        link.add(packet=packet, time=time)
 
     def react_to_routing_table_outdated(self, event):
         """Periodically generate RouterPacket to all neighbor links.
         """
         self.generate_router_packet()
-        RoutingTableOutdated(env=self.env, delay=self.update_time, router=self)
+        self.schedule_update(delay=self.update_time)
+
+    def schedule_update(self, delay):
+        """Schedule the next :class:`.RoutingTableOutdated` of this router
+
+        :param float delay: time until the update
+        """
+        self.update_at = self.env.now + delay
+        RoutingTableOutdated(env=self.env, delay=delay, router=self)
@@ -0,0 +1,94 @@
+"""This module contains the analysis of recorded metrics behind the graphs of
+``run.py``.
+
+Every function works on NumPy arrays and none needs matplotlib.
+
+.. autosummary::
+
+    series_arrays
+    metric_arrays
+    rate_bins
+    time_weighted_average
+
+.. moduleauthor:: Jan Van Bruggen <jancvanbruggen@gmail.com>
+"""
+import numpy as np
+
+
+def series_arrays(series):
+    """Times and values of a :class:`~cs143sim.telemetry.Series` as NumPy
+    arrays
+
+    The columns are copied in bulk, so the arrays stay valid if the series
+    grows. Entries of an :class:`~cs143sim.telemetry.EventSeries` count as a value
+    of 1.
+
+    :param series: :class:`~cs143sim.telemetry.Series` to read
+    :return: (times, values) tuple of float arrays
+    """
+    times, values = series.columns()
+    times = np.frombuffer(times, dtype=np.float64).copy()
+    if values is None:
+        values = np.ones(len(times))
+    else:
+        values = np.frombuffer(values, dtype=np.float64).copy()
+    return times, values
+
+
+def metric_arrays(controller, metric):
+    """Arrays of every actor with records of `metric`, sorted by actor name
+
+    :param controller: :class:`~cs143sim.simulation.Controller` that ran
+    :param str metric: name of the metric, such as ``'flow_rate'``
+    :return: list of (actor, times, values) tuples
+    """
+    probes = getattr(controller.telemetry, metric)
+    actors = sorted((actor for actor, probe in probes.items() if probe.series),
+                    key=lambda actor: actor.name)
+    return [(actor,) + series_arrays(probes[actor].series) for actor in actors]
+
+
+def rate_bins(times, values, x_step, duration=0):
+    """Sum values into bins of `x_step` ms, divided by `x_step`
+
+    Bin ``k`` holds the values recorded in ``((k - 1) * x_step, k * x_step]``,
+    and bins run at least up to `duration`.
+
+    :param times: record times, in ms, in increasing order
+    :param values: recorded values
+    :param int x_step: bin width, in ms
+    :param float duration: time the last bin must reach, in ms
+    :return: (bin times in s, per-ms sums) tuple of arrays
+    """
+    indices = np.ceil(times / x_step).astype(np.int64)
+    count = int(np.ceil(duration / float(x_step))) + 1
+    if len(indices):
+        count = max(count, indices[-1] + 1)
+    sums = np.bincount(indices, weights=values, minlength=count)
+    return np.arange(count) * x_step / 1000.0, sums / float(x_step)
+
+
+def time_weighted_average(times, values, x_step, end=None):
+    """Average a level over bins of `x_step` ms, weighting every value by how
+    long it held
+
+    The level is 0 until the first record and holds each recorded value until
+    the next one. Bin ``k`` covers ``[k * x_step, (k + 1) * x_step)``; only
+    bins that end by `end` are returned.
+
+    :param times: record times, in ms, in increasing order
+    :param values: recorded values
+    :param int x_step: bin width, in ms
+    :param float end: end of the averaged period, in ms; defaults to the time
+        of the last record
+    :return: (bin start times in s, averages) tuple of arrays
+    """
+    times = np.concatenate(([0.0], times))
+    values = np.concatenate(([0.0], values))
+    if end is None:
+        end = times[-1]
+    edges = np.arange(int(end // x_step) + 1) * float(x_step)
+    areas = np.concatenate(([0.0], np.cumsum(values[:-1] * np.diff(times))))
+    indices = np.searchsorted(times, edges, side='right') - 1
+    integrals = areas[indices] + values[indices] * (edges - times[indices])
+    return edges[:-1] / 1000.0, np.diff(integrals) / x_step
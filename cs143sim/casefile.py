@@ -0,0 +1,249 @@
+"""This module compiles simulation input files into the objects they define,
+and caches the result on disk.
+
+Parsing the text format takes a pass over every line. :func:`parse_case`
+does it once and returns a :class:`CompiledCase`, the list of hosts,
+routers, links and flows in the order the file defines them, from which
+:meth:`~cs143sim.simulation.Controller.build_case` makes the actors. With a
+cache directory, :func:`compile_case` stores every compiled case under the
+SHA-1 hash of the file content and the overrides applied to it, and later
+reads it back instead of parsing the same input again.
+
+.. autosummary::
+
+    CompiledCase
+    parse_case
+    compile_case
+
+.. moduleauthor:: Samuel Richerd <dondiego152@gmail.com>
+.. moduleauthor:: Jan Van Bruggen <jancvanbruggen@gmail.com>
+"""
+import hashlib
+import marshal
+import os
+import tempfile
+
+from cs143sim.constants import CASE_CACHE_VERSION
+from cs143sim.constants import GENERATE_ROUTER_PACKET_DEFAULT_INTERVAL
+from cs143sim.constants import INPUT_FILE_BUFFER_SCALE_FACTOR
+from cs143sim.constants import INPUT_FILE_DATA_SCALE_FACTOR
+from cs143sim.constants import INPUT_FILE_DELAY_SCALE_FACTOR
+from cs143sim.constants import INPUT_FILE_RATE_SCALE_FACTOR
+from cs143sim.constants import INPUT_FILE_TIME_SCALE_FACTOR
+from cs143sim.constants import INPUT_FILE_UPDATE_SCALE_FACTOR
+from cs143sim.errors import InputFileSyntaxError
+from cs143sim.errors import InputFileUnknownReference
+from cs143sim.errors import MissingAttribute
+
+
+class CompiledCase(object):
+    """Objects defined by a simulation input file
+
+    Each object is a tuple of its type, ``'HOST'``, ``'ROUTER'``,
+    ``'LINK'`` or ``'FLOW'``, followed by the arguments, in simulation units,
+    of the matching ``make_`` method of
+    :class:`~cs143sim.simulation.Controller`, with hosts and routers given
+    by name. Each link is split into its two directions. Plain tuples keep
+    cached cases small and quick to load.
+
+    :param list objects: object tuples in the order the file defines them
+    :ivar list objects: object tuples in the order the file defines them
+    """
+    def __init__(self, objects):
+        self.objects = objects
+
+
+def parse_case(case_file, overrides=None):
+    """Parse a simulation input file
+
+    :param case_file: iterable of the lines of the input file
+    :param dict overrides: input file attributes to replace, as a dict of
+        object types to dicts of attributes to values in input file units
+    :return: :class:`CompiledCase`
+    """
+    overrides = overrides or {}
+    objects = []
+    hosts = set()
+    routers = set()
+    obj_type = ''  # obj_type holds the current object type (LINK/HOST/Etc)
+                   # to which attributes apply
+    obj_id = ''    # obj_id is the current ID of the object
+    # These are "simple" attributes that have only 1 argument.
+    # Not included in this list is the CONNECTS attribute, which has 2 arguments,
+    #   and ID, which requires special processing.
+    attributes = ('RATE', 'DELAY', 'DATA', 'BUFFER', 'DST', 'SRC', 'START', 'IP', 'ALGORITHM', 'UPDATE')
+    # Input File Attributes:
+    # RATE - belongs to a :class:`.Link`, specifies link rate in Mbps (float)
+    # DELAY - belongs to a :class:`.Link`, specifies link delay in ms (int)
+    # DATA - belongs to a :class:`.Flow`, specifies amount of data to be transmitted in MegaBytes (int)
+    # BUFFER - belongs to a :class:`.Link`, specifies buffer size in KiloBytes (int)
+    # DST - belongs to a :class:`.Link` or :class:`.Flow`, specifies a destination (ID of destination)
+    # SRC - belongs to a :class:`.Link` or :class:`.Flow`, specifies a source (ID of source)
+    # START - belongs to a :class:`.Flow`, specifies starting time for that flow in seconds (float)
+    # IP - belongs to a :class:`.Router` or :class:`.Host`, specifies the IP address of the HOST or ROUTER (str)
+    # ALGORITHM - belongs to a :class:`.Flow`, specifies the congestion control algorithm for that flow (int)
+    # UPDATE - belongs to a :class:`.Router`, specifies the time between router table updates in ms (int)
+    # CONNECTS - belongs to a :class:`.Link`, specifies two Hosts/Routers that are connected by that link (ID ID)
+    # Note: most of the units above will be converted internally and apply only to the input file.
+    store_in = {attribute: '' for attribute in attributes}  # initialize all attributes to ''
+    line_number = 0
+    for case_line in case_file:
+        line_number += 1
+        line_comp = case_line.split()
+        if line_comp == [] and obj_id == '':
+            obj_id = ''  # clear obj_ID and type on empty line
+            obj_type = ''
+            continue
+        try:
+            # if the line is empty, just set keyword to ''
+            keyword = line_comp[0].upper()
+        except AttributeError:
+            keyword = ''
+        except IndexError:
+            keyword = ''
+        if keyword == '//':
+            continue  # ignore the comment line in the file
+        elif keyword in ['HOST', 'ROUTER', 'LINK', 'FLOW']:
+            # if we have a valid obj type, listen for new object attributes
+            obj_type = keyword
+            obj_id = ''
+        elif keyword in attributes:
+            # store simple attributes in their place in the store_in dictionary
+            store_in[keyword] = line_comp[1]
+
+        elif keyword == 'ID' or (keyword == '' and obj_id != ''):
+            # if we get a new ID attr (and already were working with another ID attr)
+            # OR if we read an empty line and there was an ID we were working with
+            # THEN
+            # create the object in the simulation, and start a new ID
+            if obj_type in overrides:
+                store_in.update(overrides[obj_type])
+            if obj_id == '':
+                obj_id = line_comp[1].upper()
+            elif obj_type == 'LINK':
+                # if we're getting an additional ID attribute on a LINK
+                # make sure we have all the attributes available,
+                # then create the link object
+                for attribute in ['BUFFER', 'DELAY', 'RATE', 'SRC', 'DST']:
+                    if store_in[attribute] in ['', []]:
+                        # Make sure all the attributes are not empty
+                        raise MissingAttribute(obj_type=obj_type, obj_id=obj_id,
+                                               missing_attr=attribute)
+                # Enforce referential integrity (aka check that the specified
+                # hosts/routers actually exist in the simulation)
+                for target in [store_in['SRC'], store_in['DST']]:
+                    if target not in hosts and target not in routers:
+                        raise InputFileUnknownReference(line_number, target +
+                                                        ' is not a valid Host/Router.')
+                link = (float(store_in['RATE']) * INPUT_FILE_RATE_SCALE_FACTOR,
+                        float(store_in['DELAY']) * INPUT_FILE_DELAY_SCALE_FACTOR,
+                        int(store_in['BUFFER']) * INPUT_FILE_BUFFER_SCALE_FACTOR)
+                        # convert into bits
+                # Links are split into two, one for each direction (so that they are full-duplex).
+                objects.append(('LINK', obj_id + 'a', store_in['SRC'], store_in['DST']) + link)
+                objects.append(('LINK', obj_id + 'b', store_in['DST'], store_in['SRC']) + link)
+            elif obj_type == 'HOST':
+                # check the attribute(s) (there's only one for HOSTS so far: IP)
+                for attribute in ['IP']:
+                    if store_in[attribute] in ['', []]:
+                        # Make sure all the attributes are not empty
+                        raise MissingAttribute(obj_type=obj_type, obj_id=obj_id,
+                                               missing_attr=attribute)
+                objects.append(('HOST', obj_id, store_in['IP']))
+                hosts.add(obj_id)
+
+            elif obj_type == 'ROUTER':
+                # check the attribute(s) (only one so far: IP), UPDATE is not mandatory.
+                for attribute in ['IP', 'UPDATE']:
+                    if store_in[attribute] in ['', []]:
+                        if attribute == 'UPDATE':
+                            # Just set update to a default value
+                            store_in[attribute] = GENERATE_ROUTER_PACKET_DEFAULT_INTERVAL
+                        else:
+                            raise MissingAttribute(obj_type=obj_type, obj_id=obj_id,
+                                                   missing_attr=attribute)
+                objects.append(('ROUTER', obj_id, store_in['IP'],
+                                store_in['UPDATE'] * INPUT_FILE_UPDATE_SCALE_FACTOR))
+                routers.add(obj_id)
+
+            elif obj_type == 'FLOW':
+                for attribute in ['SRC', 'DST', 'START', 'DATA', 'ALGORITHM']:
+                    if store_in[attribute] in ['', []]:
+                        if attribute == 'ALGORITHM':
+                            store_in[attribute] = 0
+                        else:
+                            raise MissingAttribute(obj_type=obj_type, obj_id=obj_id,
+                                                   missing_attr=attribute)
+                # if all the attributes are there, lets go ahead and create the flow
+                # BUT FIRST, we need to make sure the SRC/DST hosts actually exist..
+                # if they don't, warn the user that "No, i'm sorry, you have to specify
+                # hosts that actually exist."
+                for target in [store_in['SRC'], store_in['DST']]:
+                    if target not in hosts:
+                        raise InputFileUnknownReference(line_number=line_number,
+                                                        message='Input File Formatting Error: ' +
+                                                        'Reference to unknown object: ' +
+                                                        repr(KeyError(target)))
+                objects.append(('FLOW', obj_id, store_in['SRC'], store_in['DST'],
+                                int(store_in['DATA']) * INPUT_FILE_DATA_SCALE_FACTOR,
+                                float(store_in['START']) * INPUT_FILE_TIME_SCALE_FACTOR,
+                                int(store_in['ALGORITHM'])))
+            else:
+                # Unexpected ID attribute (out of context of an object Type)
+                raise InputFileSyntaxError(line_number=line_number,
+                                           message='Unexpected "ID" attribute.')
+            if keyword == 'ID':
+                obj_id = line_comp[1].upper()
+            else:
+                obj_id = ''
+                obj_type = ''
+        elif keyword == 'CONNECTS':
+            if obj_type == 'LINK':
+                store_in['SRC'] = line_comp[1].upper()
+                store_in['DST'] = line_comp[2].upper()
+            else:
+                raise InputFileSyntaxError(line_number=line_number,
+                                           message='Input File Formatting Error: ' +
+                                                   'CONNECTS attribute formatted incorrectly.\n' +
+                                                   'Expects: CONNECTS A B')
+        else:
+            raise InputFileSyntaxError(line_number=line_number,
+                                       message='Unrecognized keyword: ' + keyword)
+    return CompiledCase(objects=objects)
+
+
+def compile_case(case, overrides=None, cache_directory=None):
+    """Compile the simulation input file at path `case`, through a cache
+
+    :param str case: path to simulation input file
+    :param dict overrides: input file attributes to replace, as for
+        :func:`parse_case`
+    :param str cache_directory: directory of compiled cases, created if
+        needed, or `None` to always parse
+    :return: :class:`CompiledCase`
+    """
+    with open(case, 'rb') as case_file:
+        if cache_directory is None:
+            return parse_case(case_file, overrides)
+        content = case_file.read()
+    key = hashlib.sha1(content)
+    key.update(repr((CASE_CACHE_VERSION, marshal.version, sorted((object_type, sorted(attributes.items()))
+                                                for object_type, attributes
+                                                in (overrides or {}).items()))))
+    path = os.path.join(cache_directory, key.hexdigest() + '.case')
+    if os.path.isfile(path):
+        with open(path, 'rb') as cache_file:
+            return CompiledCase(objects=marshal.load(cache_file))
+    compiled = parse_case(content.splitlines(True), overrides)
+    try:
+        os.makedirs(cache_directory)
+    except OSError:
+        if not os.path.isdir(cache_directory):
+            raise
+    # Write under a temporary name first, so that processes compiling the
+    # same case at once never read a partial file
+    descriptor, temporary_path = tempfile.mkstemp(dir=cache_directory)
+    with os.fdopen(descriptor, 'wb') as cache_file:
+        marshal.dump(compiled.objects, cache_file)
+    os.rename(temporary_path, path)
+    return compiled
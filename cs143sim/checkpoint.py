@@ -0,0 +1,71 @@
+"""This module saves a :class:`~cs143sim.simulation.Controller` in the
+middle of a run and restores it, so that several variants can continue from
+one warm-up.
+
+A checkpoint is the whole controller pickled: the pending events of either
+kernel, every actor with its buffers, TLA and routing table, and the
+in-memory telemetry. Events keep their callbacks as bound methods, which
+pickle cannot store on its own, so this module registers reducers for them
+and for the :func:`itertools.count` sequences of the kernels.
+
+Records a :class:`~cs143sim.telemetry.DiskSink` already wrote stay in its
+run directory, which the checkpoint refers to; a restored controller can
+copy them to a run directory of its own, so that forks never write over one
+another.
+
+.. autosummary::
+
+    save
+    load
+
+.. moduleauthor:: Jan Van Bruggen <jancvanbruggen@gmail.com>
+"""
+import copy_reg
+import cPickle
+import types
+from itertools import count
+
+
+def reduce_method(method):
+    """Pickle a bound method as its name on its instance"""
+    return getattr, (method.im_self, method.im_func.__name__)
+
+
+def reduce_count(sequence):
+    """Pickle an :func:`itertools.count` as the next number it yields"""
+    return count, (int(repr(sequence)[len('count('):-1]),)
+
+
+copy_reg.pickle(types.MethodType, reduce_method)
+copy_reg.pickle(count, reduce_count)
+
+
+def save(controller, path):
+    """Write the state of `controller` to a checkpoint file
+
+    :param controller: :class:`~cs143sim.simulation.Controller` between runs
+    :param str path: checkpoint file to write
+    """
+    sink = controller.telemetry.sink
+    if sink is not None:
+        sink.sync()
+    with open(path, 'wb') as checkpoint_file:
+        cPickle.dump(controller, checkpoint_file, cPickle.HIGHEST_PROTOCOL)
+
+
+def load(path, run_directory=None):
+    """Read a :class:`~cs143sim.simulation.Controller` from a checkpoint file
+
+    :param str path: checkpoint file written by :func:`save`
+    :param str run_directory: if the checkpointed controller streams its
+        records to a run directory, a new directory to copy them to and
+        stream further records to, or `None` to keep using the same one
+    :return: restored :class:`~cs143sim.simulation.Controller`, ready to
+        run further
+    """
+    with open(path, 'rb') as checkpoint_file:
+        controller = cPickle.load(checkpoint_file)
+    sink = controller.telemetry.sink
+    if sink is not None and run_directory is not None:
+        sink.relocate(run_directory)
+    return controller
@@ -16,6 +16,37 @@ ACK_PACKET_SIZE = 512
 ROUTER_PACKET_SIZE = 512
 """Size of every :class:`.RouterPacket` in the simulation, in bits"""
 
+PACKET_TRAIN_MAX_LENGTH = 8
+"""Largest number of back-to-back packets of one flow that a :class:`.Link`
+delivers to a :class:`.Router` together in packet train mode"""
+
+BUFFER_DROP_TAIL = 'drop-tail'
+""":class:`.Buffer` policy that drops arriving packets when the buffer is
+full"""
+
+BUFFER_DROP_FRONT = 'drop-front'
+""":class:`.Buffer` policy that drops the oldest stored packets to make room
+for an arriving packet"""
+
+BUFFER_PER_CLASS = 'per-class'
+""":class:`.Buffer` policy that keeps separate drop-tail queues for routing
+packets, acknowledgements and data, served in that order"""
+
+BUFFER_DEFAULT_POLICY = BUFFER_DROP_TAIL
+"""Drop policy of every :class:`.Buffer` unless the :class:`.Controller`
+is told otherwise"""
+
+KERNEL_SIMPY = 'simpy'
+"""Event kernel that runs the simulation on a SimPy
+:class:`~simpy.core.Environment`"""
+
+KERNEL_NATIVE = 'native'
+"""Event kernel that runs the simulation on a
+:class:`~cs143sim.kernel.NativeEnvironment`"""
+
+KERNEL_DEFAULT = KERNEL_SIMPY
+"""Event kernel of the :class:`.Controller` unless it is told otherwise"""
+
 GENERATE_ROUTER_PACKET_DEFAULT_INTERVAL = 1000
 """Time for every :class:`.Router` to wait before generating a new
 :class:`.RouterPacket`, in milliseconds"""
@@ -24,6 +55,53 @@ DYNAMIC_ROUTE_DISTANCE_METRIC = True
 """Whether to take dynamic link delay as the metric for route distance, 
 otherwise use hops(topology) to be the metric"""
 
+ROUTING_UPDATES_FULL = 'full'
+"""Routing update mode in which every :class:`.Router` advertises its whole
+routing table in each update"""
+
+ROUTING_UPDATES_DELTA = 'delta'
+"""Routing update mode in which every :class:`.Router` advertises only the
+routes that changed since its last advertisement to the same neighbor"""
+
+ROUTING_UPDATES_DEFAULT = ROUTING_UPDATES_FULL
+"""Routing update mode of the :class:`.Controller` unless it is told
+otherwise"""
+
+ROUTING_FULL_REFRESH_INTERVAL = 10
+"""Number of advertisements from a :class:`.Router` to a neighbor in the
+delta routing update mode, of which the first is always the whole table"""
+
+ROUTING_TABLE_DICT = 'dict'
+"""Routing table of every :class:`.Router` kept in a dict, or a
+:class:`.RoutingTable` with snapshots"""
+
+ROUTING_TABLE_ARRAY = 'array'
+"""Routing table of every :class:`.Router` kept in an
+:class:`.ArrayRoutingTable`"""
+
+STATIC_ROUTING_HOPS = 'hops'
+"""Static routing mode in which routes are the shortest paths by number of
+hops"""
+
+STATIC_ROUTING_DELAY = 'delay'
+"""Static routing mode in which routes are the shortest paths by total
+configured :class:`.Link` delay"""
+
+FLUID_MODEL_STEP = 10
+"""Time step of the :class:`~cs143sim.fluid.FluidModel`, in milliseconds"""
+
+CASE_CACHE_VERSION = 1
+"""Version of the :class:`~cs143sim.casefile.CompiledCase` format, part of
+the key of every cached case so that a new format never reads an old one"""
+
+TELEMETRY_CHUNK_SIZE = 65536
+"""Number of entries a :class:`~cs143sim.telemetry.Series` holds in memory
+before a :class:`~cs143sim.telemetry.DiskSink` writes them to disk"""
+
+TELEMETRY_QUEUE_SIZE = 16
+"""Number of chunks that may wait for the
+:class:`~cs143sim.telemetry.DiskSink` writer thread before recording blocks"""
+
 INPUT_FILE_RATE_SCALE_FACTOR = 1000000 / 1000.0
 """ Conversion factor for Mbps to bits per millisecond (for rate)"""
 
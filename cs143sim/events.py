@@ -1,12 +1,17 @@
 """This module contains all event definitions.
 
+Every event also works with a :class:`~cs143sim.kernel.NativeEnvironment`,
+where creating it only schedules the callback and its value.
+
 .. autosummary::
 
+    KernelTimeout
     FlowStart
     LinkAvailable
     PacketReceipt
     PacketTimeOut
     RoutingTableOutdated
+    TrainReceipt
     VegasTimeOut
 
 .. moduleauthor:: Jan Van Bruggen <jancvanbruggen@gmail.com>
@@ -15,7 +20,39 @@
 from simpy.events import Timeout
 
 
-class FlowStart(Timeout):
+class KernelTimeout(Timeout):
+    """SimPy :class:`~simpy.events.Timeout` that is scheduled as a plain
+    callback when its environment is a
+    :class:`~cs143sim.kernel.NativeEnvironment`
+
+    Subclasses define :meth:`target`, which takes the arguments that follow
+    `env` and `delay` and returns the callback and value of the event.
+
+    :param env: SimPy simulation :class:`~simpy.core.Environment` or
+        :class:`~cs143sim.kernel.NativeEnvironment`
+    :param float delay: time until the event
+    """
+    def __new__(cls, env, delay, *args, **kwargs):
+        if getattr(env, 'native', False):
+            callback, value = cls.target(*args, **kwargs)
+            return env.schedule(delay, callback, value)
+        return Timeout.__new__(cls)
+
+    def __getnewargs__(self):
+        # Only SimPy events are ever pickled, and an environment that is not
+        # native makes __new__ create one
+        return None, 0
+
+    @staticmethod
+    def target(*args, **kwargs):
+        """Callback and value of the event
+
+        :return: (callback, value) tuple
+        """
+        raise NotImplementedError
+
+
+class FlowStart(KernelTimeout):
     """A :class:`~cs143sim.actors.Flow` begins generating packets
 
     :param env: SimPy simulation :class:`~simpy.core.Environment`
@@ -27,8 +64,12 @@ class FlowStart(Timeout):
         super(FlowStart, self).__init__(env=env, delay=delay)
         self.callbacks.append(flow.react_to_flow_start)
 
+    @staticmethod
+    def target(flow):
+        return flow.react_to_flow_start, None
 
-class LinkAvailable(Timeout):
+
+class LinkAvailable(KernelTimeout):
     """A :class:`~cs143sim.actors.Router` finishes sending a
     :class:`~cs143sim.actors.Packet` on :class:`~cs143sim.actors.Link`
 
@@ -41,8 +82,12 @@ class LinkAvailable(Timeout):
         super(LinkAvailable, self).__init__(env=env, delay=delay)
         self.callbacks.append(link.react_to_link_available)
 
+    @staticmethod
+    def target(link):
+        return link.react_to_link_available, None
+
 
-class PacketReceipt(Timeout):
+class PacketReceipt(KernelTimeout):
     """A :class:`~cs143sim.actors.Host` or a :class:`~cs143sim.actors.Router`
     receives a :class:`~cs143sim.actors.Packet` on a
     :class:`~cs143sim.actors.Link`
@@ -58,20 +103,30 @@ class PacketReceipt(Timeout):
         super(PacketReceipt, self).__init__(env=env, delay=delay, value=packet)
         self.callbacks.append(receiver.react_to_packet_receipt)
 
+    @staticmethod
+    def target(receiver, packet):
+        return receiver.react_to_packet_receipt, packet
 
-class PacketTimeOut(Timeout):
+
+class PacketTimeOut(KernelTimeout):
     """A TLA Check if a packet time out happens
     
     :param env: SimPy simulation :class:`~simpy.core.Environment`
     :param float delay: time until packet timeout.
-    :param actor: the responsing TLA
+    :param actor: the responding :class:`~cs143sim.tla.RetransmissionTimer`
+    :param float expected_time: time the timeout is scheduled for, which is
+        also its value
     """
     def __init__(self, env, delay, actor, expected_time):
         super(PacketTimeOut, self).__init__(env, delay, value=expected_time)
-        self.callbacks.append(actor.react_to_time_out)    
+        self.callbacks.append(actor.react_to_time_out)
+
+    @staticmethod
+    def target(actor, expected_time):
+        return actor.react_to_time_out, expected_time
 
 
-class RoutingTableOutdated(Timeout):
+class RoutingTableOutdated(KernelTimeout):
     """A :class:`~cs143sim.actors.Router` updates its routing table
 
     :param env: SimPy simulation :class:`~simpy.core.Environment`
@@ -82,8 +137,38 @@ class RoutingTableOutdated(Timeout):
         super(RoutingTableOutdated, self).__init__(env=env, delay=delay)
         self.callbacks.append(router.react_to_routing_table_outdated)
 
+    @staticmethod
+    def target(router):
+        return router.react_to_routing_table_outdated, None
+
 
-class VegasTimeOut(Timeout):
+class TrainReceipt(object):
+    """Receipt of a :class:`~cs143sim.actors.Packet` that arrives in a
+    packet train behind the one its :class:`PacketReceipt` was for
+
+    It is never scheduled: the :class:`~cs143sim.actors.Link` passes it to
+    the :class:`~cs143sim.actors.Router` at its end right after that
+    :class:`PacketReceipt`, and the router forwards the packet as of
+    `time`.
+
+    :param env: SimPy simulation :class:`~simpy.core.Environment` or
+        :class:`~cs143sim.kernel.NativeEnvironment`
+    :param packet: :class:`~cs143sim.actors.Packet` that arrives
+    :param float time: time `packet` would arrive on its own, no earlier
+        than the current time
+    :ivar env: simulation environment
+    :ivar value: :class:`~cs143sim.actors.Packet` that arrives
+    :ivar float time: time `packet` would arrive on its own
+    """
+    __slots__ = ('env', 'value', 'time')
+
+    def __init__(self, env, packet, time):
+        self.env = env
+        self.value = packet
+        self.time = time
+
+
+class VegasTimeOut(KernelTimeout):
     """A TCP Vegas updates its window size
         
     :param env: SimPy simulation :class:`~simpy.core.Environment`
@@ -93,3 +178,7 @@ class VegasTimeOut(Timeout):
     def __init__(self, env, delay, actor):
         super(VegasTimeOut, self).__init__(env, delay)
         self.callbacks.append(actor.react_to_vegas_time_out)
+
+    @staticmethod
+    def target(actor):
+        return actor.react_to_vegas_time_out, None
@@ -0,0 +1,368 @@
+"""This module contains a fluid model of a simulation case, which steps flow
+windows, link queues and rates forward as difference equations instead of
+simulating every packet.
+
+:class:`FluidModel` reads the topology that a
+:class:`~cs143sim.simulation.Controller` parsed, routes every flow on its
+shortest path by configured link delay, and records the same metrics as the
+packet-level simulation, once per time step, so both can be analyzed and
+graphed alike and checked against each other with :func:`compare`.
+
+.. autosummary::
+
+    FluidLink
+    FluidFlow
+    FluidModel
+    flow_path
+    compare
+
+.. moduleauthor:: Jan Van Bruggen <jancvanbruggen@gmail.com>
+"""
+from cs143sim.constants import ACK_PACKET_SIZE
+from cs143sim.constants import FLUID_MODEL_STEP
+from cs143sim.constants import OUTPUT_BUFFER_OCCUPANCY_SCALE_FACTOR
+from cs143sim.constants import OUTPUT_FLOW_RATE_SCALE_FACTOR
+from cs143sim.constants import OUTPUT_LINK_RATE_SCALE_FACTOR
+from cs143sim.constants import PACKET_SIZE
+from cs143sim.constants import STATIC_ROUTING_DELAY
+from cs143sim.routing import shortest_routes
+from cs143sim.telemetry import RecordView
+from cs143sim.telemetry import TelemetryStore
+
+
+def flow_path(source, destination, routes):
+    """:class:`Links <.Link>` a packet crosses from `source` to
+    `destination`
+
+    :param source: sending :class:`.Host`
+    :param destination: receiving :class:`.Host`
+    :param dict routes: routes of each :class:`.Router`, as returned by
+        :func:`~cs143sim.routing.shortest_routes`
+    :return: list of :class:`Links <.Link>` in order
+    """
+    links = [source.link]
+    actor = source.link.destination
+    while actor is not destination:
+        route = routes.get(actor, {}).get(destination.address)
+        if route is None:
+            raise ValueError('No route from ' + source.name + ' to ' + destination.name)
+        links.append(next(link for link in actor.links
+                          if link.destination.address == route[1]))
+        actor = links[-1].destination
+    return links
+
+
+class FluidLink(object):
+    """Queue of a :class:`.Link` as a fluid
+
+    :param link: :class:`.Link` modeled
+    :ivar link: :class:`.Link` modeled
+    :ivar float capacity: rate, in bits per ms
+    :ivar float buffer: buffer capacity, in bits
+    :ivar float queue: bits in the buffer
+    :ivar float arrival: rate of the traffic arriving in the current step,
+        in bits per ms
+    :ivar float sent: bits sent in the last step
+    :ivar float loss: fraction of the traffic dropped in the last step
+    :ivar float dropped: bits dropped and not yet recorded as packet losses
+    """
+    def __init__(self, link):
+        self.link = link
+        self.capacity = link.rate
+        self.buffer = link.buffer.capacity
+        self.queue = 0.0
+        self.arrival = 0.0
+        self.sent = 0.0
+        self.loss = 0.0
+        self.dropped = 0.0
+
+    def advance(self, step):
+        """Serve the traffic that arrived during `step` ms
+
+        :return: fraction of the queued and arriving traffic that was sent
+        """
+        arriving = self.arrival * step
+        level = self.queue + arriving
+        self.sent = min(level, self.capacity * step)
+        level -= self.sent
+        dropped = max(level - self.buffer, 0.0)
+        self.queue = level - dropped
+        self.dropped += dropped
+        self.loss = dropped / arriving if arriving else 0.0
+        self.arrival = 0.0
+        return self.sent / (self.queue + self.sent + dropped) if self.sent else 0.0
+
+    @property
+    def queueing_delay(self):
+        """Time the buffered bits take to send, in ms"""
+        return self.queue / self.capacity
+
+
+class FluidFlow(object):
+    """Window and rates of a :class:`.Flow` as a fluid, following its TLA
+    (see :mod:`cs143sim.tla`)
+
+    Windows grow with the packets acknowledged in each step as the TLA grows
+    them on every acknowledgement. Once a packet's worth of data has been
+    dropped, at most once per round trip, the window reacts as the TLA does
+    to a loss: without fast retransmit, TCP Tahoe first stalls for a
+    retransmission timeout.
+
+    :param flow: :class:`.Flow` modeled
+    :param list path: :class:`FluidLinks <.FluidLink>` of the data
+    :param list return_path: :class:`FluidLinks <.FluidLink>` of the
+        acknowledgements
+    :ivar flow: :class:`.Flow` modeled
+    :ivar float W: window size, in packets
+    :ivar float slow_start_threshold: slow start threshold, in packets
+    :ivar bool slow_start: whether the window is in slow start
+    :ivar float base_rtt: shortest round trip time seen, in ms
+    :ivar float rtt: current round trip time, in ms
+    :ivar list rates: rate of the flow into each link of `path` in the
+        current step, in bits per ms
+    :ivar float sent: bits sent so far
+    :ivar float delivered: bits delivered so far
+    :ivar float lost: packets dropped since the last loss reaction
+    :ivar float hold: time until which losses cause no new reaction, in ms
+    :ivar float stalled: time until which the flow waits for a timeout, in
+        ms
+    :ivar float next_update: time of the next TCP Vegas window update, in ms
+    """
+    def __init__(self, flow, path, return_path):
+        self.flow = flow
+        self.path = path
+        self.return_path = return_path
+        self.propagation = (sum(link.link.delay + PACKET_SIZE / link.capacity for link in path) +
+                            sum(link.link.delay + ACK_PACKET_SIZE / link.capacity
+                                for link in return_path))
+        self.W = 1.0
+        self.slow_start_threshold = 240
+        self.slow_start = True
+        self.base_rtt = self.rtt = self.propagation
+        self.rates = [0.0] * len(path)
+        self.sent = 0.0
+        self.delivered = 0.0
+        self.lost = 0.0
+        self.hold = 0.0
+        self.stalled = None
+        self.next_update = None
+
+    @property
+    def done(self):
+        """Whether all data has been delivered"""
+        return self.delivered >= self.flow.amount
+
+    def sending_rate(self, now, step):
+        """Rate the flow sends at in the `step` ms starting at `now`, in
+        bits per ms
+        """
+        if now < self.flow.start_time or self.done or self.stalled is not None:
+            return 0.0
+        self.rtt = self.propagation + sum(link.queueing_delay
+                                          for link in self.path + self.return_path)
+        self.base_rtt = min(self.base_rtt, self.rtt)
+        return min(self.W * PACKET_SIZE / self.rtt,
+                   max(self.flow.amount - self.sent, 0.0) / step)
+
+    def react(self, now, step, acked):
+        """Update the window at the end of a step
+
+        :param float now: end of the step, in ms
+        :param float step: length of the step, in ms
+        :param float acked: packets acknowledged in the step
+        """
+        algorithm = self.flow.algorithm
+        if self.stalled is not None:
+            if now >= self.stalled:
+                self.stalled = None
+                self.W = 1.0
+                self.slow_start = True
+            return
+        if self.lost >= 1 and now >= self.hold:
+            self.lost = 0.0
+            self.hold = now + self.rtt
+            if algorithm == 0:
+                self.slow_start_threshold = self.W / 2
+                self.stalled = now + max(1000, int(1 + self.rtt))
+            elif algorithm == 1:
+                self.slow_start_threshold = self.W / 2
+                self.W = 1.0
+                self.slow_start = True
+            elif algorithm == 2:
+                self.slow_start_threshold = self.W / 2
+                self.W = max(float(int(self.slow_start_threshold)), 1.0)
+                self.slow_start = False
+            else:
+                self.W = 1.0
+            return
+        if algorithm <= 2:
+            if self.slow_start:
+                self.W += acked
+                if self.W > self.slow_start_threshold:
+                    self.slow_start = False
+            else:
+                self.W += acked / max(self.W, 1)
+        elif self.slow_start:
+            self.W += acked
+            if self.W * (1 - self.base_rtt / self.rtt) > 6:
+                self.slow_start = False
+                self.next_update = now + self.rtt
+        elif now >= self.next_update:
+            self.next_update = now + self.rtt
+            if algorithm == 3:
+                diff = self.W * (1 - self.base_rtt / self.rtt)
+                if diff < 4:
+                    self.W += 1
+                elif diff > 8:
+                    self.W -= 1
+            else:
+                self.W = self.W * self.base_rtt / self.rtt + 4
+            self.W = max(self.W, 1.0)
+
+
+class FluidModel(object):
+    """Fluid model of the case read by a
+    :class:`~cs143sim.simulation.Controller`
+
+    Each step, every flow sends at its window per round trip time, traffic
+    enters each link of its path at the rate the previous link sent it on in
+    the step before, and each link queues what it cannot send and drops what
+    its buffer cannot hold. Acknowledgements load the return path in
+    proportion to the data delivered.
+
+    Records are kept like those of the
+    :class:`~cs143sim.simulation.Controller`, one per step: the window size,
+    delivered data, mean packet delay and packet losses of every flow and
+    link, and the occupancy and sent data of every link.
+
+    :param controller: :class:`~cs143sim.simulation.Controller` that read the
+        case, and need not run
+    :param float step: time step, in ms
+    :param dict recording_policies: recording policy of each metric, by
+        metric name (see :class:`~cs143sim.telemetry.TelemetryStore`)
+    :ivar controller: :class:`~cs143sim.simulation.Controller` of the case
+    :ivar float step: time step, in ms
+    :ivar float now: current time, in ms
+    :ivar dict links: :class:`FluidLink` of each :class:`.Link`
+    :ivar dict flows: :class:`FluidFlow` of each :class:`.Flow`
+    :ivar telemetry: :class:`~cs143sim.telemetry.TelemetryStore` holding all
+        records, which the record attributes are views of, as in the
+        :class:`~cs143sim.simulation.Controller`
+    """
+    def __init__(self, controller, step=FLUID_MODEL_STEP, recording_policies=None):
+        self.controller = controller
+        self.step = step
+        self.now = 0.0
+        self.telemetry = TelemetryStore(policies=recording_policies)
+        self.buffer_occupancy = RecordView(self.telemetry.buffer_occupancy)
+        self.flow_rate = RecordView(self.telemetry.flow_rate)
+        self.link_rate = RecordView(self.telemetry.link_rate)
+        self.packet_delay = RecordView(self.telemetry.packet_delay)
+        self.packet_loss = RecordView(self.telemetry.packet_loss)
+        self.window_size = RecordView(self.telemetry.window_size)
+        self.links = {}
+        for name in sorted(controller.links):
+            link = controller.links[name]
+            self.links[link] = FluidLink(link)
+            self.telemetry.register_link(link)
+        routes = dict((router, shortest_routes(router=router, metric=STATIC_ROUTING_DELAY))
+                      for router in controller.routers.values())
+        self.flows = {}
+        for name in sorted(controller.flows):
+            flow = controller.flows[name]
+            path = [self.links[link]
+                    for link in flow_path(flow.source, flow.destination, routes)]
+            return_path = [self.links[link]
+                           for link in flow_path(flow.destination, flow.source, routes)]
+            self.flows[flow] = FluidFlow(flow=flow, path=path, return_path=return_path)
+            self.telemetry.register_flow(flow)
+
+    def advance(self):
+        """Advance the model by one step and record the results"""
+        step = self.step
+        start = self.now
+        self.now = end = start + step
+        flows = [self.flows[flow] for flow in sorted(self.flows, key=lambda flow: flow.name)]
+        for fluid in flows:
+            fluid.rates[0] = fluid.sending_rate(start, step)
+            fluid.sent += fluid.rates[0] * step
+            for link, rate in zip(fluid.path, fluid.rates):
+                link.arrival += rate
+            ack_rate = fluid.rates[-1] * ACK_PACKET_SIZE / PACKET_SIZE
+            for link in fluid.return_path:
+                link.arrival += ack_rate
+        arrivals = dict((link, link.arrival) for link in self.links.values())
+        served = dict((link, link.advance(step)) for link in self.links.values())
+        telemetry = self.telemetry
+        for fluid in flows:
+            delivered = 0.0
+            for hop, (link, rate) in enumerate(zip(fluid.path, list(fluid.rates))):
+                fluid.lost += rate * step * link.loss / PACKET_SIZE
+                share = rate / arrivals[link] if arrivals[link] else 0.0
+                out = link.sent * share / step
+                if hop + 1 < len(fluid.rates):
+                    fluid.rates[hop + 1] = out
+                else:
+                    delivered = min(out * step, fluid.flow.amount - fluid.delivered)
+            fluid.delivered += delivered
+            fluid.react(now=end, step=step, acked=delivered / PACKET_SIZE)
+            telemetry.window_size[fluid.flow].append(end, fluid.W)
+            if delivered:
+                telemetry.flow_rate[fluid.flow].append(
+                    end, delivered * OUTPUT_FLOW_RATE_SCALE_FACTOR)
+                telemetry.packet_delay[fluid.flow].append(
+                    end, sum(link.link.delay + PACKET_SIZE / link.capacity + link.queueing_delay
+                             for link in fluid.path))
+        for link in self.links.values():
+            telemetry.buffer_occupancy[link.link].append(
+                end, link.queue * OUTPUT_BUFFER_OCCUPANCY_SCALE_FACTOR)
+            if link.sent:
+                telemetry.link_rate[link.link].append(
+                    end, link.sent * OUTPUT_LINK_RATE_SCALE_FACTOR)
+            while link.dropped >= PACKET_SIZE:
+                link.dropped -= PACKET_SIZE
+                telemetry.packet_loss[link.link].append(end)
+        return served
+
+    def run(self, until):
+        """Advance the model in steps up to `until`
+
+        :param float until: time to stop at, in ms
+        """
+        while self.now + self.step <= until:
+            self.advance()
+        self.telemetry.finish(self.now)
+        self.telemetry.flush()
+
+
+def compare(controller, model, duration):
+    """Mean of every metric of every actor over a run, in the packet-level
+    simulation and in the fluid model
+
+    Rates are averaged over `duration` and levels are weighted by how long
+    they held. Requires NumPy.
+
+    :param controller: :class:`~cs143sim.simulation.Controller` that ran
+    :param model: :class:`FluidModel` that ran for the same case; actors
+        are matched by name
+    :param float duration: duration of both runs, in ms
+    :return: list of (metric, actor name, packet-level mean, fluid mean)
+        tuples, sorted by metric and actor name
+    """
+    from cs143sim.analysis import series_arrays
+    from cs143sim.analysis import time_weighted_average
+    rows = []
+    for metric in ('buffer_occupancy', 'flow_rate', 'link_rate', 'window_size'):
+        packet_probes = dict((actor.name, probe)
+                             for actor, probe in getattr(controller.telemetry, metric).items())
+        fluid_probes = getattr(model.telemetry, metric)
+        for actor in sorted(fluid_probes, key=lambda actor: actor.name):
+            means = []
+            for probe in (packet_probes[actor.name], fluid_probes[actor]):
+                times, values = series_arrays(probe.series)
+                if metric in ('flow_rate', 'link_rate'):
+                    means.append(values.sum() / duration)
+                else:
+                    means.append(time_weighted_average(times, values, duration, duration)[1][0])
+            rows.append((metric, actor.name, means[0], means[1]))
+    return rows
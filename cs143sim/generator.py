@@ -0,0 +1,382 @@
+"""This module generates synthetic simulation input files at scale.
+
+Each topology family returns a :class:`Network`, which writes an input file
+that :meth:`~cs143sim.simulation.Controller.read_case` reads. Attributes are
+given in input file units, each as a distribution that :func:`draw` samples:
+a number is constant, a (low, high) tuple is uniform, a list is a choice of
+equally likely values and a dict weighs each value, which suits ALGORITHM
+mixes such as ``{0: 1, 3: 1}``. Every random choice comes from one
+:class:`random.Random` seeded with `seed`, so the same arguments always
+generate the same file.
+
+.. autosummary::
+
+    Network
+    draw
+    dumbbell
+    parking_lot
+    fat_tree
+    waxman
+    chain
+
+.. moduleauthor:: Jan Van Bruggen <jancvanbruggen@gmail.com>
+"""
+import math
+import random
+
+from cs143sim.constants import GENERATE_ROUTER_PACKET_DEFAULT_INTERVAL
+
+
+def draw(rng, distribution):
+    """Sample a distribution of attribute values
+
+    :param rng: :class:`random.Random` to sample with
+    :param distribution: a number, a (low, high) tuple for a uniform
+        distribution, a list of equally likely values, or a dict of weights
+        by value
+    :return: sampled value
+    """
+    if isinstance(distribution, tuple):
+        return rng.uniform(*distribution)
+    if isinstance(distribution, list):
+        return rng.choice(distribution)
+    if isinstance(distribution, dict):
+        values = sorted(distribution)
+        pick = rng.uniform(0, sum(distribution[value] for value in values))
+        for value in values:
+            pick -= distribution[value]
+            if pick < 0:
+                return value
+        return values[-1]
+    return distribution
+
+
+class Network(object):
+    """Hosts, routers, links and flows of a generated input file
+
+    :param int seed: seed of the random choices
+    :ivar rng: :class:`random.Random` every random choice comes from
+    :ivar list hosts: host names
+    :ivar list routers: (name, update interval) tuples
+    :ivar list links: (name, end, end, rate, delay, buffer) tuples
+    :ivar list flows: (name, source, destination, data, start, algorithm)
+        tuples
+    """
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+        self.hosts = []
+        self.routers = []
+        self.links = []
+        self.flows = []
+
+    def add_host(self):
+        """Add a host
+
+        :return: its name
+        """
+        self.hosts.append('H%d' % (len(self.hosts) + 1))
+        return self.hosts[-1]
+
+    def add_router(self, update=GENERATE_ROUTER_PACKET_DEFAULT_INTERVAL):
+        """Add a router
+
+        :param update: distribution of the routing table update interval,
+            in ms
+        :return: its name
+        """
+        name = 'R%d' % (len(self.routers) + 1)
+        self.routers.append((name, int(round(draw(self.rng, update)))))
+        return name
+
+    def add_link(self, end, other_end, rate, delay, buffer_size):
+        """Connect two hosts or routers
+
+        :param str end: name of a host or router
+        :param str other_end: name of a host or router
+        :param rate: distribution of the rate, in Mbps
+        :param delay: distribution of the delay, in ms
+        :param buffer_size: distribution of the buffer size, in KB
+        :return: its name
+        """
+        name = 'L%d' % (len(self.links) + 1)
+        self.links.append((name, end, other_end, draw(self.rng, rate), draw(self.rng, delay),
+                           max(int(round(draw(self.rng, buffer_size))), 1)))
+        return name
+
+    def add_flow(self, source, destination, data, start, algorithm):
+        """Add a flow between two hosts
+
+        :param str source: name of the sending host
+        :param str destination: name of the receiving host
+        :param data: distribution of the amount of data, in MB
+        :param start: distribution of the start time, in s
+        :param algorithm: distribution of the TLA number
+        :return: its name
+        """
+        name = 'F%d' % (len(self.flows) + 1)
+        self.flows.append((name, source, destination, max(int(round(draw(self.rng, data))), 1),
+                           draw(self.rng, start), int(draw(self.rng, algorithm))))
+        return name
+
+    def add_random_flows(self, count, data, start, algorithm):
+        """Add flows between random pairs of distinct hosts
+
+        :param int count: number of flows
+        """
+        for _ in range(count):
+            source, destination = self.rng.sample(self.hosts, 2)
+            self.add_flow(source, destination, data, start, algorithm)
+
+    def text(self):
+        """Input file of the network
+
+        Every object lists all of its attributes, since the parser copies
+        attributes left out from the object before it, and every block ends
+        with a blank line, which creates its last object.
+        """
+        lines = ['// Generated network of %d hosts, %d routers, %d links and %d flows'
+                 % (len(self.hosts), len(self.routers), len(self.links), len(self.flows)), '']
+        address = 0
+        lines.append('HOST')
+        for name in self.hosts:
+            address += 1
+            lines += ['    ID      ' + name,
+                      '    IP      10.%d.%d.%d' % (address >> 16, (address >> 8) & 255,
+                                                   address & 255)]
+        lines.append('')
+        if self.routers:
+            lines.append('ROUTER')
+            for name, update in self.routers:
+                address += 1
+                lines += ['    ID      ' + name,
+                          '    IP      10.%d.%d.%d' % (address >> 16, (address >> 8) & 255,
+                                                       address & 255),
+                          '    UPDATE  %d' % update]
+            lines.append('')
+        lines.append('LINK')
+        for name, end, other_end, rate, delay, buffer_size in self.links:
+            lines += ['    ID       ' + name,
+                      '    RATE     %r' % float(rate),
+                      '    DELAY    %r' % float(delay),
+                      '    BUFFER   %d' % buffer_size,
+                      '    CONNECTS %s %s' % (end, other_end)]
+        lines.append('')
+        if self.flows:
+            lines.append('FLOW')
+            for name, source, destination, data, start, algorithm in self.flows:
+                lines += ['    ID      ' + name,
+                          '    SRC     ' + source,
+                          '    DST     ' + destination,
+                          '    DATA    %d' % data,
+                          '    START   %r' % float(start),
+                          '    ALGORITHM %d' % algorithm]
+            lines.append('')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Write the input file of the network
+
+        :param str path: input file to write
+        """
+        with open(path, 'w') as case_file:
+            case_file.write(self.text())
+
+
+def dumbbell(pairs=2, flows=None, seed=0, rate=12.5, bottleneck_rate=10, delay=10,
+             buffer_size=64, data=20, start=(0.5, 1.5), algorithm=0,
+             update=GENERATE_ROUTER_PACKET_DEFAULT_INTERVAL):
+    """Two routers joined by a bottleneck link, each with `pairs` hosts
+
+    :param int pairs: number of hosts on each side
+    :param int flows: number of flows, each from a host on the left to the
+        host across from it, cycling through the pairs; defaults to `pairs`
+    :param int seed: seed of the random choices
+    :param rate: distribution of the host link rates, in Mbps
+    :param bottleneck_rate: distribution of the bottleneck rate, in Mbps
+    :param delay: distribution of the link delays, in ms
+    :param buffer_size: distribution of the buffer sizes, in KB
+    :param data: distribution of the flow data, in MB
+    :param start: distribution of the flow start times, in s
+    :param algorithm: distribution of the flow TLA numbers
+    :param update: distribution of the routing table update intervals, in ms
+    :return: :class:`Network`
+    """
+    network = Network(seed=seed)
+    left = network.add_router(update)
+    right = network.add_router(update)
+    network.add_link(left, right, bottleneck_rate, delay, buffer_size)
+    sides = []
+    for router in (left, right):
+        hosts = [network.add_host() for _ in range(pairs)]
+        for host in hosts:
+            network.add_link(host, router, rate, delay, buffer_size)
+        sides.append(hosts)
+    for i in range(pairs if flows is None else flows):
+        network.add_flow(sides[0][i % pairs], sides[1][i % pairs], data, start, algorithm)
+    return network
+
+
+def parking_lot(size=4, seed=0, rate=10, delay=10, buffer_size=64, data=20,
+                start=(0.5, 1.5), algorithm=0, update=GENERATE_ROUTER_PACKET_DEFAULT_INTERVAL):
+    """A line of routers, with one flow along the whole line and one cross
+    flow over each link of it
+
+    :param int size: number of routers
+    :param int seed: seed of the random choices
+    :param rate: distribution of the link rates, in Mbps
+    :param delay: distribution of the link delays, in ms
+    :param buffer_size: distribution of the buffer sizes, in KB
+    :param data: distribution of the flow data, in MB
+    :param start: distribution of the flow start times, in s
+    :param algorithm: distribution of the flow TLA numbers
+    :param update: distribution of the routing table update intervals, in ms
+    :return: :class:`Network`
+    """
+    network = Network(seed=seed)
+    routers = [network.add_router(update) for _ in range(size)]
+    for router, next_router in zip(routers, routers[1:]):
+        network.add_link(router, next_router, rate, delay, buffer_size)
+    hosts = []
+    for router in routers:
+        host = network.add_host()
+        network.add_link(host, router, rate, delay, buffer_size)
+        hosts.append(host)
+    first = network.add_host()
+    network.add_link(first, routers[0], rate, delay, buffer_size)
+    last = network.add_host()
+    network.add_link(last, routers[-1], rate, delay, buffer_size)
+    network.add_flow(first, last, data, start, algorithm)
+    for host, next_host in zip(hosts, hosts[1:]):
+        network.add_flow(host, next_host, data, start, algorithm)
+    return network
+
+
+def fat_tree(k=4, flows=8, seed=0, rate=10, delay=10, buffer_size=64, data=20,
+             start=(0.5, 1.5), algorithm=0, update=GENERATE_ROUTER_PACKET_DEFAULT_INTERVAL):
+    """A k-ary fat tree: (k/2)^2 core routers and k pods of k/2 aggregation
+    and k/2 edge routers, each edge router with k/2 hosts
+
+    :param int k: even number of ports of every router
+    :param int flows: number of flows between random pairs of hosts
+    :param int seed: seed of the random choices
+    :param rate: distribution of the link rates, in Mbps
+    :param delay: distribution of the link delays, in ms
+    :param buffer_size: distribution of the buffer sizes, in KB
+    :param data: distribution of the flow data, in MB
+    :param start: distribution of the flow start times, in s
+    :param algorithm: distribution of the flow TLA numbers
+    :param update: distribution of the routing table update intervals, in ms
+    :return: :class:`Network`
+    """
+    if k < 2 or k % 2:
+        raise ValueError('Fat tree routers need an even number of ports, not ' + repr(k))
+    half = k // 2
+    network = Network(seed=seed)
+    cores = [network.add_router(update) for _ in range(half * half)]
+    for _ in range(k):
+        aggregations = [network.add_router(update) for _ in range(half)]
+        edges = [network.add_router(update) for _ in range(half)]
+        for i, aggregation in enumerate(aggregations):
+            for core in cores[i * half:(i + 1) * half]:
+                network.add_link(aggregation, core, rate, delay, buffer_size)
+            for edge in edges:
+                network.add_link(edge, aggregation, rate, delay, buffer_size)
+        for edge in edges:
+            for _ in range(half):
+                network.add_link(network.add_host(), edge, rate, delay, buffer_size)
+    network.add_random_flows(flows, data, start, algorithm)
+    return network
+
+
+def waxman(size=10, hosts=10, flows=10, alpha=0.4, beta=0.4, seed=0, rate=10,
+           delay=(5, 20), buffer_size=64, data=20, start=(0.5, 1.5), algorithm=0,
+           update=GENERATE_ROUTER_PACKET_DEFAULT_INTERVAL):
+    """Routers at random points of a unit square, linked by the Waxman model
+
+    Each pair of routers at distance d is linked with probability
+    ``beta * exp(-d / (alpha * L))``, where L is the largest distance. Links
+    between the closest routers of different components then make the
+    network connected. Each host links to a random router.
+
+    :param int size: number of routers
+    :param int hosts: number of hosts
+    :param int flows: number of flows between random pairs of hosts
+    :param float alpha: Waxman parameter weighing long links against short
+    :param float beta: Waxman parameter scaling the density of links
+    :param int seed: seed of the random choices
+    :param rate: distribution of the link rates, in Mbps
+    :param delay: distribution of the link delays, in ms
+    :param buffer_size: distribution of the buffer sizes, in KB
+    :param data: distribution of the flow data, in MB
+    :param start: distribution of the flow start times, in s
+    :param algorithm: distribution of the flow TLA numbers
+    :param update: distribution of the routing table update intervals, in ms
+    :return: :class:`Network`
+    """
+    network = Network(seed=seed)
+    rng = network.rng
+    routers = [network.add_router(update) for _ in range(size)]
+    points = [(rng.random(), rng.random()) for _ in routers]
+    distance = lambda i, j: math.hypot(points[i][0] - points[j][0], points[i][1] - points[j][1])
+    pairs = [(i, j) for i in range(size) for j in range(i + 1, size)]
+    longest = max([distance(i, j) for i, j in pairs] or [1.0]) or 1.0
+    components = range(size)
+    edges = [(i, j) for i, j in pairs
+             if rng.random() < beta * math.exp(-distance(i, j) / (alpha * longest))]
+
+    def component(i):
+        while components[i] != i:
+            i = components[i]
+        return i
+
+    for i, j in edges:
+        components[component(i)] = component(j)
+    for i, j in sorted(pairs, key=lambda pair: distance(*pair)):
+        if component(i) != component(j):
+            components[component(i)] = component(j)
+            edges.append((i, j))
+    for i, j in edges:
+        network.add_link(routers[i], routers[j], rate, delay, buffer_size)
+    for _ in range(hosts):
+        network.add_link(network.add_host(), rng.choice(routers), rate, delay, buffer_size)
+    network.add_random_flows(flows, data, start, algorithm)
+    return network
+
+
+def chain(size=16, seed=0, host_rate=12.5, rate=10, delay=10, buffer_size=64, data=5,
+          start=(0.5, 1.5), algorithm=1, update=GENERATE_ROUTER_PACKET_DEFAULT_INTERVAL):
+    """A long line of routers, each with a host, and a flow from every host
+    to the host of the next router
+
+    :param int size: number of routers
+    :param int seed: seed of the random choices
+    :param host_rate: distribution of the host link rates, in Mbps
+    :param rate: distribution of the router link rates, in Mbps
+    :param delay: distribution of the link delays, in ms
+    :param buffer_size: distribution of the buffer sizes, in KB
+    :param data: distribution of the flow data, in MB
+    :param start: distribution of the flow start times, in s
+    :param algorithm: distribution of the flow TLA numbers
+    :param update: distribution of the routing table update intervals, in ms
+    :return: :class:`Network`
+    """
+    network = Network(seed=seed)
+    routers = [network.add_router(update) for _ in range(size)]
+    hosts = []
+    for router in routers:
+        host = network.add_host()
+        network.add_link(host, router, host_rate, delay, buffer_size)
+        hosts.append(host)
+    for router, next_router in zip(routers, routers[1:]):
+        network.add_link(router, next_router, rate, delay, buffer_size)
+    for host, next_host in zip(hosts, hosts[1:]):
+        network.add_flow(host, next_host, data, start, algorithm)
+    return network
+
+
+FAMILIES = {'dumbbell': dumbbell,
+            'parking_lot': parking_lot,
+            'fat_tree': fat_tree,
+            'waxman': waxman,
+            'chain': chain}
+"""Topology families, by name"""
@@ -0,0 +1,104 @@
+"""This module contains a lightweight event kernel that can replace the SimPy
+:class:`~simpy.core.Environment`.
+
+The events of :mod:`cs143sim.events` schedule plain ``(time, sequence,
+callback, value)`` entries on a :mod:`heapq` when created with a
+:class:`NativeEnvironment`, instead of allocating a SimPy event with its own
+callback list. Entries run in time order and, at equal times, in the order
+they were scheduled, exactly like SimPy timeouts.
+
+.. autosummary::
+
+    NativeEnvironment
+    NativeEvent
+
+.. moduleauthor:: Jan Van Bruggen <jancvanbruggen@gmail.com>
+"""
+from heapq import heappop
+from heapq import heappush
+from itertools import count
+
+
+class NativeEvent(object):
+    """Event passed to the callbacks of a :class:`NativeEnvironment`
+
+    One instance is reused for every entry, so callbacks must read its value
+    before returning rather than keep the event.
+
+    :param env: :class:`NativeEnvironment` running the callbacks
+    :ivar env: :class:`NativeEnvironment` running the callbacks
+    :ivar value: value of the entry being processed
+    """
+    __slots__ = ('env', 'value')
+
+    def __init__(self, env):
+        self.env = env
+        self.value = None
+
+
+class NativeEnvironment(object):
+    """Event kernel that runs scheduled callbacks in time order
+
+    :ivar float now: current simulation time
+    :ivar bool native: always `True`, which :mod:`cs143sim.events` checks to
+        schedule on this kernel instead of creating SimPy events
+    """
+    native = True
+
+    def __init__(self, initial_time=0):
+        self.now = initial_time
+        self._queue = []
+        self._sequence = count()
+        self._event = NativeEvent(env=self)
+
+    def schedule(self, delay, callback, value=None):
+        """Schedule `callback` to be called `delay` from now
+
+        :param float delay: time until the callback runs
+        :param callback: function called with a :class:`NativeEvent` whose
+            value is `value`
+        :param value: value of the event
+        :return: the scheduled entry
+        """
+        if delay < 0:
+            raise ValueError('Negative delay ' + str(delay))
+        entry = (self.now + delay, next(self._sequence), callback, value)
+        heappush(self._queue, entry)
+        return entry
+
+    def peek(self):
+        """Time of the next entry, or infinity if there is none"""
+        return self._queue[0][0] if self._queue else float('inf')
+
+    def step(self):
+        """Process the next entry
+
+        :raise IndexError: if no entry is scheduled
+        """
+        self.now, _, callback, value = heappop(self._queue)
+        event = self._event
+        event.value = value
+        callback(event)
+
+    def run(self, until=None):
+        """Process entries until none is left or, if `until` is given, until
+        the time reaches `until`
+
+        As with SimPy, entries scheduled exactly at `until` are not processed
+        and the time is `until` afterwards.
+
+        :param float until: time to stop at
+        """
+        queue = self._queue
+        event = self._event
+        if until is None:
+            until = float('inf')
+        else:
+            until = float(until)
+            if until <= self.now:
+                raise ValueError('until(=%s) should be > the current simulation time.' % until)
+        while queue and queue[0][0] < until:
+            self.now, _, callback, event.value = heappop(queue)
+            callback(event)
+        if until != float('inf'):
+            self.now = until
@@ -0,0 +1,202 @@
+"""This module contains an opt-in profiler of the event loop of a
+:class:`~cs143sim.simulation.Controller`.
+
+A :class:`Profiler` runs the events of either kernel itself, in the same
+order as the kernel would, timing each one. It counts the events, their wall
+time and the depth of the event queue when they ran, per event class and per
+actor, and the telemetry records written per metric. A
+:class:`.PacketReceipt` only passes through its :class:`.Link`, so it counts
+as the :class:`.Router` or :class:`.Flow` that takes the packet (see
+:func:`receiver_label`). Without a profiler the
+kernels run as usual, so profiling costs nothing unless enabled.
+
+.. autosummary::
+
+    Profiler
+    actor_label
+    event_label
+    receiver_label
+
+.. moduleauthor:: Jan Van Bruggen <jancvanbruggen@gmail.com>
+"""
+from timeit import default_timer
+
+from cs143sim.actors import Link
+from cs143sim.packets import DataPacket
+from cs143sim.telemetry import FLOW_METRICS
+from cs143sim.telemetry import LINK_METRICS
+
+
+NATIVE_EVENT_CLASSES = {'react_to_flow_start': 'FlowStart',
+                        'react_to_link_available': 'LinkAvailable',
+                        'react_to_packet_receipt': 'PacketReceipt',
+                        'react_to_time_out': 'PacketTimeOut',
+                        'react_to_routing_table_outdated': 'RoutingTableOutdated',
+                        'react_to_vegas_time_out': 'VegasTimeOut'}
+"""Event class of each callback the native kernel schedules, by method name,
+since the native kernel schedules callbacks instead of event objects"""
+
+
+def actor_label(actor):
+    """Name of the :class:`.Actor` an event callback belongs to
+
+    Retransmission timers and TLAs count as their :class:`.Flow`.
+
+    :param actor: object whose method is the callback
+    """
+    while not hasattr(actor, 'name'):
+        owner = getattr(actor, 'flow', None) or getattr(actor, 'actor', None)
+        if owner is None:
+            return actor.__class__.__name__
+        actor = owner
+    return actor.name
+
+
+def receiver_label(link, packet):
+    """Name of the :class:`.Actor` that takes `packet` off `link`
+
+    That is the :class:`.Router` or :class:`.Host` at the end of `link`,
+    or at a host the :class:`.Flow` that the data or acknowledgement packet
+    belongs to.
+
+    :param link: :class:`.Link` the packet arrives on
+    :param packet: arriving :class:`.Packet`
+    """
+    receiver = link.destination
+    flow_index = getattr(receiver, 'flow_index', None)
+    if flow_index is not None and isinstance(packet, DataPacket):
+        flow = flow_index.get((packet.source, bool(packet.acknowledgement), packet.flow_id))
+        if flow is not None:
+            return flow.name
+    return receiver.name
+
+
+def event_label(event, callback):
+    """Name of the class of an event
+
+    :param event: SimPy event, or `None` for an entry of the native kernel
+    :param callback: callback of the event
+    """
+    if event is not None:
+        return type(event).__name__
+    name = getattr(callback, '__name__', None)
+    return NATIVE_EVENT_CLASSES.get(name, name)
+
+
+class Profiler(object):
+    """Counters of the work done by the events of a simulation
+
+    Each counter is a list of the number of events, their total wall time in
+    seconds, their total queue depth and their largest queue depth, where the
+    queue depth of an event is the number of events scheduled when it ran.
+
+    :param telemetry: :class:`~cs143sim.telemetry.TelemetryStore` whose
+        records are counted
+    :ivar dict events: counter of each event class, by class name
+    :ivar dict actors: counter of each (event class, actor) pair
+    :ivar dict records: telemetry records written during profiled runs, by
+        metric name
+    :ivar float wall_time: total wall time of profiled runs, in seconds
+    """
+    def __init__(self, telemetry):
+        self.telemetry = telemetry
+        self.events = {}
+        self.actors = {}
+        self.records = dict((metric, 0) for metric in LINK_METRICS + FLOW_METRICS)
+        self.wall_time = 0.0
+
+    def record_counts(self):
+        """Number of records of each metric in the telemetry so far"""
+        return dict((metric, sum(len(probe.series)
+                                 for probe in getattr(self.telemetry, metric).values()))
+                    for metric in self.records)
+
+    def count(self, event, callback, depth, elapsed, value=None):
+        """Add one event to the counters
+
+        :param event: SimPy event, or `None` for an entry of the native kernel
+        :param callback: first callback of the event
+        :param int depth: events scheduled when it ran
+        :param float elapsed: wall time it took, in seconds
+        :param value: value of the entry of the native kernel
+        """
+        name = event_label(event, callback)
+        actor = getattr(callback, 'im_self', None)
+        if actor is None:
+            key = name, None
+        elif isinstance(actor, Link):
+            key = name, receiver_label(actor, value if event is None else event.value)
+        else:
+            key = name, actor_label(actor)
+        for counters, counter_key in ((self.events, name), (self.actors, key)):
+            counter = counters.get(counter_key)
+            if counter is None:
+                counter = counters[counter_key] = [0, 0.0, 0, 0]
+            counter[0] += 1
+            counter[1] += elapsed
+            counter[2] += depth
+            if depth > counter[3]:
+                counter[3] = depth
+
+    def run(self, env, until=None):
+        """Run `env` like its own ``run`` does, profiling every event
+
+        :param env: SimPy :class:`~simpy.core.Environment` or
+            :class:`~cs143sim.kernel.NativeEnvironment`
+        :param float until: time to stop at, or `None` to run until no event
+            is left
+        """
+        before = self.record_counts()
+        start = default_timer()
+        stop = float('inf') if until is None else float(until)
+        if until is not None and stop <= env.now:
+            raise ValueError('until(=%s) should be > the current simulation time.' % stop)
+        queue = env._queue
+        native = getattr(env, 'native', False)
+        while queue and queue[0][0] < stop:
+            depth = len(queue)
+            if native:
+                event = None
+                _, _, callback, value = queue[0]
+            else:
+                event = queue[0][3]
+                callback = event.callbacks[0] if event.callbacks else None
+                value = None
+            event_start = default_timer()
+            env.step()
+            self.count(event, callback, depth, default_timer() - event_start, value=value)
+        if until is not None:
+            # Nothing is left before `until`, so this only advances the time
+            env.run(until=stop)
+        self.wall_time += default_timer() - start
+        after = self.record_counts()
+        for metric in self.records:
+            self.records[metric] += after[metric] - before[metric]
+
+    def report(self, limit=10):
+        """Summary of the counters, busiest first
+
+        :param int limit: number of actors listed
+        :return: report text
+        """
+        lines = ['Profile: %d events in %.3f s' % (sum(counter[0] for counter in self.events.values()),
+                                                  self.wall_time)]
+        lines.append('%-32s %10s %10s %10s %10s' % ('Event class', 'events', 'wall (s)',
+                                                    'mean depth', 'max depth'))
+        for name, counter in sorted(self.events.items(), key=lambda item: -item[1][1]):
+            lines.append('%-32s %10d %10.3f %10.1f %10d' % ((name,) + self.summary(counter)))
+        lines.append('%-32s %10s %10s %10s %10s' % ('Event class / actor', 'events', 'wall (s)',
+                                                    'mean depth', 'max depth'))
+        actors = sorted(self.actors.items(), key=lambda item: -item[1][1])
+        for (name, actor), counter in actors[:limit]:
+            lines.append('%-32s %10d %10.3f %10.1f %10d'
+                         % ((name + ' / ' + str(actor),) + self.summary(counter)))
+        lines.append('%-32s %10s' % ('Metric', 'records'))
+        for metric in sorted(self.records):
+            lines.append('%-32s %10d' % (metric, self.records[metric]))
+        return '\n'.join(lines)
+
+    @staticmethod
+    def summary(counter):
+        """Events, wall time, mean and largest queue depth of a counter"""
+        return counter[0], counter[1], float(counter[2]) / counter[0], counter[3]
@@ -0,0 +1,286 @@
+"""This module contains the routing tables of :class:`Routers <.Router>`.
+
+A routing table maps destination :class:`.Host` addresses to (distance, next
+hop address) routes. Both tables here hand out copy-on-write snapshots: a
+snapshot shares the routes of its table until the table next changes, so
+advertising a table costs nothing until it is updated, and an advertised
+snapshot never changes afterwards.
+
+:class:`ArrayRoutingTable` keeps the routes in NumPy arrays indexed by
+address, and merges a whole advertised table with vector operations; it
+needs NumPy, which :class:`RoutingTable` does not.
+
+:func:`shortest_routes` computes the routes of static routing once, with
+Dijkstra's algorithm, instead of letting routers exchange tables.
+
+.. autosummary::
+
+    AddressIndex
+    RoutingTable
+    RoutingSnapshot
+    ArrayRoutingTable
+    shortest_routes
+
+.. moduleauthor:: Jan Van Bruggen <jancvanbruggen@gmail.com>
+"""
+from collections import Mapping
+from collections import MutableMapping
+from heapq import heappop
+from heapq import heappush
+from itertools import count
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from cs143sim.constants import STATIC_ROUTING_DELAY
+from cs143sim.constants import STATIC_ROUTING_HOPS
+
+
+class RoutingTable(MutableMapping):
+    """Routing table of routes by destination address, in a dict
+
+    :param dict routes: initial routes
+    :ivar dict routes: routes by destination address, shared with the last
+        snapshot until the next change
+    :ivar bool shared: whether :attr:`routes` is shared with a snapshot
+    """
+    def __init__(self, routes=None):
+        self.routes = dict(routes or {})
+        self.shared = False
+
+    def __getitem__(self, destination):
+        return self.routes[destination]
+
+    def __setitem__(self, destination, route):
+        self.write()
+        self.routes[destination] = route
+
+    def __delitem__(self, destination):
+        self.write()
+        del self.routes[destination]
+
+    def __contains__(self, destination):
+        return destination in self.routes
+
+    def __iter__(self):
+        return iter(self.routes)
+
+    def __len__(self):
+        return len(self.routes)
+
+    def get(self, destination, default=None):
+        return self.routes.get(destination, default)
+
+    def items(self):
+        return self.routes.items()
+
+    def snapshot(self):
+        """Routes as they are now, which later changes do not affect
+
+        :return: :class:`RoutingSnapshot`
+        """
+        self.shared = True
+        return RoutingSnapshot(routes=self.routes)
+
+    def write(self):
+        """Stop sharing :attr:`routes` with snapshots before a change"""
+        if self.shared:
+            self.routes = dict(self.routes)
+            self.shared = False
+
+
+class RoutingSnapshot(Mapping):
+    """Read-only routes of a :class:`RoutingTable` at one time
+
+    :param dict routes: routes by destination address, which nothing may
+        change afterwards
+    """
+    def __init__(self, routes):
+        self.routes = routes
+
+    def __getitem__(self, destination):
+        return self.routes[destination]
+
+    def __contains__(self, destination):
+        return destination in self.routes
+
+    def __iter__(self):
+        return iter(self.routes)
+
+    def __len__(self):
+        return len(self.routes)
+
+    def get(self, destination, default=None):
+        return self.routes.get(destination, default)
+
+    def items(self):
+        return self.routes.items()
+
+
+class AddressIndex(object):
+    """Integer ids of the addresses of a network, shared by its
+    :class:`ArrayRoutingTables <.ArrayRoutingTable>`
+
+    :param list addresses: addresses of every :class:`.Host` and
+        :class:`.Router`
+    :ivar list addresses: address of each id
+    :ivar dict ids: id of each address
+    """
+    def __init__(self, addresses):
+        self.addresses = list(addresses)
+        self.ids = dict((address, i) for i, address in enumerate(self.addresses))
+
+    def __len__(self):
+        return len(self.addresses)
+
+
+class ArrayRoutingTable(MutableMapping):
+    """Routing table of routes by destination address, in NumPy arrays
+    indexed by address id
+
+    :param index: :class:`AddressIndex` of the network
+    :ivar index: :class:`AddressIndex` of the network
+    :ivar distances: float array of the distance to each address
+    :ivar next_hops: int array of the next hop id towards each address
+    :ivar present: bool array of whether each address has a route
+    :ivar bool shared: whether the arrays are shared with a snapshot
+    :ivar bool read_only: whether this is a snapshot
+    """
+    def __init__(self, index):
+        if np is None:
+            raise ImportError('ArrayRoutingTable needs NumPy')
+        self.index = index
+        self.distances = np.empty(len(index))
+        self.distances.fill(np.inf)
+        self.next_hops = np.zeros(len(index), dtype=np.int64)
+        self.present = np.zeros(len(index), dtype=bool)
+        self.shared = False
+        self.read_only = False
+
+    def __getitem__(self, destination):
+        i = self.index.ids.get(destination)
+        if i is None or not self.present[i]:
+            raise KeyError(destination)
+        return float(self.distances[i]), self.index.addresses[self.next_hops[i]]
+
+    def __setitem__(self, destination, route):
+        i = self.index.ids[destination]
+        self.write()
+        self.distances[i] = route[0]
+        self.next_hops[i] = self.index.ids[route[1]]
+        self.present[i] = True
+
+    def __delitem__(self, destination):
+        i = self.index.ids[destination]
+        if not self.present[i]:
+            raise KeyError(destination)
+        self.write()
+        self.present[i] = False
+
+    def __contains__(self, destination):
+        i = self.index.ids.get(destination)
+        return i is not None and bool(self.present[i])
+
+    def __iter__(self):
+        addresses = self.index.addresses
+        return iter([addresses[i] for i in np.flatnonzero(self.present)])
+
+    def __len__(self):
+        return int(np.count_nonzero(self.present))
+
+    def snapshot(self):
+        """Routes as they are now, which later changes do not affect
+
+        :return: read-only :class:`ArrayRoutingTable`
+        """
+        self.shared = True
+        snapshot = ArrayRoutingTable.__new__(ArrayRoutingTable)
+        snapshot.index = self.index
+        snapshot.distances = self.distances
+        snapshot.next_hops = self.next_hops
+        snapshot.present = self.present
+        snapshot.shared = True
+        snapshot.read_only = True
+        return snapshot
+
+    def write(self):
+        """Stop sharing the arrays with snapshots before a change"""
+        if self.read_only:
+            raise TypeError('Routing table snapshots cannot change')
+        if self.shared:
+            self.distances = self.distances.copy()
+            self.next_hops = self.next_hops.copy()
+            self.present = self.present.copy()
+            self.shared = False
+
+    def merge(self, table, metric, neighbor, refresh):
+        """Bellman-Ford update with the whole routing table of a neighbor
+
+        A route of `table` extended by `metric` replaces the route to the
+        same destination if it is shorter, if there is none, or, with
+        `refresh`, if the route already goes through `neighbor`.
+
+        :param table: :class:`ArrayRoutingTable` of `neighbor`, on the same
+            :class:`AddressIndex`
+        :param float metric: distance to `neighbor`
+        :param str neighbor: address of the neighbor
+        :param bool refresh: whether routes through `neighbor` follow its
+            new distances
+        :return: list of destination addresses whose next hop changed
+        """
+        n = self.index.ids[neighbor]
+        distances = table.distances + metric
+        update = table.present & ~self.present
+        update |= table.present & self.present & (distances < self.distances)
+        if refresh:
+            update |= table.present & self.present & (self.next_hops == n)
+        if not update.any():
+            return []
+        rerouted = np.flatnonzero(update & (~self.present | (self.next_hops != n)))
+        self.write()
+        self.distances[update] = distances[update]
+        self.next_hops[update] = n
+        self.present[update] = True
+        return [self.index.addresses[i] for i in rerouted]
+
+
+def shortest_routes(router, metric):
+    """Shortest routes from `router` to every reachable :class:`.Host`, by
+    Dijkstra's algorithm
+
+    Packets only pass through :class:`Routers <.Router>`, so a host ends a
+    path. Of equally short paths, the one found first, in the order of the
+    routers' links, wins.
+
+    :param router: :class:`.Router` the routes start from
+    :param str metric: distance of each :class:`.Link`, either ``'hops'``
+        for 1 or ``'delay'`` for its configured delay
+    :return: dict of (distance, next hop address) routes by destination
+        host address
+    """
+    if metric == STATIC_ROUTING_HOPS:
+        weight = lambda link: 1
+    elif metric == STATIC_ROUTING_DELAY:
+        weight = lambda link: link.delay
+    else:
+        raise ValueError('Unknown static routing metric: ' + repr(metric))
+    sequence = count()
+    queue = [(0, next(sequence), router, None)]
+    done = set()
+    routes = {}
+    while queue:
+        distance, _, actor, next_hop = heappop(queue)
+        if actor.address in done:
+            continue
+        done.add(actor.address)
+        if actor is not router and not hasattr(actor, 'links'):
+            routes[actor.address] = distance, next_hop
+            continue
+        for link in actor.links:
+            neighbor = link.destination
+            if neighbor.address not in done:
+                heappush(queue, (distance + weight(link), next(sequence), neighbor,
+                                 next_hop or neighbor.address))
+    return routes
@@ -3,31 +3,47 @@
 .. autosummary:
 
     ControlledEnvironment
+    ControlledNativeEnvironment
     Controller
 
 .. moduleauthor:: Samuel Richerd <dondiego152@gmail.com>
 .. moduleauthor:: Jan Van Bruggen <jancvanbruggen@gmail.com>
 """
+import sys
+
 from simpy.core import Environment
 
+from cs143sim import checkpoint
 from cs143sim.actors import Flow
 from cs143sim.actors import Host
 from cs143sim.actors import Link
 from cs143sim.actors import Router
+from cs143sim.casefile import compile_case
+from cs143sim.constants import BUFFER_DEFAULT_POLICY
+from cs143sim.constants import KERNEL_DEFAULT
+from cs143sim.constants import KERNEL_NATIVE
+from cs143sim.constants import KERNEL_SIMPY
+from cs143sim.constants import PACKET_TRAIN_MAX_LENGTH
+from cs143sim.constants import ROUTING_TABLE_ARRAY
+from cs143sim.constants import ROUTING_TABLE_DICT
+from cs143sim.constants import ROUTING_UPDATES_DEFAULT
+from cs143sim.constants import ROUTING_UPDATES_DELTA
+from cs143sim.constants import ROUTING_UPDATES_FULL
+from cs143sim.constants import STATIC_ROUTING_DELAY
+from cs143sim.constants import STATIC_ROUTING_HOPS
 from cs143sim.constants import OUTPUT_BUFFER_OCCUPANCY_SCALE_FACTOR
 from cs143sim.constants import OUTPUT_FLOW_RATE_SCALE_FACTOR
 from cs143sim.constants import OUTPUT_LINK_RATE_SCALE_FACTOR
-from cs143sim.constants import INPUT_FILE_RATE_SCALE_FACTOR
-from cs143sim.constants import INPUT_FILE_BUFFER_SCALE_FACTOR
-from cs143sim.constants import INPUT_FILE_DATA_SCALE_FACTOR
-from cs143sim.constants import INPUT_FILE_TIME_SCALE_FACTOR
-from cs143sim.constants import INPUT_FILE_DELAY_SCALE_FACTOR
-from cs143sim.constants import INPUT_FILE_UPDATE_SCALE_FACTOR
-from cs143sim.constants import GENERATE_ROUTER_PACKET_DEFAULT_INTERVAL
-from cs143sim.errors import InputFileSyntaxError
-from cs143sim.errors import InputFileUnknownReference
-from cs143sim.errors import MissingAttribute
-from cs143sim.events import FlowStart, RoutingTableOutdated
+from cs143sim.kernel import NativeEnvironment
+from cs143sim.packets import PacketPool
+from cs143sim.profiling import Profiler
+from cs143sim.routing import AddressIndex
+from cs143sim.routing import ArrayRoutingTable
+from cs143sim.routing import shortest_routes
+from cs143sim.events import FlowStart
+from cs143sim.telemetry import DiskSink
+from cs143sim.telemetry import RecordView
+from cs143sim.telemetry import TelemetryStore
 
 
 class ControlledEnvironment(Environment):
@@ -42,15 +58,84 @@ class ControlledEnvironment(Environment):
         self.controller = controller
 
 
+class ControlledNativeEnvironment(NativeEnvironment):
+    """:class:`~cs143sim.kernel.NativeEnvironment` with a reference to its
+    :class:`.Controller`
+
+    :param controller: :class:`.Controller` that created the
+        :class:`~cs143sim.kernel.NativeEnvironment`
+    """
+    def __init__(self, controller):
+        super(ControlledNativeEnvironment, self).__init__()
+        self.controller = controller
+
+
 class Controller:
     """Controller that prepares, starts, and cleans up a run of the simulation
 
     :param str case: path to simulation input file
-    :ivar env: SimPy simulation :class:`~simpy.core.Environment`
+    :param str buffer_policy: drop policy of every :class:`.Buffer`
+    :param str run_directory: directory to stream records to in chunks while
+        the simulation runs, or `None` to keep every record in memory
+    :param dict recording_policies: recording policy of each metric, by
+        metric name (see :class:`~cs143sim.telemetry.TelemetryStore`)
+    :param dict overrides: input file attributes to replace, as a dict of
+        object types (such as ``'LINK'``) to dicts of attributes (such as
+        ``'BUFFER'``) to values in input file units; every object of that
+        type gets the value
+    :param str kernel: event kernel, either ``'simpy'`` or ``'native'``,
+        which runs the same events in the same order with less overhead
+    :param bool packet_pool: whether hosts and flows recycle delivered data
+        packets and acknowledgements through a :class:`.PacketPool`
+    :param str routing_updates: routing update mode, either ``'full'`` or
+        ``'delta'``, in which routers only advertise changed routes between
+        periodic full refreshes
+    :param bool routing_snapshots: whether routing advertisements carry the
+        routes as they are when sent, rather than the live routing table as
+        it is when they arrive; delta mode advertisements always do
+    :param str routing_table: routing table of every :class:`.Router`,
+        either ``'dict'`` or ``'array'`` for an :class:`.ArrayRoutingTable`,
+        which needs NumPy
+    :param str static_routing: `None` for routers to find routes by
+        exchanging routing tables throughout the run, or the metric of fixed
+        shortest routes computed once after reading the case, either
+        ``'hops'`` or ``'delay'`` for configured link delay, with no routing
+        events at all
+    :param bool packet_trains: whether links into routers deliver up to
+        :data:`~cs143sim.constants.PACKET_TRAIN_MAX_LENGTH` back-to-back
+        packets of one flow together where the router forwards each as it
+        would on its own, which leaves the records unchanged (see
+        :class:`.Link`)
+    :param bool profile: whether runs count the events, wall time and queue
+        depth of every event class and actor, and print a report of them to
+        standard error at the end of each run (see :mod:`cs143sim.profiling`)
+    :param str case_cache: directory to cache compiled input files in,
+        keyed by their content and `overrides`, or `None` to parse the input
+        file every time (see :mod:`cs143sim.casefile`)
+    :ivar env: SimPy simulation :class:`~simpy.core.Environment`, or
+        :class:`~cs143sim.kernel.NativeEnvironment` with the native kernel
+    :ivar str case_cache: directory of cached compiled input files, or
+        `None`
+    :ivar str buffer_policy: drop policy of every :class:`.Buffer`
+    :ivar dict overrides: input file attributes replaced when reading the case
+    :ivar packet_pool: :class:`.PacketPool` shared by hosts and flows, or
+        `None`
+    :ivar str routing_updates: routing update mode of every :class:`.Router`
+    :ivar bool routing_snapshots: whether routing advertisements carry
+        snapshots
+    :ivar str routing_table: routing table of every :class:`.Router`
+    :ivar str static_routing: metric of static routes, or `None`
+    :ivar int train_length: largest number of packets every :class:`.Link`
+        delivers together
+    :ivar profiler: :class:`~cs143sim.profiling.Profiler` of the runs, or
+        `None`
+    :ivar float run_until: time the current run stops at, or infinity
     :ivar dict flows: all :class:`Flows <.Flow>` in the simulation
     :ivar dict hosts: all :class:`Hosts <.Host>` in the simulation
     :ivar dict links: all :class:`Links <.Link>` in the simulation
     :ivar dict routers: all :class:`Routers <.Router>` in the simulation
+    :ivar telemetry: :class:`~cs143sim.telemetry.TelemetryStore` holding all
+        records; the record attributes below are lazy views of it
     :ivar dict buffer_occupancy: buffer occupancy records for each link;
         :class:`Links <.Link>` key to lists of (time, value) tuples
     :ivar dict flow_rate: flow rate records for each flow;
@@ -64,19 +149,48 @@ class Controller:
     :ivar dict window_size: window size records for each flow;
         :class:`Flows <.Flow>` key to lists of (time, value) tuples
     """
-    def __init__(self, case='cs143sim/cases/case0.txt'):
-        self.env = ControlledEnvironment(controller=self)
+    def __init__(self, case='cs143sim/cases/case0.txt', buffer_policy=BUFFER_DEFAULT_POLICY,
+                 run_directory=None, recording_policies=None, overrides=None,
+                 kernel=KERNEL_DEFAULT, packet_pool=False,
+                 routing_updates=ROUTING_UPDATES_DEFAULT, routing_snapshots=False,
+                 routing_table=ROUTING_TABLE_DICT, static_routing=None,
+                 packet_trains=False, profile=False, case_cache=None):
+        if kernel == KERNEL_NATIVE:
+            self.env = ControlledNativeEnvironment(controller=self)
+        elif kernel == KERNEL_SIMPY:
+            self.env = ControlledEnvironment(controller=self)
+        else:
+            raise ValueError('Unknown kernel: ' + repr(kernel))
+        self.buffer_policy = buffer_policy
+        self.overrides = overrides or {}
+        self.packet_pool = PacketPool() if packet_pool else None
+        if routing_updates not in (ROUTING_UPDATES_FULL, ROUTING_UPDATES_DELTA):
+            raise ValueError('Unknown routing update mode: ' + repr(routing_updates))
+        self.routing_updates = routing_updates
+        self.routing_snapshots = routing_snapshots
+        if routing_table not in (ROUTING_TABLE_DICT, ROUTING_TABLE_ARRAY):
+            raise ValueError('Unknown routing table: ' + repr(routing_table))
+        self.routing_table = routing_table
+        if static_routing not in (None, STATIC_ROUTING_HOPS, STATIC_ROUTING_DELAY):
+            raise ValueError('Unknown static routing metric: ' + repr(static_routing))
+        self.static_routing = static_routing
+        self.train_length = PACKET_TRAIN_MAX_LENGTH if packet_trains else 1
         self.flows = {}
         self.hosts = {}
         self.links = {}
         self.routers = {}
-        self.buffer_occupancy = {}
-        self.flow_rate = {}
-        self.link_rate = {}
-        self.packet_delay = {}
-        self.packet_loss = {}
-        self.window_size = {}
+        self.telemetry = TelemetryStore(sink=DiskSink(run_directory) if run_directory else None,
+                                        policies=recording_policies)
+        self.buffer_occupancy = RecordView(self.telemetry.buffer_occupancy)
+        self.flow_rate = RecordView(self.telemetry.flow_rate)
+        self.link_rate = RecordView(self.telemetry.link_rate)
+        self.packet_delay = RecordView(self.telemetry.packet_delay)
+        self.packet_loss = RecordView(self.telemetry.packet_loss)
+        self.window_size = RecordView(self.telemetry.window_size)
+        self.profiler = Profiler(telemetry=self.telemetry) if profile else None
+        self.run_until = float('inf')
         self.algorithm = 0  # default algorithm is specified by
+        self.case_cache = case_cache
         self.read_case(case)
 
     def make_flow(self, name, source, destination, amount, start_time, algorithm):
@@ -86,15 +200,18 @@ class Controller:
         :param source: source :class:`.Host`
         :param destination: destination :class:`.Host`
         :param int amount: amount of data to transfer, in bits
-        :param float start_time: time the new :class:`.Flow` starts
+        :param float start_time: time the new :class:`.Flow` starts, which
+            is now if it has passed
         """
         new_flow = Flow(env=self.env, name=name, source=source, destination=destination,
-                        amount=amount, algorithm=algorithm)
-        source.flows.append(new_flow)
-        destination.flows.append(new_flow)
+                        amount=amount, algorithm=algorithm, packet_pool=self.packet_pool,
+                        start_time=start_time)
+        source.add_flow(new_flow)
+        destination.add_flow(new_flow)
         self.flows[name] = new_flow
+        self.telemetry.register_flow(new_flow)
         self.algorithm = algorithm
-        FlowStart(env=self.env, delay=start_time, flow=new_flow)
+        FlowStart(env=self.env, delay=max(start_time - self.env.now, 0), flow=new_flow)
 
     def make_host(self, name, ip_address):
         """Make a new :class:`.Host` and add it to `self.hosts`
@@ -102,7 +219,8 @@ class Controller:
         :param str name: new :class:`.Host` name
         :param str ip_address: new :class:`.Host`'s IP address
         """
-        new_host = Host(env=self.env, name=name, address=ip_address)
+        new_host = Host(env=self.env, name=name, address=ip_address,
+                        packet_pool=self.packet_pool)
         self.hosts[name] = new_host
 
     def make_link(self, name, source, destination, rate, delay, buffer_capacity):
@@ -116,7 +234,8 @@ class Controller:
         :param int buffer_capacity: size of receiver :class:`.Buffer`, in KB
         """
         new_link = Link(env=self.env, name=name, source=source, destination=destination,
-                        delay=delay, rate=rate, buffer_capacity=buffer_capacity)
+                        delay=delay, rate=rate, buffer_capacity=buffer_capacity,
+                        buffer_policy=self.buffer_policy, train_length=self.train_length)
         # NOTE: Each link is split into two links (one for each direction) in the read_case function
         #       and appended with 'a' or 'b' on its ID. (e.g. 'L1' becomes 'L1a' and 'L1b')
         actor = source
@@ -126,7 +245,10 @@ class Controller:
             actor.links.append(new_link)
         else:
             raise Exception('Unknown Source/Destination: ' + actor)
+        if isinstance(destination, Router):
+            destination.in_links.append(new_link)
         self.links[name] = new_link
+        self.telemetry.register_link(new_link)
 
     def make_router(self, name, ip_address, update_time):
         """Make a new :class:`.Router` and add it to `self.routers`
@@ -134,192 +256,58 @@ class Controller:
         :param str name: new :class:`.Router` name
         :param str ip_address: new :class:`.Router`'s IP Address
         """
-        new_router = Router(env=self.env, name=name, address=ip_address, update_time=int(update_time))
+        new_router = Router(env=self.env, name=name, address=ip_address, update_time=int(update_time),
+                            delta_updates=self.routing_updates == ROUTING_UPDATES_DELTA,
+                            snapshots=self.routing_snapshots)
         self.routers[name] = new_router
-        RoutingTableOutdated(env=self.env, delay=0, router=new_router)
+        if self.static_routing is None:
+            new_router.schedule_update(delay=0)
 
     def read_case(self, case):
         """Read input file at path `case` and create actors accordingly
 
+        With a case cache, an input file compiled before with the same
+        overrides is not parsed again.
+
         :param str case: path to simulation input file
         """
-        with open(case, 'rb') as case_file:
-            # Open the file for line-by-line consumption
-            obj_type = ''  # obj_type holds the current object type (LINK/HOST/Etc)
-                           # to which attributes apply
-            obj_id = ''    # obj_id is the current ID of the object
-            # These are "simple" attributes that have only 1 argument.
-            # Not included in this list is the CONNECTS attribute, which has 2 arguments,
-            #   and ID, which requires special processing.
-            attributes = ('RATE', 'DELAY', 'DATA', 'BUFFER', 'DST', 'SRC', 'START', 'IP', 'ALGORITHM', 'UPDATE')
-            # Input File Attributes:
-            # RATE - belongs to a :class:`.Link`, specifies link rate in Mbps (float)
-            # DELAY - belongs to a :class:`.Link`, specifies link delay in ms (int)
-            # DATA - belongs to a :class:`.Flow`, specifies amount of data to be transmitted in MegaBytes (int)
-            # BUFFER - belongs to a :class:`.Link`, specifies buffer size in KiloBytes (int)
-            # DST - belongs to a :class:`.Link` or :class:`.Flow`, specifies a destination (ID of destination)
-            # SRC - belongs to a :class:`.Link` or :class:`.Flow`, specifies a source (ID of source)
-            # START - belongs to a :class:`.Flow`, specifies starting time for that flow in seconds (float)
-            # IP - belongs to a :class:`.Router` or :class:`.Host`, specifies the IP address of the HOST or ROUTER (str)
-            # ALGORITHM - belongs to a :class:`.Flow`, specifies the congestion control algorithm for that flow (int)
-            # UPDATE - belongs to a :class:`.Router`, specifies the time between router table updates in ms (int)
-            # CONNECTS - belongs to a :class:`.Link`, specifies two Hosts/Routers that are connected by that link (ID ID)
-            # Note: most of the units above will be converted internally and apply only to the input file.
-            store_in = {attribute: '' for attribute in attributes}  # initialize all attributes to ''
-            line_number = 0
-            for case_line in case_file:
-                line_number += 1
-                line_comp = case_line.split()
-                if line_comp == [] and obj_id == '':
-                    obj_id = ''  # clear obj_ID and type on empty line
-                    obj_type = ''
-                    continue
-                try:
-                    # if the line is empty, just set keyword to ''
-                    keyword = line_comp[0].upper()
-                except AttributeError:
-                    keyword = ''
-                except IndexError:
-                    keyword = ''
-                if keyword == '//':
-                    continue  # ignore the comment line in the file
-                elif keyword in ['HOST', 'ROUTER', 'LINK', 'FLOW']:
-                    # if we have a valid obj type, listen for new object attributes
-                    obj_type = keyword
-                    obj_id = ''
-                elif keyword in attributes:
-                    # store simple attributes in their place in the store_in dictionary
-                    store_in[keyword] = line_comp[1]
-
-                elif keyword == 'ID' or (keyword == '' and obj_id != ''):
-                    # if we get a new ID attr (and already were working with another ID attr)
-                    # OR if we read an empty line and there was an ID we were working with
-                    # THEN
-                    # create the object in the simulation, and start a new ID
-                    if obj_id == '':
-                        obj_id = line_comp[1].upper()
-                    elif obj_type == 'LINK':
-                        # if we're getting an additional ID attribute on a LINK
-                        # make sure we have all the attributes available,
-                        # then create the link object
-                        for attribute in ['BUFFER', 'DELAY', 'RATE', 'SRC', 'DST']:
-                            if store_in[attribute] in ['', []]:
-                                # Make sure all the attributes are not empty
-                                raise MissingAttribute(obj_type=obj_type, obj_id=obj_id,
-                                                       missing_attr=attribute)
-                        # If all the attributes are present, create the object
-                        the_src = ''  # temp variables that will point to src/dst instances
-                        the_dst = ''
-                        # Enforce referential integrity (aka check that the specified
-                        # hosts/routers actually exist in the simulation)
-                        for target in [store_in['SRC'], store_in['DST']]:
-                            if target in self.hosts:
-                                if the_src == '':
-                                    the_src = self.hosts[target]
-                                else:
-                                    the_dst = self.hosts[target]
-                            elif target in self.routers:
-                                if the_src == '':
-                                    the_src = self.routers[target]
-                                else:
-                                    the_dst = self.routers[target]
-                            else:
-                                raise InputFileUnknownReference(line_number, target +
-                                                                ' is not a valid Host/Router.')
-                        self.make_link(name=obj_id + 'a', source=the_src, destination=the_dst,
-                                       rate=float(store_in['RATE']) * INPUT_FILE_RATE_SCALE_FACTOR,
-                                       delay=float(store_in['DELAY']) * INPUT_FILE_DELAY_SCALE_FACTOR,
-                                       buffer_capacity=int(store_in['BUFFER']) * INPUT_FILE_BUFFER_SCALE_FACTOR)
-
-                        # Links are split into two, one for each direction (so that they are full-duplex).
-                        self.make_link(name=obj_id + 'b', source=the_dst, destination=the_src,
-                                       rate=float(store_in['RATE']) * INPUT_FILE_RATE_SCALE_FACTOR,
-                                       delay=float(store_in['DELAY']) * INPUT_FILE_DELAY_SCALE_FACTOR,
-                                       buffer_capacity=int(store_in['BUFFER']) * INPUT_FILE_BUFFER_SCALE_FACTOR)
-                                       # convert into bits
-                    elif obj_type == 'HOST':
-                        # check the attribute(s) (there's only one for HOSTS so far: IP)
-                        for attribute in ['IP']:
-                            if store_in[attribute] in ['', []]:
-                                # Make sure all the attributes are not empty
-                                raise MissingAttribute(obj_type=obj_type, obj_id=obj_id,
-                                                       missing_attr=attribute)
-                        self.make_host(name=obj_id, ip_address=store_in['IP'])
-
-                    elif obj_type == 'ROUTER':
-                        # check the attribute(s) (only one so far: IP), UPDATE is not mandatory.
-                        for attribute in ['IP', 'UPDATE']:
-                            if store_in[attribute] in ['', []]:
-                                if attribute == 'UPDATE':
-                                    # Just set update to a default value
-                                    store_in[attribute] = GENERATE_ROUTER_PACKET_DEFAULT_INTERVAL
-                                else:
-                                    raise MissingAttribute(obj_type=obj_type, obj_id=obj_id,
-                                                           missing_attr=attribute)
-                        self.make_router(name=obj_id, ip_address=store_in['IP'],
-                                         update_time=store_in['UPDATE'] * INPUT_FILE_UPDATE_SCALE_FACTOR)
-
-                    elif obj_type == 'FLOW':
-                        for attribute in ['SRC', 'DST', 'START', 'DATA', 'ALGORITHM']:
-                            if store_in[attribute] in ['', []]:
-                                if attribute == 'ALGORITHM':
-                                    store_in[attribute] = 0
-                                else:
-                                    raise MissingAttribute(obj_type=obj_type, obj_id=obj_id,
-                                                           missing_attr=attribute)
-                        # if all the attributes are there, lets go ahead and create the flow
-                        # BUT FIRST, we need to make sure the SRC/DST hosts actually exist..
-                        # if they don't, warn the user that "No, i'm sorry, you have to specify
-                        # hosts that actually exist."
-                        try:
-                            self.make_flow(name=obj_id, source=self.hosts[store_in['SRC']],
-                                           destination=self.hosts[store_in['DST']],
-                                           amount=int(store_in['DATA']) * INPUT_FILE_DATA_SCALE_FACTOR,
-                                           start_time=float(store_in['START']) * INPUT_FILE_TIME_SCALE_FACTOR,
-                                           algorithm=int(store_in['ALGORITHM']))
-
-                        except KeyError as e:
-                            raise InputFileUnknownReference(line_number=line_number,
-                                                            message='Input File Formatting Error: ' +
-                                                            'Reference to unknown object: ' + repr(e))
-                    else:
-                        # Unexpected ID attribute (out of context of an object Type)
-                        raise InputFileSyntaxError(line_number=line_number,
-                                                   message='Unexpected "ID" attribute.')
-                    if keyword == 'ID':
-                        obj_id = line_comp[1].upper()
-                    else:
-                        obj_id = ''
-                        obj_type = ''
-                elif keyword == 'CONNECTS':
-                    if obj_type == 'LINK':
-                        store_in['SRC'] = line_comp[1].upper()
-                        store_in['DST'] = line_comp[2].upper()
-                    else:
-                        raise InputFileSyntaxError(line_number=line_number,
-                                                   message='Input File Formatting Error: ' +
-                                                           'CONNECTS attribute formatted incorrectly.\n' +
-                                                           'Expects: CONNECTS A B')
-                else:
-                    raise InputFileSyntaxError(line_number=line_number,
-                                               message='Unrecognized keyword: ' + keyword)
-        all_host_ip_addresses = [host.address for host in self.hosts.values()]
-        assert len(all_host_ip_addresses) > 0
-        for router in self.routers.values():
-            router.initialize_routing_table(all_host_ip_addresses=all_host_ip_addresses)
+        self.build_case(compile_case(case=case, overrides=self.overrides,
+                                     cache_directory=self.case_cache))
 
-    def record(self, recorder, actor, value):
-        """Record the time and `value` in the recorder keyed by the `actor`
+    def build_case(self, compiled):
+        """Create the actors of a compiled input file
 
-        :param dict recorder: recorder to record the change
-        :param actor: :class:`.Actor` that experienced the change
-        :param value: new value of changed quantity
+        :param compiled: :class:`~cs143sim.casefile.CompiledCase`
         """
-        entry = (self.env.now, value)
-        try:
-            recorder[actor].append(entry)
-        except KeyError:
-            recorder[actor] = [entry]
+        for compiled_object in compiled.objects:
+            obj_type = compiled_object[0]
+            if obj_type == 'HOST':
+                self.make_host(*compiled_object[1:])
+            elif obj_type == 'ROUTER':
+                self.make_router(*compiled_object[1:])
+            elif obj_type == 'LINK':
+                name, source, destination = compiled_object[1:4]
+                ends = [self.hosts[end] if end in self.hosts else self.routers[end]
+                        for end in (source, destination)]
+                self.make_link(name, ends[0], ends[1], *compiled_object[4:])
+            else:
+                name, source, destination = compiled_object[1:4]
+                self.make_flow(name, self.hosts[source], self.hosts[destination],
+                               *compiled_object[4:])
+        all_host_ip_addresses = [host.address for host in self.hosts.values()]
+        assert len(all_host_ip_addresses) > 0
+        if self.routing_table == ROUTING_TABLE_ARRAY:
+            index = AddressIndex(all_host_ip_addresses +
+                                 [router.address for router in self.routers.values()])
+            for router in self.routers.values():
+                router.table = ArrayRoutingTable(index=index)
+        for router in self.routers.values():
+            if self.static_routing is None:
+                routes = None
+            else:
+                routes = shortest_routes(router=router, metric=self.static_routing)
+            router.initialize_routing_table(all_host_ip_addresses=all_host_ip_addresses,
+                                            routes=routes)
 
     def record_buffer_occupancy(self, link, buffer_occupancy):
         """Record the occupancy of a link buffer
@@ -327,8 +315,8 @@ class Controller:
         :param link: :class:`.Link` changing its buffer occupancy
         :param float buffer_occupancy: new buffer occupancy (bytes)
         """
-        self.record(recorder=self.buffer_occupancy, actor=link,
-                    value=buffer_occupancy * OUTPUT_BUFFER_OCCUPANCY_SCALE_FACTOR)
+        self.telemetry.buffer_occupancy[link].append(
+            self.env.now, buffer_occupancy * OUTPUT_BUFFER_OCCUPANCY_SCALE_FACTOR)
 
     def record_flow_rate(self, flow, packet_size):
         """Record the size of a delivered packet
@@ -336,17 +324,19 @@ class Controller:
         :param flow: :class:`.Flow` to which the delivered packet belongs
         :param float packet_size: size of the delivered packet (bits)
         """
-        self.record(recorder=self.flow_rate, actor=flow,
-                    value=packet_size * OUTPUT_FLOW_RATE_SCALE_FACTOR)
+        self.telemetry.flow_rate[flow].append(
+            self.env.now, packet_size * OUTPUT_FLOW_RATE_SCALE_FACTOR)
 
-    def record_link_rate(self, link, packet_size):
+    def record_link_rate(self, link, packet_size, time=None):
         """Record the duration a link sends a packet
 
         :param link: :class:`.Link` sending the packet
         :param float packet_size: size of the delivered packet (bits)
+        :param float time: time the link starts sending the packet, if
+            later than now, as in a packet train
         """
-        self.record(recorder=self.link_rate, actor=link,
-                    value=packet_size * OUTPUT_LINK_RATE_SCALE_FACTOR)
+        self.telemetry.link_rate[link].append(
+            self.env.now if time is None else time, packet_size * OUTPUT_LINK_RATE_SCALE_FACTOR)
 
     def record_packet_delay(self, flow, packet_delay):
         """Record the delay of a delivered packet
@@ -354,14 +344,14 @@ class Controller:
         :param flow: :class:`.Flow` to which the delivered packet belongs
         :param int packet_delay: time since the delivered packet was sent (ms)
         """
-        self.record(recorder=self.packet_delay, actor=flow, value=packet_delay)
+        self.telemetry.packet_delay[flow].append(self.env.now, packet_delay)
 
     def record_packet_loss(self, link):
         """Record a packet loss
 
         :param link: :class:`.Link` that dropped the packet
         """
-        self.record(recorder=self.packet_loss, actor=link, value=None)
+        self.telemetry.packet_loss[link].append(self.env.now)
 
     def record_window_size(self, flow, window_size):
         """Record the flow's window size
@@ -369,11 +359,46 @@ class Controller:
         :param flow: :class:`.Flow` changing its window size
         :param int window_size: new window size
         """
-        self.record(recorder=self.window_size, actor=flow, value=window_size)
+        self.telemetry.window_size[flow].append(self.env.now, window_size)
 
     def run(self, until=None):
         """Run the simulation for a specified duration
 
+        Recording policies store what they have pending up to the end of the
+        run, and with a run directory, every record is on disk when this
+        returns. With profiling, the report follows.
+
         :param float until: simulation duration
         """
-        self.env.run(until=until)
+        self.run_until = float('inf') if until is None else until
+        if self.profiler is None:
+            self.env.run(until=until)
+        else:
+            self.profiler.run(env=self.env, until=until)
+        self.telemetry.finish(self.env.now)
+        self.telemetry.flush()
+        if self.profiler is not None:
+            sys.stderr.write(self.profiler.report() + '\n')
+
+    def checkpoint(self, path):
+        """Save the state of the simulation between runs to a file, from
+        which :meth:`restore` continues it (see :mod:`cs143sim.checkpoint`)
+
+        :param str path: checkpoint file to write
+        """
+        checkpoint.save(controller=self, path=path)
+
+    @staticmethod
+    def restore(path, run_directory=None):
+        """Continue a simulation saved by :meth:`checkpoint`
+
+        Each restored controller is independent, so several can fork from one
+        checkpoint, for instance after adding a flow with :meth:`make_flow`
+        or changing a link.
+
+        :param str path: checkpoint file
+        :param str run_directory: new run directory for the records of a
+            simulation that streams them to disk, or `None` to keep its own
+        :return: restored :class:`.Controller`
+        """
+        return checkpoint.load(path=path, run_directory=run_directory)
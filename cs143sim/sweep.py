@@ -0,0 +1,142 @@
+"""This module runs one case over a grid of parameters on a process pool.
+
+Each grid point gets its own :class:`~cs143sim.simulation.Controller` in a
+worker process; a point that fails reports its error without stopping the
+others, and results come back in grid order whichever worker finishes first.
+
+.. autosummary::
+
+    grid_points
+    run_point
+    summarize
+    sweep
+    write_table
+
+.. moduleauthor:: Jan Van Bruggen <jancvanbruggen@gmail.com>
+"""
+import csv
+import traceback
+from itertools import product
+from multiprocessing import Pool
+from timeit import default_timer
+
+from cs143sim.simulation import Controller
+
+
+PARAMETERS = {'algorithm': ('FLOW', 'ALGORITHM'),
+              'rate': ('LINK', 'RATE'),
+              'delay': ('LINK', 'DELAY'),
+              'buffer': ('LINK', 'BUFFER'),
+              'update': ('ROUTER', 'UPDATE')}
+"""Sweepable input file attributes, by parameter name, as (object type,
+attribute) tuples; ``duration`` (in seconds) can be swept as well"""
+
+SUMMARY_METRICS = ('throughput', 'packet_loss', 'mean_packet_delay', 'mean_window_size',
+                   'completed_flows', 'wall_time')
+"""Columns of the summary of every grid point"""
+
+
+def grid_points(grid):
+    """List every combination of the values in `grid`
+
+    Parameters vary in alphabetical order, the last one fastest, and values
+    in the order given.
+
+    :param dict grid: lists of values, by parameter name
+    :return: list of dicts of one value per parameter
+    """
+    names = sorted(grid)
+    for name in names:
+        if name not in PARAMETERS and name != 'duration':
+            raise ValueError('Unknown sweep parameter: ' + repr(name))
+    return [dict(zip(names, values)) for values in product(*[grid[name] for name in names])]
+
+
+def summarize(controller, duration):
+    """Summary metrics of a finished run
+
+    :param controller: :class:`~cs143sim.simulation.Controller` that ran
+    :param float duration: simulation duration, in ms
+    :return: dict of :data:`SUMMARY_METRICS` except ``wall_time``: total
+        delivered rate in Mbps, packets lost, mean packet delay in ms, mean
+        recorded window size and number of flows that delivered all data
+    """
+    telemetry = controller.telemetry
+    delivered = sum(sum(probe.series.columns()[1]) for probe in telemetry.flow_rate.values())
+    lost = sum(len(probe.series) for probe in telemetry.packet_loss.values())
+    delays = [value for probe in telemetry.packet_delay.values()
+              for value in probe.series.columns()[1]]
+    windows = [value for probe in telemetry.window_size.values()
+               for value in probe.series.columns()[1]]
+    completed = sum(1 for flow in controller.flows.values()
+                    if flow.tla.transmitter_acked >= flow.tla.packet_number)
+    return {'throughput': delivered / duration,
+            'packet_loss': lost,
+            'mean_packet_delay': sum(delays) / len(delays) if delays else None,
+            'mean_window_size': sum(windows) / len(windows) if windows else None,
+            'completed_flows': completed}
+
+
+def run_point(job):
+    """Simulate one grid point; runs in a worker process
+
+    :param tuple job: index of the point, case path, point, default
+        duration in seconds and case cache directory
+    :return: (index, point, summary, error) tuple, where either the summary
+        or the error traceback is `None`
+    """
+    index, case, point, duration, case_cache = job
+    try:
+        overrides = {}
+        for name, value in point.items():
+            if name in PARAMETERS:
+                object_type, attribute = PARAMETERS[name]
+                overrides.setdefault(object_type, {})[attribute] = value
+        duration = float(point.get('duration', duration)) * 1000
+        start = default_timer()
+        controller = Controller(case=case, overrides=overrides, case_cache=case_cache)
+        controller.run(until=duration)
+        summary = summarize(controller, duration)
+        summary['wall_time'] = default_timer() - start
+        return index, point, summary, None
+    except Exception:
+        return index, point, None, traceback.format_exc()
+
+
+def sweep(case, grid, duration=10, processes=None, case_cache=None):
+    """Simulate `case` at every point of `grid`
+
+    :param str case: path to the base simulation input file
+    :param dict grid: lists of values, by parameter name, in input file units
+    :param float duration: simulation duration in seconds, unless swept
+    :param int processes: number of worker processes; defaults to the number
+        of CPUs
+    :param str case_cache: directory to cache compiled input files in, so
+        that points with the same input file attributes parse it once
+    :return: list of (point, summary, error) tuples in :func:`grid_points`
+        order
+    """
+    jobs = [(index, case, point, duration, case_cache) for index, point in enumerate(grid_points(grid))]
+    pool = Pool(processes=processes, maxtasksperchild=1)
+    try:
+        results = sorted(pool.imap_unordered(run_point, jobs))
+    finally:
+        pool.close()
+        pool.join()
+    return [(point, summary, error) for _, point, summary, error in results]
+
+
+def write_table(results, table_file):
+    """Write sweep results as CSV, one row per grid point
+
+    :param list results: results of :func:`sweep`
+    :param table_file: file object to write to
+    """
+    names = sorted(set(name for point, _, _ in results for name in point))
+    writer = csv.writer(table_file)
+    writer.writerow(names + list(SUMMARY_METRICS) + ['error'])
+    for point, summary, error in results:
+        summary = summary or {}
+        error = error.strip().splitlines()[-1] if error else ''
+        writer.writerow([point.get(name) for name in names] +
+                        [summary.get(metric) for metric in SUMMARY_METRICS] + [error])
@@ -0,0 +1,686 @@
+"""This module contains the telemetry store behind :class:`.Controller`
+records.
+
+.. autosummary::
+
+    Series
+    EventSeries
+    RecordAll
+    Coalesce
+    OnChange
+    SampleEvery
+    TimeAverage
+    Total
+    Probes
+    RecordView
+    DiskSink
+    TelemetryStore
+
+.. moduleauthor:: Jan Van Bruggen <jancvanbruggen@gmail.com>
+"""
+import atexit
+import json
+import os
+import shutil
+import sys
+from array import array
+from collections import MutableMapping
+from copy import copy
+from Queue import Queue
+from threading import Thread
+
+from cs143sim.constants import TELEMETRY_CHUNK_SIZE
+from cs143sim.constants import TELEMETRY_QUEUE_SIZE
+
+
+LINK_METRICS = ('buffer_occupancy', 'link_rate', 'packet_loss')
+"""Metrics recorded for every :class:`.Link`"""
+
+FLOW_METRICS = ('flow_rate', 'packet_delay', 'window_size')
+"""Metrics recorded for every :class:`.Flow`"""
+
+MANIFEST_FILE_NAME = 'manifest.json'
+"""Name of the file describing the chunks in a :class:`DiskSink` directory"""
+
+
+def actor_name(actor):
+    """Name under which the records of `actor` are stored on disk
+
+    :param actor: :class:`.Actor` being recorded
+    """
+    return getattr(actor, 'name', None) or str(id(actor))
+
+
+class Series(object):
+    """Time series of one metric for one actor
+
+    Times and values are kept in two typed ``array('d')`` columns instead of
+    a list of tuples, so an entry costs 16 bytes and no allocation. With a
+    :class:`DiskSink`, full columns are handed to the sink and only the
+    latest chunk stays in memory.
+
+    :param str metric: name of the recorded metric
+    :param str name: name of the recorded actor
+    :param sink: :class:`DiskSink` that stores full chunks, or `None`
+    :ivar times: record times of the in-memory chunk, in ms
+    :ivar values: recorded values of the in-memory chunk
+    :ivar list spilled: lengths of the chunks handed to `sink`
+    """
+    column_count = 2
+
+    def __init__(self, metric=None, name=None, sink=None):
+        self.times = array('d')
+        self.values = array('d')
+        self.metric = metric
+        self.name = name
+        self.sink = sink
+        self.spilled = []
+        self.chunk_size = sink.chunk_size if sink else float('inf')
+
+    def __len__(self):
+        return sum(self.spilled) + len(self.times)
+
+    @property
+    def series(self):
+        """The series itself, which serves as its own probe when every entry
+        is recorded
+        """
+        return self
+
+    def finish(self, time):
+        """Nothing is ever pending in a bare series
+
+        :param float time: current time, in ms
+        """
+
+    def append(self, time, value):
+        """Append an entry
+
+        :param float time: record time, in ms
+        :param float value: recorded value
+        """
+        self.times.append(time)
+        self.values.append(value)
+        if len(self.times) >= self.chunk_size:
+            self.spill()
+
+    def extend(self, records):
+        """Append (time, value) tuples
+
+        :param records: iterable of (time, value) tuples
+        """
+        for time, value in records:
+            self.append(time, value)
+
+    def spill(self):
+        """Hand the in-memory chunk to `sink` and start a new one"""
+        if self.sink is None or not self.times:
+            return
+        self.sink.write(self.metric, self.name, len(self.spilled), self.chunk())
+        self.spilled.append(len(self.times))
+        self.times = array('d')
+        if self.values is not None:
+            self.values = array('d')
+
+    def chunk(self):
+        """Columns of the in-memory chunk"""
+        return [self.times, self.values]
+
+    def columns(self):
+        """All times and values, including spilled chunks"""
+        if not self.spilled:
+            return self.times, self.values
+        chunks = self.sink.read(self.metric, self.name, self.column_count, self.spilled)
+        chunks.append(self.chunk())
+        times = array('d')
+        values = array('d')
+        for chunk in chunks:
+            times.extend(chunk[0])
+            values.extend(chunk[1])
+        return times, values
+
+    def records(self):
+        """List of (time, value) tuples, as :class:`.Controller` used to
+        store them
+        """
+        return zip(*self.columns())
+
+
+class EventSeries(Series):
+    """Time series of a metric that records only that something happened,
+    such as a packet loss
+
+    Entries carry a time and no value; :meth:`records` reports the value as
+    `None`.
+    """
+    column_count = 1
+
+    def __init__(self, metric=None, name=None, sink=None):
+        super(EventSeries, self).__init__(metric=metric, name=name, sink=sink)
+        self.values = None
+
+    def append(self, time, value=None):
+        self.times.append(time)
+        if len(self.times) >= self.chunk_size:
+            self.spill()
+
+    def chunk(self):
+        return [self.times]
+
+    def columns(self):
+        if not self.spilled:
+            return self.times, None
+        times = array('d')
+        for chunk in self.sink.read(self.metric, self.name, self.column_count, self.spilled):
+            times.extend(chunk[0])
+        times.extend(self.times)
+        return times, None
+
+    def records(self):
+        return [(time, None) for time in self.columns()[0]]
+
+
+class RecordAll(object):
+    """Recording policy that stores every entry"""
+    def probe(self, series):
+        """Make the recorder of one actor for this policy
+
+        :param series: :class:`Series` that receives the recorded entries
+        """
+        return series
+
+
+class RecordingPolicy(object):
+    """Base of the recording policies that filter or aggregate entries
+    before they reach a :class:`Series`
+
+    A policy given to :class:`TelemetryStore` is a prototype; :meth:`probe`
+    copies it for every recorded actor. Subclasses set their per-actor state
+    in :meth:`reset`, decide what to store in :meth:`append`, and store what
+    is still pending in :meth:`finish`.
+
+    :ivar series: :class:`Series` of the recorded actor
+    """
+    series = None
+
+    def probe(self, series):
+        """Make the recorder of one actor for this policy
+
+        :param series: :class:`Series` that receives the recorded entries
+        """
+        probe = copy(self)
+        probe.series = series
+        probe.reset()
+        return probe
+
+    def reset(self):
+        """Clear the per-actor state"""
+
+    def append(self, time, value):
+        """Offer an entry to the policy
+
+        :param float time: record time, in ms
+        :param float value: recorded value
+        """
+        raise NotImplementedError
+
+    def finish(self, time):
+        """Store what is pending up to `time`
+
+        :param float time: current time, in ms
+        """
+
+
+class Coalesce(RecordingPolicy):
+    """Recording policy that stores one entry per timestamp
+
+    :param str combine: ``'last'`` keeps the last value recorded at a time,
+        as suits levels such as buffer occupancy; ``'sum'`` adds them up, as
+        suits flow and link rates
+    """
+    def __init__(self, combine='last'):
+        if combine not in ('last', 'sum'):
+            raise ValueError('Unknown combination: ' + repr(combine))
+        self.combine = combine
+
+    def reset(self):
+        self.pending_time = None
+        self.pending_value = 0
+
+    def append(self, time, value):
+        if time == self.pending_time:
+            if self.combine == 'sum':
+                self.pending_value += value
+            else:
+                self.pending_value = value
+            return
+        if self.pending_time is not None:
+            self.series.append(self.pending_time, self.pending_value)
+        self.pending_time = time
+        self.pending_value = value
+
+    def finish(self, time):
+        if self.pending_time is not None:
+            self.series.append(self.pending_time, self.pending_value)
+            self.pending_time = None
+
+
+class OnChange(RecordingPolicy):
+    """Recording policy that stores an entry only when the value differs from
+    the last stored one
+    """
+    def reset(self):
+        self.last_value = None
+
+    def append(self, time, value):
+        if value != self.last_value:
+            self.series.append(time, value)
+            self.last_value = value
+
+
+class SampleEvery(RecordingPolicy):
+    """Recording policy that stores the value in effect every `interval` ms
+
+    Samples are taken at multiples of `interval`, starting with the first
+    multiple at or after the first entry.
+
+    :param float interval: sampling period, in ms
+    """
+    def __init__(self, interval):
+        self.interval = interval
+
+    def reset(self):
+        self.next_time = None
+        self.value = None
+
+    def advance(self, time):
+        """Store the samples due before `time`"""
+        while self.next_time < time:
+            self.series.append(self.next_time, self.value)
+            self.next_time += self.interval
+
+    def append(self, time, value):
+        if self.next_time is None:
+            self.next_time = -(-time // self.interval) * self.interval
+        else:
+            self.advance(time)
+        self.value = value
+
+    def finish(self, time):
+        if self.next_time is None:
+            return
+        self.advance(time)
+        if self.next_time == time:
+            self.series.append(self.next_time, self.value)
+            self.next_time += self.interval
+
+
+class TimeAverage(RecordingPolicy):
+    """Recording policy that stores the time-weighted average of the value
+    over every `interval` ms
+
+    The average over ``[k * interval, (k + 1) * interval)`` is stored at
+    time ``k * interval`` once the interval is over, as ``run.py`` smooths
+    levels. The value before the first entry is `initial`.
+
+    :param float interval: averaging period, in ms
+    :param float initial: value before the first entry
+    """
+    def __init__(self, interval, initial=0.0):
+        self.interval = interval
+        self.initial = initial
+
+    def reset(self):
+        self.start = 0.0
+        self.last_time = 0.0
+        self.value = self.initial
+        self.area = 0.0
+
+    def advance(self, time):
+        """Integrate the value up to `time`, storing finished intervals"""
+        end = self.start + self.interval
+        while time >= end:
+            self.area += self.value * (end - self.last_time)
+            self.series.append(self.start, self.area / self.interval)
+            self.start = self.last_time = end
+            self.area = 0.0
+            end += self.interval
+        self.area += self.value * (time - self.last_time)
+        self.last_time = time
+
+    def append(self, time, value):
+        self.advance(time)
+        self.value = value
+
+    def finish(self, time):
+        self.advance(time)
+
+
+class Total(TimeAverage):
+    """Recording policy that stores the sum of the values recorded in every
+    `interval` ms, for rates that ``run.py`` bins by summing
+
+    The sum over ``[k * interval, (k + 1) * interval)`` is stored at time
+    ``k * interval`` once the interval is over.
+
+    :param float interval: summing period, in ms
+    """
+    def __init__(self, interval):
+        super(Total, self).__init__(interval=interval)
+
+    def advance(self, time):
+        end = self.start + self.interval
+        while time >= end:
+            self.series.append(self.start, self.area)
+            self.start = end
+            self.area = 0.0
+            end += self.interval
+
+    def append(self, time, value):
+        self.advance(time)
+        self.area += value
+
+
+class Probes(dict):
+    """Mapping of actors to their probes for one metric
+
+    A probe is what records an actor's entries: its :class:`Series` when the
+    policy is :class:`RecordAll`, otherwise a copy of the policy feeding the
+    series. Actors are registered when they are created, so recording is a
+    dict lookup and an append. Looking up an unregistered actor registers
+    it.
+
+    :param str metric: name of the recorded metric
+    :param series_class: :class:`Series` subclass created for new actors
+    :param sink: :class:`DiskSink` given to new series, or `None`
+    :param policy: recording policy, :class:`RecordAll` by default
+    """
+    def __init__(self, metric=None, series_class=Series, sink=None, policy=None):
+        super(Probes, self).__init__()
+        self.metric = metric
+        self.series_class = series_class
+        self.sink = sink
+        self.policy = policy or RecordAll()
+        if series_class is EventSeries and not isinstance(self.policy, RecordAll):
+            raise ValueError(repr(metric) + ' records no values, so every entry must be recorded')
+
+    def __missing__(self, actor):
+        probe = self[actor] = self.policy.probe(self.new_series(actor))
+        return probe
+
+    def new_series(self, actor):
+        """Make an empty :class:`Series` for `actor`, without registering it
+
+        :param actor: :class:`.Actor` to record
+        """
+        return self.series_class(metric=self.metric, name=actor_name(actor), sink=self.sink)
+
+    def register(self, actor):
+        """Create the probe of `actor` if it does not exist yet
+
+        :param actor: :class:`.Actor` to record
+        :return: the probe of `actor`
+        """
+        return self[actor]
+
+    def finish(self, time):
+        """Store what every probe has pending up to `time`
+
+        :param float time: current time, in ms
+        """
+        for probe in self.values():
+            probe.finish(time)
+
+
+class RecordView(MutableMapping):
+    """Dict-like view of a :class:`Probes` as lists of (time, value) tuples
+
+    Actors without any entries are hidden, and the tuples are only built
+    when an actor's records are read.
+
+    :param probes: :class:`Probes` to view
+    """
+    def __init__(self, probes):
+        self.probes = probes
+
+    def __getitem__(self, actor):
+        probe = self.probes.get(actor)
+        if probe is None or not probe.series:
+            raise KeyError(actor)
+        return probe.series.records()
+
+    def __setitem__(self, actor, records):
+        series = self.probes.new_series(actor)
+        series.extend(records)
+        self.probes[actor] = self.probes.policy.probe(series)
+
+    def __delitem__(self, actor):
+        del self.probes[actor]
+
+    def __iter__(self):
+        return (actor for actor, probe in self.probes.items() if probe.series)
+
+    def __len__(self):
+        return sum(1 for probe in self.probes.values() if probe.series)
+
+
+class DiskSink(object):
+    """Writer of full :class:`Series` chunks to a run directory
+
+    A background thread writes the chunks it receives through a bounded
+    queue, so recording only blocks when the writer falls `queue_size`
+    chunks behind. Chunk ``<index>`` of a series is stored at
+    ``<directory>/<metric>/<actor name>/<index>.bin`` as its columns one
+    after the other, in native-endian float64, and can be memory-mapped with
+    :func:`map_chunk`. :data:`MANIFEST_FILE_NAME` lists every chunk.
+
+    :param str directory: run directory, created if needed
+    :param int chunk_size: number of entries per chunk
+    :param int queue_size: number of chunks waiting to be written before
+        recording blocks
+    :ivar dict manifest: chunks written so far, as nested dicts of metric,
+        then actor name, to a dict of column count and chunk lengths
+    """
+    def __init__(self, directory, chunk_size=TELEMETRY_CHUNK_SIZE,
+                 queue_size=TELEMETRY_QUEUE_SIZE):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.manifest = {}
+        self.error = None
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.start(queue_size)
+
+    def __getstate__(self):
+        self.sync()
+        state = dict(self.__dict__)
+        state['queue_size'] = self.queue.maxsize
+        del state['queue']
+        del state['writer']
+        return state
+
+    def __setstate__(self, state):
+        queue_size = state.pop('queue_size')
+        self.__dict__.update(state)
+        self.start(queue_size)
+
+    def start(self, queue_size):
+        """Start the writer thread
+
+        :param int queue_size: number of chunks waiting to be written before
+            recording blocks
+        """
+        self.queue = Queue(maxsize=queue_size)
+        self.writer = Thread(target=self.work, name='DiskSink ' + self.directory)
+        self.writer.daemon = True
+        self.writer.start()
+        atexit.register(self.close)
+
+    def relocate(self, directory):
+        """Copy every chunk written so far to `directory` and write there
+        from now on
+
+        :param str directory: new run directory, which must not exist yet
+        """
+        self.sync()
+        shutil.copytree(self.directory, directory)
+        self.directory = directory
+
+    def path(self, metric, name, index):
+        """Path of chunk `index` of a series
+
+        :param str metric: name of the recorded metric
+        :param str name: name of the recorded actor
+        :param int index: chunk number
+        """
+        return os.path.join(self.directory, metric, name, '%06d.bin' % index)
+
+    def write(self, metric, name, index, chunk):
+        """Queue chunk `index` of a series for writing
+
+        :param str metric: name of the recorded metric
+        :param str name: name of the recorded actor
+        :param int index: chunk number
+        :param list chunk: columns of the chunk, as ``array('d')``
+        """
+        self.check()
+        entry = self.manifest.setdefault(metric, {}).setdefault(
+            name, {'columns': len(chunk), 'lengths': []})
+        del entry['lengths'][index:]
+        entry['lengths'].append(len(chunk[0]))
+        self.queue.put((self.path(metric, name, index), chunk))
+
+    def work(self):
+        """Write queued chunks until `None` is queued; runs in `writer`"""
+        while True:
+            job = self.queue.get()
+            try:
+                if job is None:
+                    return
+                path, chunk = job
+                folder = os.path.dirname(path)
+                if not os.path.isdir(folder):
+                    os.makedirs(folder)
+                with open(path, 'wb') as chunk_file:
+                    for column in chunk:
+                        column.tofile(chunk_file)
+            except Exception as error:
+                self.error = error
+            finally:
+                self.queue.task_done()
+
+    def check(self):
+        """Raise the error the writer thread hit, if any"""
+        if self.error is not None:
+            raise self.error
+
+    def sync(self):
+        """Wait for every queued chunk to be written and update the
+        manifest
+        """
+        self.queue.join()
+        self.check()
+        with open(os.path.join(self.directory, MANIFEST_FILE_NAME), 'w') as manifest_file:
+            json.dump({'byteorder': sys.byteorder, 'dtype': 'float64',
+                       'metrics': self.manifest}, manifest_file, indent=1, sort_keys=True)
+
+    def read(self, metric, name, columns, lengths):
+        """Read back the spilled chunks of a series
+
+        :param str metric: name of the recorded metric
+        :param str name: name of the recorded actor
+        :param int columns: number of columns per chunk
+        :param list lengths: length of every chunk
+        :return: list of chunks, each a list of ``array('d')`` columns
+        """
+        self.sync()
+        chunks = []
+        for index, length in enumerate(lengths):
+            with open(self.path(metric, name, index), 'rb') as chunk_file:
+                chunk = []
+                for _ in range(columns):
+                    column = array('d')
+                    column.fromfile(chunk_file, length)
+                    chunk.append(column)
+                chunks.append(chunk)
+        return chunks
+
+    def close(self):
+        """Write everything queued and stop the writer thread"""
+        if self.writer.is_alive():
+            self.sync()
+            self.queue.put(None)
+            self.writer.join()
+
+
+def map_chunk(path, columns=2):
+    """Memory-map a chunk written by :class:`DiskSink`
+
+    Requires NumPy.
+
+    :param str path: chunk file
+    :param int columns: number of columns in the chunk
+    :return: read-only array of shape (`columns`, length)
+    """
+    import numpy
+    return numpy.memmap(path, dtype=numpy.float64, mode='r').reshape(columns, -1)
+
+
+class TelemetryStore(object):
+    """All :class:`Series` of a simulation, grouped by metric
+
+    Each metric in :data:`LINK_METRICS` and :data:`FLOW_METRICS` is an
+    attribute holding its :class:`Probes`.
+
+    :param sink: :class:`DiskSink` that stores full chunks, or `None` to
+        keep every record in memory
+    :param dict policies: recording policy of each metric, by metric name;
+        metrics left out use :class:`RecordAll`
+    """
+    def __init__(self, sink=None, policies=None):
+        policies = policies or {}
+        for metric in policies:
+            if metric not in LINK_METRICS + FLOW_METRICS:
+                raise ValueError('Unknown metric: ' + repr(metric))
+        self.sink = sink
+        self.buffer_occupancy = Probes('buffer_occupancy', sink=sink,
+                                       policy=policies.get('buffer_occupancy'))
+        self.flow_rate = Probes('flow_rate', sink=sink, policy=policies.get('flow_rate'))
+        self.link_rate = Probes('link_rate', sink=sink, policy=policies.get('link_rate'))
+        self.packet_delay = Probes('packet_delay', sink=sink, policy=policies.get('packet_delay'))
+        self.packet_loss = Probes('packet_loss', series_class=EventSeries, sink=sink,
+                                  policy=policies.get('packet_loss'))
+        self.window_size = Probes('window_size', sink=sink, policy=policies.get('window_size'))
+
+    def register_flow(self, flow):
+        """Create the series of every metric recorded for `flow`
+
+        :param flow: new :class:`.Flow`
+        """
+        for metric in FLOW_METRICS:
+            getattr(self, metric).register(flow)
+
+    def register_link(self, link):
+        """Create the series of every metric recorded for `link`
+
+        :param link: new :class:`.Link`
+        """
+        for metric in LINK_METRICS:
+            getattr(self, metric).register(link)
+
+    def finish(self, time):
+        """Store what every recording policy has pending up to `time`
+
+        :param float time: current time, in ms
+        """
+        for metric in LINK_METRICS + FLOW_METRICS:
+            getattr(self, metric).finish(time)
+
+    def flush(self):
+        """Write every in-memory chunk to the sink, if there is one"""
+        if self.sink is None:
+            return
+        for metric in LINK_METRICS + FLOW_METRICS:
+            for probe in getattr(self, metric).values():
+                probe.series.spill()
+        self.sink.sync()
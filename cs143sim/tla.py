@@ -2,12 +2,15 @@
 
 .. autosummary::
 
+    RetransmissionTimer
+    SendWindow
     TCPTahoe
     TCPVegas
 
 .. moduleauthor:: Junlin Zhang <neicullyn@gmail.com>
 .. moduleauthor:: Jan Van Bruggen <jancvanbruggen@gmail.com>
 """
+from math import ceil
 from math import floor
 
 from cs143sim.constants import PACKET_SIZE
@@ -15,6 +18,129 @@ from cs143sim.events import PacketTimeOut
 from cs143sim.events import VegasTimeOut
 
 
+class RetransmissionTimer(object):
+    """The retransmission timer of one TLA, keeping at most one
+    :class:`~cs143sim.events.PacketTimeOut` scheduled
+
+    Resetting the timer only moves its deadline. When the scheduled
+    :class:`~cs143sim.events.PacketTimeOut` fires before the deadline, it is
+    scheduled again for the rest of the time, so resetting and cancelling
+    cost O(1) and stale timeouts do not pile up in the event queue. Only a
+    deadline moved earlier than the scheduled timeout needs a new one; the
+    old one is then ignored when it fires.
+
+    :param env: SimPy simulation :class:`~simpy.core.Environment`
+    :param actor: TLA whose ``react_to_time_out`` runs when the timer expires
+    :ivar float deadline: time the timer expires, or `None` if it is not armed
+    :ivar float scheduled: time of the scheduled
+        :class:`~cs143sim.events.PacketTimeOut`, or `None`
+    """
+    def __init__(self, env, actor):
+        self.env = env
+        self.actor = actor
+        self.deadline = None
+        self.scheduled = None
+
+    @property
+    def armed(self):
+        return self.deadline is not None
+
+    def reset(self, delay):
+        """Arm the timer to expire `delay` from now
+
+        :param float delay: time until the timer expires
+        """
+        self.deadline = self.env.now + delay
+        if self.scheduled is None or self.scheduled > self.deadline:
+            self.schedule()
+
+    def cancel(self):
+        """Disarm the timer"""
+        self.deadline = None
+
+    def schedule(self):
+        self.scheduled = self.deadline
+        PacketTimeOut(env=self.env, delay=self.deadline - self.env.now, actor=self,
+                      expected_time=self.deadline)
+
+    def react_to_time_out(self, event):
+        # Each timeout carries the time it was scheduled for, which tells
+        # the scheduled one from those superseded by an earlier deadline
+        if event.value != self.scheduled:
+            return
+        self.scheduled = None
+        if self.deadline is None:
+            return
+        if self.deadline > event.value:
+            self.schedule()
+        else:
+            self.deadline = None
+            self.actor.react_to_time_out(event)
+
+
+class SendWindow(object):
+    """Numbers of the packets a TLA has in flight, in increasing order
+
+    The numbers in flight are always consecutive, since packets are sent in
+    order, acknowledged cumulatively and dropped from the end, so only the
+    first and the next number are kept and every operation is O(1).
+
+    :ivar int start: first number in flight
+    :ivar int end: number after the last one in flight
+    """
+    def __init__(self):
+        self.start = 0
+        self.end = 0
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __iter__(self):
+        return iter(xrange(self.start, self.end))
+
+    def __contains__(self, number):
+        return self.start <= number < self.end
+
+    def __getitem__(self, index):
+        if not -len(self) <= index < len(self):
+            raise IndexError('send window index out of range')
+        return (self.start if index >= 0 else self.end) + index
+
+    def append(self, number):
+        """Add the next packet in flight
+
+        :param int number: number after the last one in flight, or any
+            number if none is in flight
+        """
+        if self.start == self.end:
+            self.start = number
+        elif number != self.end:
+            raise ValueError('Packet ' + str(number) + ' does not follow ' + str(self.end - 1))
+        self.end = number + 1
+
+    def retire(self, number):
+        """Remove the numbers below `number`, as a cumulative acknowledgement
+        of `number` does
+
+        :param int number: number of the next packet the receiver expects
+        :return: how many numbers were removed
+        """
+        retired = min(max(number, self.start), self.end) - self.start
+        self.start += retired
+        return retired
+
+    def truncate(self, size):
+        """Remove numbers from the end until at most `size` are left
+
+        :param int size: number of packets to keep in flight
+        """
+        self.end = min(self.end, self.start + max(size, 0))
+
+    def clear(self):
+        """Remove every number"""
+        self.start = self.end
+
+
 class TCPTahoe:
     """This is the class that implements TCP Tahoe, TCP Tahoe with fast retransmit, TCP Vegas.
 
@@ -26,12 +152,12 @@ class TCPTahoe:
     :ivar packet_number: number of packets to be sent
     :ivar time_out: timer's waiting time
     :ivar transmitter_not_sent: packets that have not been sent
-    :ivar transmitter_sending: list of packets that are being sent
+    :ivar transmitter_sending: :class:`SendWindow` of packets that are being sent
     :ivar transmitter_acked: packets  that have been acked
     :ivar duplicate_ack_number: record last acked packet number
     :ivar duplicate_ack_times: record how many times the packet has been continuous acked
     :ivar last_reset: last effective timeout time
-    :ivar time_out_event: current time out event
+    :ivar timer: :class:`RetransmissionTimer` of the flow
     :ivar slow_start_treshold: treshold of slow start
     :ivar rtt_avg: the average value of rtt
     :ivar rtt_div: the divergence of rtt
@@ -54,7 +180,7 @@ class TCPTahoe:
         self.time_out = 1000
         self.first_ack_flag = True
         self.transmitter_not_sent = 0
-        self.transmitter_sending = list()
+        self.transmitter_sending = SendWindow()
         self.transmitter_acked = -1
         self.duplicate_ack_number = -1
         self.duplicate_ack_times = 0
@@ -62,7 +188,7 @@ class TCPTahoe:
         self.change_W(W=1)
         self.last_reset = 0
         self.last_half = 0
-        self.time_out_event = None
+        self.timer = RetransmissionTimer(env=env, actor=self)
         
         self.slow_start_flag = True
         self.fast_recovery_flag = False
@@ -103,8 +229,8 @@ class TCPTahoe:
                 #self.change_W(self.W / 2 + 3)
                 # Actually, W is not windows size at that means.
                 # W is number of packets between the first and the last unacked packets
-                while len(self.transmitter_sending) >= self.W:
-                    self.transmitter_sending.pop()
+                if len(self.transmitter_sending) >= self.W:
+                    self.transmitter_sending.truncate(int(ceil(self.W)) - 1)
                          
                 n = self.duplicate_ack_number
                 packet = self.flow.make_packet(packet_number=n)
@@ -125,14 +251,10 @@ class TCPTahoe:
                 # Note: you can not start sending a lot of packets now.
                 # See send_new_packets: limit the packets send for each ack
                 # (D Burst: RFC3782)
-                del_list = list()
-                for x in self.transmitter_sending:            
-                    if x < n:
-                        del_list.append(x)
-                if self.transmitter_sending[0] in del_list:
+                if self.transmitter_sending.retire(n):
                     self.reset_timer()
-                for x in del_list:            
-                    self.transmitter_sending.remove(x)
+                if not self.transmitter_sending:
+                    self.timer.cancel()
                 n = ack_packet.number
                 self.transmitter_acked = max([self.transmitter_acked, n - 1])
                 # Process sending
@@ -149,8 +271,7 @@ class TCPTahoe:
                 self.send_new_packets()
 
     def react_to_time_out(self, event):
-        if event == self.time_out_event:
-            self.react_to_time_out_base()
+        self.react_to_time_out_base()
 
     def react_to_time_out_base(self):
         if len(self.transmitter_sending) > 0:
@@ -159,7 +280,7 @@ class TCPTahoe:
             self.slow_start_threshold = self.W / self.divide_factor
             self.slow_start_flag = True
             self.change_W(W=1)
-            self.transmitter_sending = []
+            self.transmitter_sending.clear()
             self.send_new_packets()
             self.last_reset = self.env.now
     
@@ -179,7 +300,7 @@ class TCPTahoe:
             packet = self.flow.make_packet(packet_number=n)
             self.flow.send_packet(packet)            
             self.transmitter_sending.append(n)
-        if send_flag and not self.time_out_event:
+        if send_flag and not self.timer.armed:
             self.reset_timer()
 
     def change_W(self, W):
@@ -187,7 +308,7 @@ class TCPTahoe:
         self.env.controller.record_window_size(flow=self.flow, window_size=self.W)
 
     def reset_timer(self):
-        self.time_out_event = PacketTimeOut(env=self.env, delay=self.time_out, actor=self, expected_time=self.env.now + self.time_out)
+        self.timer.reset(self.time_out)
 
 
 class TCPVegas:
@@ -204,12 +325,12 @@ class TCPVegas:
     :ivar packet_number: number of packets to be sent
     :ivar time_out: timer's waiting time
     :ivar transmitter_not_sent: packets that have not been sent
-    :ivar transmitter_sending: list of packets that are being sent
+    :ivar transmitter_sending: :class:`SendWindow` of packets that are being sent
     :ivar transmitter_acked: packets  that have been acked
     :ivar duplicate_ack_number: record last acked packet number
     :ivar duplicate_ack_times: record how many times the packet has been continuous acked
     :ivar last_reset: last effective timeout time
-    :ivar time_out_event: current time out event
+    :ivar timer: :class:`RetransmissionTimer` of the flow
     :ivar slow_start_treshold: treshold of slow start
     :ivar rtt_avg: the average value of rtt
     :ivar rtt_div: the divergence of rtt
@@ -237,7 +358,7 @@ class TCPVegas:
         self.time_out = 1000
         self.first_ack_flag = True
         self.transmitter_not_sent = 0
-        self.transmitter_sending = list()
+        self.transmitter_sending = SendWindow()
         self.transmitter_acked = -1
         self.duplicate_ack_number = -1
         self.duplicate_ack_times = 0
@@ -245,7 +366,7 @@ class TCPVegas:
         self.change_W(W=1)
         self.last_reset = 0
         self.last_half = 0
-        self.time_out_event = None
+        self.timer = RetransmissionTimer(env=env, actor=self)
         self.slow_start_flag = True
         self.vegas_time_out_event = None
 
@@ -286,14 +407,10 @@ class TCPVegas:
                 self.react_to_time_out_base()
             elif ack_packet.timestamp >= self.last_reset:
                 # Process Ack
-                del_list = list()
-                for x in self.transmitter_sending:            
-                    if x < n:
-                        del_list.append(x)
-                if self.transmitter_sending[0] in del_list:
+                if self.transmitter_sending.retire(n):
                     self.reset_timer()
-                for x in del_list:            
-                    self.transmitter_sending.remove(x)
+                if not self.transmitter_sending:
+                    self.timer.cancel()
                 n = ack_packet.number
                 self.transmitter_acked = max([self.transmitter_acked, n - 1])
                 # Process sending
@@ -326,15 +443,14 @@ class TCPVegas:
             self.vegas_time_out_event = VegasTimeOut(env=self.env, delay= self.vegas_rtt, actor=self)
 
     def react_to_time_out(self, event):
-        if event == self.time_out_event:
-            self.react_to_time_out_base()
+        self.react_to_time_out_base()
 
     def react_to_time_out_base(self):
         if len(self.transmitter_sending) > 0:
             self.time_out *= 2
             self.reset_timer()
             self.change_W(W=1)
-            self.transmitter_sending = []
+            self.transmitter_sending.clear()
             self.send_new_packets()
             self.last_reset = self.env.now
     
@@ -353,7 +469,7 @@ class TCPVegas:
             packet = self.flow.make_packet(packet_number=n)
             self.flow.send_packet(packet)            
             self.transmitter_sending.append(n)
-        if send_flag and not self.time_out_event:
+        if send_flag and not self.timer.armed:
             self.reset_timer()
         return count
 
@@ -362,4 +478,4 @@ class TCPVegas:
         self.env.controller.record_window_size(flow=self.flow, window_size=self.W)
 
     def reset_timer(self):
-        self.time_out_event=PacketTimeOut(env=self.env, delay=self.time_out, actor=self, expected_time=self.env.now + self.time_out)
+        self.timer.reset(self.time_out)
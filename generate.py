@@ -0,0 +1,39 @@
+"""The cs143sim generate script, writing a synthetic simulation input file of
+one topology family
+
+Family parameters are given as -p/--parameter name=value, where the value
+is a Python literal, so that ``-p start=(0.5,5)`` or
+``-p "algorithm={0:1,3:1}"`` give distributions.
+
+.. moduleauthor: Jan Van Bruggen <jancvanbruggen@gmail.com>
+"""
+import sys
+from ast import literal_eval
+
+from cs143sim.generator import FAMILIES
+
+
+def run():
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument('family', choices=sorted(FAMILIES), help='topology family')
+    parser.add_argument('-s', '--seed', dest='seed', type=int, default=0,
+                        help='seed of the random choices')
+    parser.add_argument('-p', '--parameter', dest='parameters', nargs='+', default=[],
+                        help='family parameters, as name=value')
+    parser.add_argument('-o', '--output', dest='output',
+                        help='input file to write instead of stdout')
+    arguments = parser.parse_args()
+    parameters = {}
+    for parameter in arguments.parameters:
+        name, _, value = parameter.partition('=')
+        parameters[name] = literal_eval(value)
+    network = FAMILIES[arguments.family](seed=arguments.seed, **parameters)
+    if arguments.output:
+        network.write(arguments.output)
+    else:
+        sys.stdout.write(network.text())
+
+
+if __name__ == '__main__':
+    run()
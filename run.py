@@ -1,147 +1,104 @@
 """The cs143sim run script, with -c/--case and -d/--duration options
 
+With -e/--engine fluid, the case runs on the
+:class:`~cs143sim.fluid.FluidModel` instead of packet by packet, which
+records the same metrics at coarse time steps in a fraction of the time.
+
+By default the graphs are shown on screen. With -o/--output, the script runs
+headless instead: every graph is saved in the -f/--format formats together
+with a CSV file of its binned data, and the graphs render in parallel worker
+processes.
+
 .. moduleauthor: Jan Van Bruggen <jancvanbruggen@gmail.com>
 """
-import matplotlib.pyplot as plt
+import csv
+import os
+from multiprocessing import Pool
 
+from cs143sim.fluid import FluidModel
 from cs143sim.simulation import Controller
 
 
 NUMBER_X_STEPS = 100
 
+GRAPHS = ('Buffer Occupancy', 'Flow Rate', 'Link Rate', 'Packet Delay', 'Packet Loss',
+          'Window Size')
 
-def graph_flow_rate_or_packet_loss(case, category, controller, duration, x_step):
-    title = 'Case ' + str(case) + ' ' + category
-    figure, axes = plt.subplots()
-    figure.canvas.set_window_title(title)
-    axes.set_title(title)
-    axes.set_xlabel('Time (s)')
-    units = 'Mbps' if category == 'Flow Rate' else 'packets / second'
-    axes.set_ylabel(category + ' (' + units + ')')
-    record_name = '_'.join(category.lower().split(' '))
-    record = controller.__dict__[record_name]
-    for actor in sorted(record.keys()):
-        x = [0]
-        y = [0]
-        for time, value in record[actor]:
-            while time > x[-1]:
-                x.append(x[-1] + x_step)
-                y.append(0)
-            y[-1] += value if value else 1
-        while duration > x[-1]:
-            x.append(x[-1] + x_step)
-            y.append(0)
-        x = [time / 1000.0 for time in x]
-        y = [value * 1.0 / x_step for value in y]
-        axes.plot(x, y, label=actor.name)
-    axes.legend()
+UNITS = {'Buffer Occupancy': 'packets',
+         'Flow Rate': 'Mbps',
+         'Link Rate': 'Mbps',
+         'Packet Delay': 'ms',
+         'Packet Loss': 'packets / second',
+         'Window Size': 'ms'}
 
 
-def graph_packet_delay_or_window_size(case, category, controller, x_step):
-    title = 'Case ' + str(case) + ' ' + category
-    figure, axes = plt.subplots()
-    figure.canvas.set_window_title(title)
-    axes.set_title(title)
-    axes.set_xlabel('Time (s)')
-    axes.set_ylabel(category + ' (ms)')
-    record_name = '_'.join(category.lower().split(' '))
-    record = controller.__dict__[record_name]
-    for actor in sorted(record.keys()):
-        x = [0]
-        y = [0]
-        for time, value in record[actor]:
-            x.append(time)
-            y.append(value)
-        length = len(x)
-        smooth_x = []
-        smooth_y = []
-        init_time = 0
-        sum_y = 0
-        for i in range(length):
-            if x[i] > (init_time + x_step):
-                exceed = (int(x[i]) - (init_time + x_step)) / x_step
-                sum_y += y[i - 1] * (init_time + x_step - x[i - 1])
-                smooth_x.append(float(init_time) / float(1000))
-                smooth_y.append(sum_y / x_step)
-                for j in range(exceed - 1):
-                    smooth_x.append(float(init_time + (j + 1) * x_step) / float(1000))
-                    smooth_y.append(y[i - 1])
-                init_time += x_step * (exceed + 1)
-                sum_y = y[i - 1] * (x[i] - init_time)
-            elif i > 0:
-                sum_y += y[i - 1] * (x[i] - max(init_time, x[i - 1]))
-        axes.plot(smooth_x, smooth_y, label=actor.name)
-    axes.legend()
+def bin_records(category, controller, duration, x_step):
+    """Bin the records behind one graph
 
+    Requires NumPy.
 
-def graph_buffer_occupancy(case, category, controller, x_step):
-    title = 'Case ' + str(case) + ' ' + category
-    figure, axes = plt.subplots()
-    figure.canvas.set_window_title(title)
-    axes.set_title(title)
-    axes.set_xlabel('Time (s)')
-    axes.set_ylabel(category + ' (packets)')
-    line_color = 'k'
-    line_colors = axes._get_lines.color_cycle
+    :return: list of (actor name, x, y) tuples, one per line of the graph
+    """
+    from cs143sim.analysis import metric_arrays
+    from cs143sim.analysis import rate_bins
+    from cs143sim.analysis import time_weighted_average
     record_name = '_'.join(category.lower().split(' '))
-    record = controller.__dict__[record_name]
-    for actor in sorted(record.keys()):
-        x = [0]
-        y = [0]
-        for time, value in record[actor]:
-            x.append(time)
-            y.append(value)
-        length = len(x)
-        smooth_x = []
-        smooth_y = []
-        init_time = 0
-        sum_y = 0
-        for i in range(length):
-            if x[i] > (init_time + x_step):
-                exceed = (int(x[i]) - (init_time + x_step)) / x_step
-                sum_y += y[i - 1] * (init_time + x_step - x[i - 1])
-                smooth_x.append(float(init_time) / float(1000))
-                smooth_y.append(sum_y / x_step)
-                for j in range(exceed - 1):
-                    smooth_x.append(float(init_time + (j + 1) * x_step) / float(1000))
-                    smooth_y.append(y[i - 1])
-                init_time += x_step * (exceed + 1)
-                sum_y = y[i - 1] * (x[i] - init_time)
-            elif i > 0:
-                sum_y += y[i - 1] * (x[i] - max(init_time, x[i - 1]))
-        if 'a' in actor.name:
-            line_color = next(line_colors)
-        line_style = '-' if 'a' in actor.name else ':'
-        axes.plot(smooth_x, smooth_y, line_color + line_style, label=actor.name)
-    axes.legend()
-
-
-def graph_link_rate(case, category, controller, x_step):
+    lines = []
+    for actor, times, values in metric_arrays(controller, record_name):
+        if category in ('Flow Rate', 'Packet Loss'):
+            x, y = rate_bins(times, values, x_step, duration)
+        elif category == 'Link Rate':
+            x, y = rate_bins(times, values, x_step)
+        else:
+            x, y = time_weighted_average(times, values, x_step)
+        lines.append((actor.name, x, y))
+    return lines
+
+
+def graph(case, category, lines):
+    """Plot the binned lines of one graph in a new figure"""
+    import matplotlib.pyplot as plt
     title = 'Case ' + str(case) + ' ' + category
     figure, axes = plt.subplots()
     figure.canvas.set_window_title(title)
     axes.set_title(title)
     axes.set_xlabel('Time (s)')
-    axes.set_ylabel(category + ' (Mbps)')
-    line_color = 'k'
-    line_colors = axes._get_lines.color_cycle
-    record_name = '_'.join(category.lower().split(' '))
-    record = controller.__dict__[record_name]
-    for actor in sorted(record.keys()):
-        x = [0]
-        y = [0]
-        for time, value in record[actor]:
-            while time > x[-1]:
-                x.append(x[-1] + x_step)
-                y.append(0)
-            y[-1] += value if value else 1
-        x = [time / 1000.0 for time in x]
-        y = [value * 1.0 / x_step for value in y]
-        if 'a' in actor.name:
-            line_color = next(line_colors)
-        line_style = '-' if 'a' in actor.name else ':'
-        axes.plot(x, y, line_color + line_style, label=actor.name)
+    axes.set_ylabel(category + ' (' + UNITS[category] + ')')
+    if category in ('Buffer Occupancy', 'Link Rate'):
+        # Both directions of a link share a color; 'a' is solid, 'b' dotted
+        line_color = 'k'
+        line_colors = axes._get_lines.color_cycle
+        for name, x, y in lines:
+            if 'a' in name:
+                line_color = next(line_colors)
+            line_style = '-' if 'a' in name else ':'
+            axes.plot(x, y, line_color + line_style, label=name)
+    else:
+        for name, x, y in lines:
+            axes.plot(x, y, label=name)
     axes.legend()
+    return figure
+
+
+def save_graph(job):
+    """Save one graph and its binned data; runs in a worker process
+
+    :param tuple job: case, category, lines, output directory and formats
+    :return: path of the saved files, without extension
+    """
+    import matplotlib.pyplot as plt
+    case, category, lines, output, formats = job
+    path = os.path.join(output, 'case' + str(case) + '_' + '_'.join(category.lower().split(' ')))
+    figure = graph(case, category, lines)
+    for file_format in formats:
+        figure.savefig(path + '.' + file_format)
+    plt.close(figure)
+    with open(path + '.csv', 'wb') as data_file:
+        writer = csv.writer(data_file)
+        writer.writerow(['Actor', 'Time (s)', category + ' (' + UNITS[category] + ')'])
+        for name, x, y in lines:
+            writer.writerows((name, x_value, y_value) for x_value, y_value in zip(x, y))
+    return path
 
 
 def run():
@@ -149,20 +106,47 @@ def run():
     parser = ArgumentParser()
     parser.add_argument('-c', '--case', dest='case', help='simulation case number')
     parser.add_argument('-d', '--duration', dest='duration', help='simulation duration in seconds')
+    parser.add_argument('-e', '--engine', dest='engine', default='packet',
+                        choices=['packet', 'fluid'], help='simulation engine')
+    parser.add_argument('-p', '--profile', dest='profile', action='store_true',
+                        help='print a profile of the events of the packet engine')
+    parser.add_argument('-o', '--output', dest='output',
+                        help='directory to save graphs and binned data to instead of showing them')
+    parser.add_argument('-f', '--format', dest='formats', nargs='+', default=['png'],
+                        choices=['png', 'svg'], help='file formats of saved graphs')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=len(GRAPHS),
+                        help='number of processes rendering saved graphs')
     arguments = parser.parse_args()
+    if arguments.output:
+        # The backend must be chosen before pyplot is first imported
+        import matplotlib
+        matplotlib.use('Agg')
     case = int(arguments.case) if arguments.case else 0
     duration = float(arguments.duration) if arguments.duration else 10
     duration *= 1000
-    controller = Controller(case='cs143sim/cases/case' + str(case) + '.txt')
+    controller = Controller(case='cs143sim/cases/case' + str(case) + '.txt',
+                            profile=arguments.profile)
+    if arguments.engine == 'fluid':
+        controller = FluidModel(controller=controller)
     controller.run(until=duration)
     x_step = int(duration / NUMBER_X_STEPS)
-    graph_buffer_occupancy(case, 'Buffer Occupancy', controller, x_step)
-    graph_flow_rate_or_packet_loss(case, 'Flow Rate', controller, duration, x_step)
-    graph_link_rate(case, 'Link Rate', controller, x_step)
-    graph_packet_delay_or_window_size(case, 'Packet Delay', controller, x_step)
-    graph_flow_rate_or_packet_loss(case, 'Packet Loss', controller, duration, x_step)
-    graph_packet_delay_or_window_size(case, 'Window Size', controller, x_step)
-    plt.show()
+    graphs = [(category, bin_records(category, controller, duration, x_step))
+              for category in GRAPHS]
+    if arguments.output:
+        if not os.path.isdir(arguments.output):
+            os.makedirs(arguments.output)
+        pool = Pool(processes=arguments.jobs)
+        try:
+            pool.map(save_graph, [(case, category, lines, arguments.output, arguments.formats)
+                                  for category, lines in graphs])
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        import matplotlib.pyplot as plt
+        for category, lines in graphs:
+            graph(case, category, lines)
+        plt.show()
 
 
 if __name__ == '__main__':
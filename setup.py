@@ -34,10 +34,13 @@ setuptools.setup(
         'Topic :: Scientific/Engineering',
     ],
     install_requires=['simpy==3.0.5'],
+    extras_require={
+        'analysis': ['numpy'],
+    },
     keywords='Caltech cs143 abstract network architecture protocol simulation simulator simpy',
     license='MIT',
     long_description=README,
-    packages=setuptools.find_packages(exclude=['docs', 'tests']),
+    packages=setuptools.find_packages(exclude=['benchmarks', 'docs', 'tests']),
     package_data={
     },
     entry_points={
@@ -0,0 +1,42 @@
+"""The cs143sim sweep script, simulating a case at every point of a parameter
+grid and writing one CSV row of summary metrics per point
+
+.. moduleauthor: Jan Van Bruggen <jancvanbruggen@gmail.com>
+"""
+import sys
+
+from cs143sim.sweep import PARAMETERS
+from cs143sim.sweep import sweep
+from cs143sim.sweep import write_table
+
+
+def run():
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument('-c', '--case', dest='case', default='cs143sim/cases/case0.txt',
+                        help='path to the base simulation input file')
+    parser.add_argument('-d', '--duration', dest='duration', type=float, nargs='+', default=[10],
+                        help='simulation durations in seconds')
+    for name, (object_type, attribute) in sorted(PARAMETERS.items()):
+        parser.add_argument('--' + name, dest=name, nargs='+',
+                            help='values of ' + object_type + ' ' + attribute)
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int,
+                        help='number of worker processes')
+    parser.add_argument('--cache', dest='cache',
+                        help='directory to cache compiled input files in')
+    parser.add_argument('-o', '--output', dest='output', help='CSV file to write instead of stdout')
+    arguments = parser.parse_args()
+    grid = dict((name, getattr(arguments, name)) for name in PARAMETERS
+                if getattr(arguments, name))
+    grid['duration'] = arguments.duration
+    results = sweep(case=arguments.case, grid=grid, processes=arguments.jobs,
+                    case_cache=arguments.cache)
+    if arguments.output:
+        with open(arguments.output, 'wb') as table_file:
+            write_table(results, table_file)
+    else:
+        write_table(results, sys.stdout)
+
+
+if __name__ == '__main__':
+    run()
@@ -1,5 +1,3 @@
-from Queue import Empty
-
 from cs143sim.actors import Buffer
 from cs143sim.actors import Flow
 from cs143sim.actors import Host
@@ -7,6 +5,8 @@ from cs143sim.actors import Link
 from cs143sim.actors import DataPacket
 from cs143sim.actors import RouterPacket
 from cs143sim.actors import Router
+from cs143sim.constants import BUFFER_DROP_FRONT
+from cs143sim.constants import BUFFER_PER_CLASS
 from cs143sim.simulation import Controller
 from cs143sim.simulation import ControlledEnvironment
 
@@ -63,13 +63,9 @@ def buffer_overflow():
     buffer_.capacity = buffer_capacity
     for packet_ in packets:
         buffer_.add(packet_)
-        print(buffer_.packets)
     buffer_packets = []
-    while True:
-        try:
-            buffer_packets.append(buffer_.get(timeout=1))
-        except Empty:
-            break
+    while buffer_:
+        buffer_packets.append(buffer_.get())
     for i in range(number_of_packets):
         if i < buffer_capacity:
             assert packets[i] in buffer_packets
@@ -77,14 +73,194 @@ def buffer_overflow():
             assert packets[i] not in buffer_packets
 
 
+def buffer_drop_front():
+    buffer_ = Buffer(env=ControlledEnvironment(controller=Controller()),
+                     capacity=2, link=basic_link(), policy=BUFFER_DROP_FRONT)
+    packets = []
+    for _ in range(3):
+        packet_ = basic_packet()
+        packet_.size = 1
+        packets.append(packet_)
+        assert buffer_.add(packet_)
+    assert buffer_.current_level == 2
+    assert buffer_.peek() is packets[1]
+    assert [buffer_.get(), buffer_.get()] == packets[1:]
+    assert len(buffer_.env.controller.packet_loss[buffer_.link]) == 1
+
+
+def buffer_per_class():
+    buffer_ = Buffer(env=ControlledEnvironment(controller=Controller()),
+                     capacity=3, link=basic_link(), policy=BUFFER_PER_CLASS)
+    data_packet = basic_packet()
+    data_packet.acknowledgement = False
+    data_packet.size = 1
+    ack_packet = basic_packet()
+    ack_packet.acknowledgement = True
+    ack_packet.size = 1
+    router_packet = basic_router_packet()
+    router_packet.size = 1
+    for packet_ in [data_packet, ack_packet, router_packet]:
+        buffer_.add(packet_)
+    assert len(buffer_) == 3
+    assert [buffer_.get(), buffer_.get(), buffer_.get()] == [router_packet, ack_packet, data_packet]
+    assert not buffer_
+
+
+def flow_reassembly():
+    flow = basic_flow()
+    acks = []
+    for number in [1, 3, 2, 0, 5, 4, 4]:
+        packet = flow.make_packet(packet_number=number)
+        acks.append(flow.make_ack_packet(packet).number)
+    assert acks == [0, 0, 0, 4, 4, 6, 6]
+    assert flow.rcv_received_packets == set()
+
+
+def host_flow_index():
+    env = ControlledEnvironment(controller=Controller())
+    source = Host(env=env, name='H1', address='1')
+    destination = Host(env=env, name='H2', address='2')
+    received = []
+    flows = []
+    for name in ['F1', 'F2']:
+        flow = Flow(env=env, name=name, source=source, destination=destination, amount=1.0)
+        flow.react_to_packet_receipt = lambda event, name=name: received.append(name)
+        source.add_flow(flow)
+        destination.add_flow(flow)
+        flows.append(flow)
+    assert len(destination.flow_index) == len(source.flow_index) == 2
+
+    class Receipt:
+        def __init__(self, value):
+            self.value = value
+
+    destination.react_to_packet_receipt(Receipt(flows[1].make_packet(packet_number=0)))
+    source.react_to_packet_receipt(Receipt(flows[0].make_ack_packet(
+        flows[0].make_packet(packet_number=0))))
+    assert received == ['F2', 'F1']
+    destination.remove_flow(flows[1])
+    destination.react_to_packet_receipt(Receipt(flows[1].make_packet(packet_number=1)))
+    assert received == ['F2', 'F1']
+    assert destination.flows == [flows[0]]
+
+
 def link_busy():
     link_ = basic_link()
     assert link_.buffer.capacity == 1
     packet_ = basic_packet()
     packet_.size = 1
-    link_.busy = True
+    link_.busy_until = link_.env.now + 1
+    assert link_.busy
     link_.add(packet_)
-    #assert packet_ in link_.buffer.packets
+    assert link_.buffer.peek() is packet_
+    assert link_.waiting
+
+
+class Receiver:
+    def __init__(self):
+        self.receipts = []
+
+    def react_to_packet_receipt(self, event):
+        self.receipts.append((event.env.now, event.value))
+
+
+def link_pipeline():
+    env = ControlledEnvironment(controller=Controller())
+    receiver = Receiver()
+    link_ = Link(env=env, name='', source=basic_host(), destination=receiver,
+                 delay=1.0, rate=1.0, buffer_capacity=2)
+    packets = [basic_packet() for _ in range(3)]
+    for packet_ in packets:
+        packet_.size = 1
+        link_.add(packet_)
+    # One arrival and one LinkAvailable for the two buffered packets
+    assert len(env._queue) == 2
+    env.run(until=3.5)
+    assert len(link_.in_flight) == 1
+    assert len(env._queue) == 1
+    env.run(until=10)
+    assert receiver.receipts == [(2, packets[0]), (3, packets[1]), (4, packets[2])]
+    assert not link_.busy and not link_.waiting
+
+
+def link_packet_train(train_length):
+    env = ControlledEnvironment(controller=Controller())
+    receiver = Receiver()
+    router = Router(env=env, name='', address='R')
+    destination = basic_host()
+    destination.address = 'H'
+    router.forwarding['H'] = Link(env=env, name='', source=router, destination=receiver,
+                                  delay=10.0, rate=1.0, buffer_capacity=8)
+    link_ = Link(env=env, name='', source=basic_host(), destination=router,
+                 delay=10.0, rate=1.0, buffer_capacity=8, train_length=train_length)
+    router.in_links.append(link_)
+    packets = [DataPacket(source=basic_host(), destination=destination, number=number,
+                          acknowledgement=False, timestamp=0, flow_id=flow_id)
+               for number, flow_id in enumerate(['F1', 'F1', 'F2', 'F1', 'F1', 'F1'])]
+    for packet_ in packets:
+        packet_.size = 1
+        link_.add(packet_)
+    env.run(until=40)
+    assert [packet_ for _, packet_ in receiver.receipts] == packets
+    assert len(link_.in_flight) == 0
+    return [(time, packet_.number) for time, packet_ in receiver.receipts], next(env._eid)
+
+
+def link_packet_trains():
+    receipts, events = link_packet_train(train_length=1)
+    train_receipts, train_events = link_packet_train(train_length=3)
+    # Trains break at other traffic and at the train length, and the router
+    # forwards every packet as it would on its own
+    assert train_receipts == receipts
+    assert train_events == events - 3
+
+
+def link_packet_train_quiet():
+    env = ControlledEnvironment(controller=Controller())
+    router = Router(env=env, name='', address='R')
+    destinations = {}
+    for address in ['H', 'G']:
+        destinations[address] = basic_host()
+        destinations[address].address = address
+        router.forwarding[address] = Link(env=env, name='', source=router,
+                                          destination=destinations[address], delay=1.0,
+                                          rate=1.0, buffer_capacity=8)
+    link_ = Link(env=env, name='', source=basic_host(), destination=router,
+                 delay=1.0, rate=1.0, buffer_capacity=8, train_length=8)
+    other_link = Link(env=env, name='', source=basic_host(), destination=router,
+                      delay=100.0, rate=1.0, buffer_capacity=8)
+    router.in_links.extend([link_, other_link])
+
+    def fill(link, arrivals, packets):
+        link.in_flight.clear()
+        for arrival, packet_ in zip(arrivals, packets):
+            packet_.size = 1
+            link.in_flight.append((arrival, packet_))
+
+    packets = [DataPacket(source=basic_host(), destination=destinations['H'], number=number,
+                          acknowledgement=False, timestamp=0, flow_id='F1')
+               for number in range(6)]
+    elsewhere, same_link = [DataPacket(source=basic_host(), destination=destinations[address],
+                                       number=0, acknowledgement=False, timestamp=0,
+                                       flow_id='F2')
+                            for address in ['G', 'H']]
+    # Trains stop before another packet for the same link arrives
+    fill(link_, range(6), packets)
+    fill(other_link, [1.5, 3.5], [elsewhere, same_link])
+    link_.in_flight.popleft()
+    assert [packet_ for _, packet_ in link_.pop_train(0, packets[0])] == packets[1:4]
+    # or any routing packet
+    fill(link_, range(6), packets)
+    fill(other_link, [2.5], [basic_router_packet()])
+    link_.in_flight.popleft()
+    assert [packet_ for _, packet_ in link_.pop_train(0, packets[0])] == packets[1:3]
+    # and only while the link they are forwarded on is free by their arrival
+    fill(link_, range(6), packets)
+    other_link.in_flight.clear()
+    router.forwarding['H'].rate = 0.5
+    link_.in_flight.popleft()
+    assert link_.pop_train(0, packets[0]) == []
+    assert len(link_.in_flight) == 5
 
 
 def router_initialize():
@@ -127,6 +303,55 @@ def router_forward():
     router.map_route(Dpacket)
 
 
+def router_forwarding_table():
+    env = ControlledEnvironment(controller=Controller())
+    router = Router(env=env, name='R1', address='R1')
+    neighbors = [Router(env=env, name=name, address=name) for name in ['R2', 'R3']]
+    host = Host(env=env, name='H1', address='H1')
+    for destination in neighbors + [host]:
+        router.links.append(Link(env=env, name='', source=router, destination=destination,
+                                 delay=1.0, rate=1.0, buffer_capacity=1))
+    router.initialize_routing_table(['H1', 'H2'])
+    assert router.forwarding == {'H1': router.links[2], 'H2': router.links[0]}
+    forwarding = router.forwarding['H2']
+    router.set_route('H2', 5, 'R2')
+    assert router.forwarding['H2'] is forwarding
+    router.set_route('H2', 4, 'R3')
+    assert router.table['H2'] == (4, 'R3')
+    assert router.forwarding['H2'] is router.links[1]
+    router.set_route('H2', 4, 'R9')
+    assert 'H2' not in router.forwarding
+
+
+def router_advertisement():
+    env = ControlledEnvironment(controller=Controller())
+    router = Router(env=env, name='R1', address='R1', delta_updates=True,
+                    full_refresh_interval=3)
+    router.links.append(Link(env=env, name='', source=router,
+                             destination=Host(env=env, name='H1', address='H1'),
+                             delay=1.0, rate=1.0, buffer_capacity=1))
+    router.initialize_routing_table(['H1', 'H2', 'H3'])
+    assert router.advertisement('R2') == router.table
+    assert router.advertisement('R2') == {}
+    router.set_route('H2', 5, 'H1')
+    router.set_route('H2', 5, 'H1')
+    assert router.advertisement('R2') == {'H2': (5, 'H1')}
+    assert router.advertisement('R2') == router.table
+    assert router.advertisement('R3') == router.table
+    assert router.routes_via == {'H1': set(['H1', 'H2', 'H3'])}
+    # The acknowledgement carries the delta as it is when sent
+    neighbor = Router(env=env, name='R2', address='R2')
+    link_ = Link(env=env, name='', source=router, destination=neighbor,
+                 delay=1.0, rate=1.0, buffer_capacity=1)
+    router.links.append(link_)
+    router.set_route('H3', 7, 'H1')
+    router.generate_ack_router_packet(RouterPacket(source=neighbor, timestamp=0, router_table={},
+                                                   acknowledgement=False))
+    router.set_route('H3', 6, 'H1')
+    _, ack_router_packet = link_.in_flight[0]
+    assert ack_router_packet.router_table == {'H3': (7, 'H1')}
+
+
 def router_receive_update_packet():
     # packet_ = basic_packet()
     # link_1 = basic_link()
@@ -183,19 +408,26 @@ def router_send_update_packet():
 def test_buffer():
     basic_buffer()
     buffer_overflow()
+    buffer_drop_front()
+    buffer_per_class()
 
 
 def test_flow():
     basic_flow()
+    flow_reassembly()
 
 
 def test_host():
     basic_host()
+    host_flow_index()
 
 
 def test_link():
     basic_link()
     link_busy()
+    link_pipeline()
+    link_packet_trains()
+    link_packet_train_quiet()
 
 
 def test_packet():
@@ -208,3 +440,5 @@ def test_router():
     # router_forward()
     # router_receive_update_packet()
     router_send_update_packet()
+    router_forwarding_table()
+    router_advertisement()
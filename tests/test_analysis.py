@@ -0,0 +1,49 @@
+import numpy as np
+
+from cs143sim.analysis import metric_arrays
+from cs143sim.analysis import rate_bins
+from cs143sim.analysis import series_arrays
+from cs143sim.analysis import time_weighted_average
+from cs143sim.simulation import Controller
+from cs143sim.telemetry import EventSeries
+
+
+def analysis_rate_bins():
+    times = np.array([0.0, 5.0, 10.0, 11.0])
+    values = np.array([1.0, 2.0, 3.0, 4.0])
+    x, y = rate_bins(times, values, x_step=10, duration=30)
+    assert list(x) == [0.0, 0.01, 0.02, 0.03]
+    assert list(y) == [0.1, 0.5, 0.4, 0.0]
+
+
+def analysis_time_weighted_average():
+    times = np.array([5.0, 10.0, 25.0])
+    values = np.array([4.0, 1.0, 3.0])
+    x, y = time_weighted_average(times, values, x_step=10, end=30)
+    assert list(x) == [0.0, 0.01, 0.02]
+    assert list(y) == [2.0, 1.0, 2.0]
+
+
+def analysis_event_series():
+    series = EventSeries()
+    series.append(1)
+    series.append(2)
+    times, values = series_arrays(series)
+    assert list(times) == [1, 2]
+    assert list(values) == [1, 1]
+
+
+def analysis_metric_arrays():
+    controller = Controller()
+    controller.run(until=2000)
+    arrays = metric_arrays(controller, 'link_rate')
+    assert [actor.name for actor, _, _ in arrays] == ['L1a', 'L1b']
+    for actor, times, values in arrays:
+        assert list(zip(times, values)) == controller.link_rate[actor]
+
+
+def test_analysis():
+    analysis_rate_bins()
+    analysis_time_weighted_average()
+    analysis_event_series()
+    analysis_metric_arrays()
@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+
+from cs143sim.casefile import compile_case
+from cs143sim.casefile import parse_case
+from cs143sim.errors import InputFileUnknownReference
+from cs143sim.simulation import Controller
+
+
+def parse_case_objects():
+    with open('cs143sim/cases/case0.txt') as case_file:
+        compiled = parse_case(case_file)
+    assert [compiled_object[:2] for compiled_object in compiled.objects] == [
+        ('HOST', 'H1'), ('HOST', 'H2'), ('FLOW', 'F1'), ('LINK', 'L1a'), ('LINK', 'L1b')]
+    assert compiled.objects[3][2:4] == ('H1', 'H2')
+    assert compiled.objects[4][2:4] == ('H2', 'H1')
+
+
+def parse_case_unknown_reference():
+    lines = ['HOST', '    ID H1', '    IP 1', '', 'LINK', '    ID L1', '    RATE 10',
+             '    DELAY 10', '    BUFFER 64', '    CONNECTS H1 R9', '']
+    try:
+        parse_case(lines)
+    except InputFileUnknownReference:
+        pass
+    else:
+        raise AssertionError('unknown reference was accepted')
+
+
+def compile_case_cache(directory):
+    cache = os.path.join(directory, 'cache')
+    case = os.path.join(directory, 'case.txt')
+    shutil.copy('cs143sim/cases/case2.txt', case)
+    parsed = compile_case(case)
+    assert compile_case(case, cache_directory=cache).objects == parsed.objects
+    assert len(os.listdir(cache)) == 1
+    assert compile_case(case, cache_directory=cache).objects == parsed.objects
+    assert len(os.listdir(cache)) == 1
+    overrides = {'LINK': {'BUFFER': 32}}
+    overridden = compile_case(case, overrides=overrides, cache_directory=cache)
+    assert overridden.objects == compile_case(case, overrides=overrides).objects
+    assert overridden.objects != parsed.objects
+    assert len(os.listdir(cache)) == 2
+    with open(case, 'a') as case_file:
+        case_file.write('\n// changed\n')
+    compile_case(case, cache_directory=cache)
+    assert len(os.listdir(cache)) == 3
+
+
+def controller_case_cache(directory):
+    cache = os.path.join(directory, 'controller')
+    controllers = [Controller(case='cs143sim/cases/case1.txt', case_cache=case_cache)
+                   for case_cache in (None, cache, cache)]
+    for controller in controllers:
+        controller.run(until=2000)
+    for controller in controllers[1:]:
+        assert sorted(controller.links) == sorted(controllers[0].links)
+        assert controller.flows['F1'].amount == controllers[0].flows['F1'].amount
+        assert (controller.window_size[controller.flows['F1']] ==
+                controllers[0].window_size[controllers[0].flows['F1']])
+
+
+def test_casefile():
+    parse_case_objects()
+    parse_case_unknown_reference()
+    directory = tempfile.mkdtemp()
+    try:
+        compile_case_cache(directory)
+        controller_case_cache(directory)
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,79 @@
+import json
+import os
+import shutil
+import tempfile
+
+from cs143sim.constants import KERNEL_NATIVE
+from cs143sim.constants import KERNEL_SIMPY
+from cs143sim.simulation import Controller
+from cs143sim.telemetry import FLOW_METRICS
+from cs143sim.telemetry import LINK_METRICS
+
+
+def all_records(controller):
+    records = {}
+    for metric in LINK_METRICS + FLOW_METRICS:
+        for actor, probe in getattr(controller.telemetry, metric).items():
+            records[metric, actor.name] = probe.series.records()
+    return records
+
+
+def checkpoint_continues_run(directory, kernel):
+    path = os.path.join(directory, kernel + '.checkpoint')
+    uninterrupted = Controller(case='cs143sim/cases/case1.txt', kernel=kernel)
+    uninterrupted.run(until=2000)
+    uninterrupted.run(until=4000)
+    controller = Controller(case='cs143sim/cases/case1.txt', kernel=kernel)
+    controller.run(until=2000)
+    controller.checkpoint(path)
+    restored = Controller.restore(path)
+    assert restored.env.now == 2000
+    restored.run(until=4000)
+    assert all_records(restored) == all_records(uninterrupted)
+
+
+def checkpoint_forks(directory):
+    path = os.path.join(directory, 'fork.checkpoint')
+    controller = Controller(case='cs143sim/cases/case0.txt')
+    controller.run(until=1000)
+    controller.checkpoint(path)
+    plain = Controller.restore(path)
+    plain.run(until=3000)
+    forked = Controller.restore(path)
+    forked.make_flow(name='F2', source=forked.hosts['H2'], destination=forked.hosts['H1'],
+                     amount=8000000, start_time=0, algorithm=0)
+    forked.run(until=3000)
+    assert 'F2' not in plain.flows
+    assert forked.flow_rate.get(forked.flows['F2'])
+    assert min(time for time, _ in forked.window_size[forked.flows['F2']]) >= 1000
+    assert controller.env.now == 1000
+
+
+def checkpoint_run_directory(directory):
+    path = os.path.join(directory, 'disk.checkpoint')
+    in_memory = Controller()
+    in_memory.run(until=1000)
+    in_memory.run(until=2000)
+    on_disk = Controller(run_directory=os.path.join(directory, 'warm'))
+    on_disk.run(until=1000)
+    on_disk.checkpoint(path)
+    with open(os.path.join(directory, 'warm', 'manifest.json')) as manifest_file:
+        manifest = json.load(manifest_file)
+    restored = Controller.restore(path, run_directory=os.path.join(directory, 'fork'))
+    restored.run(until=2000)
+    assert all_records(restored) == all_records(in_memory)
+    restored.telemetry.sink.close()
+    on_disk.telemetry.sink.close()
+    with open(os.path.join(directory, 'warm', 'manifest.json')) as manifest_file:
+        assert json.load(manifest_file) == manifest
+
+
+def test_checkpoint():
+    directory = tempfile.mkdtemp()
+    try:
+        checkpoint_continues_run(directory, KERNEL_SIMPY)
+        checkpoint_continues_run(directory, KERNEL_NATIVE)
+        checkpoint_forks(directory)
+        checkpoint_run_directory(directory)
+    finally:
+        shutil.rmtree(directory)
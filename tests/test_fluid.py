@@ -0,0 +1,56 @@
+from cs143sim.constants import STATIC_ROUTING_DELAY
+from cs143sim.fluid import FluidLink
+from cs143sim.fluid import FluidModel
+from cs143sim.fluid import compare
+from cs143sim.fluid import flow_path
+from cs143sim.routing import shortest_routes
+from cs143sim.simulation import Controller
+
+
+def fluid_flow_path():
+    controller = Controller(case='cs143sim/cases/case1.txt')
+    routes = dict((router, shortest_routes(router=router, metric=STATIC_ROUTING_DELAY))
+                  for router in controller.routers.values())
+    flow = controller.flows['F1']
+    path = flow_path(flow.source, flow.destination, routes)
+    assert path[0] is flow.source.link
+    assert path[-1].destination is flow.destination
+    for link, next_link in zip(path, path[1:]):
+        assert link.destination is next_link.source
+    return_path = flow_path(flow.destination, flow.source, routes)
+    assert len(return_path) == len(path)
+
+
+def fluid_link_drop():
+    controller = Controller(case='cs143sim/cases/case0.txt')
+    link = FluidLink(controller.links['L1a'])
+    link.arrival = link.capacity * 2
+    link.advance(step=1)
+    assert link.sent == link.capacity
+    assert link.queue == link.capacity
+    link.arrival = link.capacity + link.buffer
+    link.advance(step=1)
+    assert link.queue == link.buffer
+    assert link.dropped == link.capacity
+    assert 0 < link.loss < 1
+
+
+def fluid_model_matches_packets():
+    duration = 20000
+    controller = Controller(case='cs143sim/cases/case0.txt')
+    controller.run(until=duration)
+    model = FluidModel(controller=Controller(case='cs143sim/cases/case0.txt'))
+    model.run(until=duration)
+    assert model.now == duration
+    flow = model.flows.keys()[0]
+    assert model.flows[flow].delivered <= flow.amount
+    for metric, name, packet_mean, fluid_mean in compare(controller, model, duration):
+        if metric in ('flow_rate', 'window_size'):
+            assert abs(fluid_mean - packet_mean) < 0.15 * packet_mean, (metric, name)
+    assert sum(len(probe.series) for probe in model.telemetry.packet_loss.values()) > 0
+
+
+def test_fluid():
+    fluid_flow_path()
+    fluid_link_drop()
+    fluid_model_matches_packets()
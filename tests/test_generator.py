@@ -0,0 +1,67 @@
+import os
+import random
+import shutil
+import tempfile
+
+from cs143sim.constants import STATIC_ROUTING_HOPS
+from cs143sim.generator import FAMILIES
+from cs143sim.generator import chain
+from cs143sim.generator import draw
+from cs143sim.generator import fat_tree
+from cs143sim.generator import waxman
+from cs143sim.routing import shortest_routes
+from cs143sim.simulation import Controller
+
+
+def generator_draw():
+    rng = random.Random(0)
+    assert draw(rng, 3) == 3
+    assert 1 <= draw(rng, (1, 2)) <= 2
+    assert draw(rng, [4, 5]) in (4, 5)
+    assert set(draw(rng, {0: 1, 3: 1}) for _ in range(100)) == set([0, 3])
+    assert set(draw(rng, {0: 0, 3: 1}) for _ in range(100)) == set([3])
+
+
+def generator_deterministic():
+    for family in FAMILIES.values():
+        assert family(seed=1).text() == family(seed=1).text()
+    assert waxman(seed=1).text() != waxman(seed=2).text()
+
+
+def generated_cases_read(directory):
+    for name, family in sorted(FAMILIES.items()):
+        network = family(seed=5, algorithm={0: 1, 1: 1, 3: 1})
+        path = os.path.join(directory, name + '.txt')
+        network.write(path)
+        controller = Controller(case=path, static_routing=STATIC_ROUTING_HOPS)
+        assert len(controller.hosts) == len(network.hosts)
+        assert len(controller.routers) == len(network.routers)
+        assert len(controller.links) == 2 * len(network.links)
+        assert len(controller.flows) == len(network.flows)
+        for router in controller.routers.values():
+            assert len(shortest_routes(router, STATIC_ROUTING_HOPS)) == len(controller.hosts)
+        for flow_name, source, destination, data, start, algorithm in network.flows:
+            flow = controller.flows[flow_name]
+            assert flow.source.name == source
+            assert flow.destination.name == destination
+            assert flow.algorithm == algorithm
+
+
+def generator_sizes():
+    network = fat_tree(k=4)
+    assert len(network.hosts) == 16
+    assert len(network.routers) == 20
+    network = chain(size=8)
+    assert len(network.routers) == 8
+    assert len(network.flows) == 7
+
+
+def test_generator():
+    generator_draw()
+    generator_deterministic()
+    generator_sizes()
+    directory = tempfile.mkdtemp()
+    try:
+        generated_cases_read(directory)
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,53 @@
+from cs143sim.constants import KERNEL_NATIVE
+from cs143sim.constants import KERNEL_SIMPY
+from cs143sim.events import PacketReceipt
+from cs143sim.kernel import NativeEnvironment
+from cs143sim.simulation import Controller
+
+
+class Receiver:
+    def __init__(self):
+        self.receipts = []
+
+    def react_to_packet_receipt(self, event):
+        self.receipts.append((event.env.now, event.value))
+
+
+def kernel_ordering():
+    env = NativeEnvironment()
+    receiver = Receiver()
+    for delay, packet in [(2, 'c'), (1, 'a'), (2, 'd'), (1, 'b'), (3, 'e')]:
+        PacketReceipt(env=env, delay=delay, receiver=receiver, packet=packet)
+    env.run(until=3)
+    assert receiver.receipts == [(1, 'a'), (1, 'b'), (2, 'c'), (2, 'd')]
+    assert env.now == 3
+    assert env.peek() == 3
+    env.run()
+    assert receiver.receipts[-1] == (3, 'e')
+
+
+def kernel_until_in_past():
+    env = NativeEnvironment()
+    env.run(until=5)
+    try:
+        env.run(until=5)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('run until the current time was accepted')
+
+
+def kernel_matches_simpy():
+    records = []
+    for kernel in (KERNEL_SIMPY, KERNEL_NATIVE):
+        controller = Controller(case='cs143sim/cases/case1.txt', kernel=kernel)
+        controller.run(until=3000)
+        records.append(dict((actor.name, controller.window_size[actor])
+                            for actor in controller.window_size))
+    assert records[0] == records[1]
+
+
+def test_kernel():
+    kernel_ordering()
+    kernel_until_in_past()
+    kernel_matches_simpy()
@@ -0,0 +1,88 @@
+import gc
+
+from cs143sim.packets import DataPacket
+from cs143sim.packets import PacketPool
+from cs143sim.packets import RouterPacket
+from cs143sim.simulation import Controller
+
+
+class DictPacket(object):
+    """Packet as it was before slots, kept for comparison"""
+    def __init__(self, destination, source, timestamp, acknowledgement, number):
+        self.timestamp = timestamp
+        self.source = source
+        self.destination = destination
+        self.size = 0
+        self.number = number
+        self.acknowledgement = acknowledgement
+
+
+class Node(object):
+    pass
+
+
+def live_objects(packet_class, count):
+    source, destination = Node(), Node()
+    gc.collect()
+    before = len(gc.get_objects())
+    packets = [packet_class(destination=destination, source=source, timestamp=0,
+                            acknowledgement=False, number=number)
+               for number in range(count)]
+    live = len(gc.get_objects()) - before
+    del packets
+    return live
+
+
+def packets_slots():
+    assert not hasattr(DataPacket(destination=None, source=None, timestamp=0,
+                                  acknowledgement=False, number=0), '__dict__')
+    assert not hasattr(RouterPacket(source=None, timestamp=0, router_table={},
+                                    acknowledgement=False), '__dict__')
+    assert live_objects(DataPacket, 1000) < live_objects(DictPacket, 1000) * 0.6
+
+
+def packets_pool_reuse():
+    pool = PacketPool()
+    packet = pool.data_packet(destination='H2', source='H1', timestamp=1,
+                              acknowledgement=False, number=7, size=10)
+    pool.release(packet)
+    reused = pool.data_packet(destination='H1', source='H2', timestamp=2,
+                              acknowledgement=True, number=8, size=5)
+    assert reused is packet
+    assert ((reused.destination, reused.source, reused.timestamp, reused.acknowledgement,
+             reused.number, reused.size) == ('H1', 'H2', 2, True, 8, 5))
+    assert not pool.free
+
+
+def data_packets_in_flight(controller):
+    return sum(isinstance(packet, DataPacket)
+               for link in controller.links.values()
+               for packet in [packet for queue in link.buffer.queues for packet in queue] +
+               [packet for _, packet in link.in_flight])
+
+
+def packets_pool_run():
+    records = []
+    for packet_pool in (False, True):
+        controller = Controller(case='cs143sim/cases/case0.txt', packet_pool=packet_pool)
+        peak = 0
+        while controller.env.peek() < 5000:
+            controller.env.step()
+            peak = max(peak, data_packets_in_flight(controller))
+        records.append([dict((actor.name, getattr(controller, metric)[actor])
+                             for actor in getattr(controller, metric))
+                        for metric in ('packet_delay', 'packet_loss')])
+    assert records[0] == records[1]
+    assert records[1][1]
+    # Delivered and dropped packets are reused, so the pool allocates only
+    # the peak in flight, plus the packets a flow makes before releasing
+    # the one it handles
+    delivered = sum(len(delays) for delays in records[1][0].values())
+    assert peak <= controller.packet_pool.allocated <= peak + 2
+    assert controller.packet_pool.allocated * 20 < delivered
+
+
+def test_packets():
+    packets_slots()
+    packets_pool_reuse()
+    packets_pool_run()
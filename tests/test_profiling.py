@@ -0,0 +1,73 @@
+from cs143sim.constants import KERNEL_NATIVE
+from cs143sim.constants import KERNEL_SIMPY
+from cs143sim.profiling import Profiler
+from cs143sim.profiling import actor_label
+from cs143sim.profiling import receiver_label
+from cs143sim.simulation import Controller
+
+
+def profiled_run_matches(kernel):
+    plain = Controller(case='cs143sim/cases/case3.txt', kernel=kernel)
+    plain.run(until=3000)
+    profiled = Controller(case='cs143sim/cases/case3.txt', kernel=kernel, profile=True)
+    profiled.run(until=3000)
+    assert profiled.env.now == plain.env.now == 3000
+    for flow_name, flow in plain.flows.items():
+        assert profiled.window_size[profiled.flows[flow_name]] == plain.window_size[flow]
+    return profiled.profiler
+
+
+def profiler_counters():
+    profilers = [profiled_run_matches(kernel) for kernel in (KERNEL_SIMPY, KERNEL_NATIVE)]
+    for profiler in profilers:
+        assert 'PacketReceipt' in profiler.events
+        assert ('VegasTimeOut', 'FAST') in profiler.actors
+        assert sum(counter[0] for counter in profiler.events.values()) == \
+            sum(counter[0] for counter in profiler.actors.values())
+        assert profiler.records['window_size'] > 0
+        assert 'PacketReceipt' in profiler.report()
+    counts = [dict((name, counter[0]) for name, counter in profiler.events.items())
+              for profiler in profilers]
+    assert counts[0] == counts[1]
+
+
+def profiler_actor_labels():
+    controller = Controller(case='cs143sim/cases/case0.txt')
+    flow = controller.flows['F1']
+    assert actor_label(controller.links['L1a']) == 'L1a'
+    assert actor_label(flow.tla) == 'F1'
+    assert actor_label(Profiler(telemetry=controller.telemetry)) == 'Profiler'
+
+
+def profiler_receipt_costs():
+    for kernel in (KERNEL_SIMPY, KERNEL_NATIVE):
+        controller = Controller(case='cs143sim/cases/case1.txt', kernel=kernel, profile=True)
+        controller.run(until=3000)
+        actors = controller.profiler.actors
+        # Receipts count as the routers and flows that take the packets, and
+        # never as the links they arrive on
+        for name in list(controller.routers) + list(controller.flows):
+            assert actors[('PacketReceipt', name)][0] > 0
+            assert actors[('PacketReceipt', name)][1] > 0
+        assert not [actor for name, actor in actors
+                    if name == 'PacketReceipt' and actor in controller.links]
+
+
+def profiler_receiver_labels():
+    controller = Controller(case='cs143sim/cases/case1.txt')
+    flow = controller.flows['F1']
+    data_packet = flow.make_packet(1)
+    ack_packet = flow.make_ack_packet(data_packet)
+    router_link = flow.source.link
+    host_links = dict((link.destination, link) for link in controller.links.values())
+    assert receiver_label(router_link, data_packet) == router_link.destination.name
+    assert receiver_label(host_links[flow.destination], data_packet) == 'F1'
+    assert receiver_label(host_links[flow.source], ack_packet) == 'F1'
+    assert receiver_label(host_links[flow.source], data_packet) == flow.source.name
+
+
+def test_profiler():
+    profiler_counters()
+    profiler_actor_labels()
+    profiler_receipt_costs()
+    profiler_receiver_labels()
@@ -0,0 +1,97 @@
+from cs143sim.constants import ROUTING_TABLE_ARRAY
+from cs143sim.constants import ROUTING_UPDATES_DELTA
+from cs143sim.constants import STATIC_ROUTING_DELAY
+from cs143sim.constants import STATIC_ROUTING_HOPS
+from cs143sim.events import RoutingTableOutdated
+from cs143sim.routing import AddressIndex
+from cs143sim.routing import ArrayRoutingTable
+from cs143sim.routing import RoutingTable
+from cs143sim.routing import shortest_routes
+from cs143sim.simulation import Controller
+
+
+def routing_table_snapshot():
+    table = RoutingTable({'H1': (1, 'R1')})
+    snapshot = table.snapshot()
+    table['H1'] = 2, 'R2'
+    table['H2'] = 3, 'R2'
+    assert dict(snapshot) == {'H1': (1, 'R1')}
+    assert dict(table) == {'H1': (2, 'R2'), 'H2': (3, 'R2')}
+    assert table.snapshot() is not snapshot
+
+
+def array_routing_table():
+    index = AddressIndex(['H1', 'H2', 'R1', 'R2'])
+    table = ArrayRoutingTable(index=index)
+    table['H1'] = 0, 'H1'
+    assert table['H1'] == (0, 'H1')
+    assert 'H2' not in table
+    assert table.get('H2') is None
+    snapshot = table.snapshot()
+    table['H2'] = 4, 'R1'
+    assert dict(snapshot) == {'H1': (0, 'H1')}
+    assert dict(table) == {'H1': (0, 'H1'), 'H2': (4, 'R1')}
+    try:
+        snapshot['H2'] = 1, 'R2'
+    except TypeError:
+        pass
+    else:
+        raise AssertionError('routing table snapshot changed')
+
+
+def array_routing_table_merge():
+    index = AddressIndex(['H1', 'H2', 'H3', 'R1', 'R2'])
+    table = ArrayRoutingTable(index=index)
+    table['H1'] = 0, 'H1'
+    table['H2'] = 5, 'R1'
+    table['H3'] = 1, 'R2'
+    neighbor = ArrayRoutingTable(index=index)
+    neighbor['H1'] = 3, 'R1'
+    neighbor['H2'] = 6, 'R1'
+    neighbor['H3'] = 1, 'R1'
+    assert table.merge(table=neighbor, metric=1, neighbor='R2', refresh=False) == []
+    assert dict(table) == {'H1': (0, 'H1'), 'H2': (5, 'R1'), 'H3': (1, 'R2')}
+    neighbor['H2'] = 2, 'R1'
+    assert table.merge(table=neighbor, metric=1, neighbor='R2', refresh=True) == ['H2']
+    assert dict(table) == {'H1': (0, 'H1'), 'H2': (3, 'R2'), 'H3': (2, 'R2')}
+
+
+def controller_routing_tables():
+    records = []
+    for options in ({}, {'routing_table': ROUTING_TABLE_ARRAY},
+                    {'routing_snapshots': True},
+                    {'routing_snapshots': True, 'routing_table': ROUTING_TABLE_ARRAY,
+                     'routing_updates': ROUTING_UPDATES_DELTA}):
+        controller = Controller(case='cs143sim/cases/case1.txt', **options)
+        controller.run(until=3000)
+        records.append(dict((actor.name, controller.window_size[actor])
+                            for actor in controller.window_size))
+    assert records[0] == records[1]
+    assert records[2] == records[3]
+
+
+def static_shortest_routes():
+    controller = Controller(case='cs143sim/cases/case1.txt')
+    router = controller.routers['R1']
+    assert shortest_routes(router=router, metric=STATIC_ROUTING_HOPS) == {
+        '192.168.1.1': (1, '192.168.1.1'), '192.168.1.2': (3, '192.168.1.4')}
+    assert shortest_routes(router=router, metric=STATIC_ROUTING_DELAY) == {
+        '192.168.1.1': (10.0, '192.168.1.1'), '192.168.1.2': (30.0, '192.168.1.4')}
+
+
+def controller_static_routing():
+    controller = Controller(case='cs143sim/cases/case1.txt', static_routing=STATIC_ROUTING_HOPS)
+    assert not any(isinstance(entry[-1], RoutingTableOutdated) for entry in controller.env._queue)
+    assert controller.routers['R4'].table == {'192.168.1.1': (3, '192.168.1.4'),
+                                              '192.168.1.2': (1, '192.168.1.2')}
+    controller.run(until=3000)
+    assert controller.window_size[controller.flows['F1']]
+
+
+def test_routing():
+    routing_table_snapshot()
+    array_routing_table()
+    array_routing_table_merge()
+    controller_routing_tables()
+    static_shortest_routes()
+    controller_static_routing()
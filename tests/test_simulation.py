@@ -1,6 +1,12 @@
+import os
+import shutil
+import tempfile
+
+from cs143sim.constants import KERNEL_NATIVE
 from cs143sim.constants import OUTPUT_BUFFER_OCCUPANCY_SCALE_FACTOR
 from cs143sim.constants import OUTPUT_FLOW_RATE_SCALE_FACTOR
 from cs143sim.constants import OUTPUT_LINK_RATE_SCALE_FACTOR
+from cs143sim.generator import parking_lot
 from cs143sim.simulation import Controller
 from test_actors import basic_flow
 from test_actors import basic_link
@@ -85,6 +91,42 @@ def controller_run_basic():
     controller.run(until=10)
 
 
+def controller_delta_routing_updates():
+    tables = []
+    # Delta advertisements carry the routes as they are when sent, like
+    # full ones with snapshots
+    for routing_updates, routing_snapshots in [('full', True), ('delta', False),
+                                               ('delta', True)]:
+        controller = Controller(case='cs143sim/cases/case2.txt', routing_updates=routing_updates,
+                                routing_snapshots=routing_snapshots)
+        controller.run(until=5000)
+        tables.append(dict((name, dict(router.table))
+                           for name, router in controller.routers.items()))
+    assert tables[0] == tables[1] == tables[2]
+
+
+def controller_packet_trains(directory):
+    case = os.path.join(directory, 'parking_lot.txt')
+    parking_lot().write(case)
+    runs = []
+    for packet_trains in [False, True]:
+        controller = Controller(case=case, static_routing='delay', kernel=KERNEL_NATIVE,
+                                packet_trains=packet_trains)
+        controller.run(until=5000)
+        records = {}
+        for metric in ['buffer_occupancy', 'flow_rate', 'link_rate', 'packet_delay',
+                       'packet_loss', 'window_size']:
+            for actor, actor_records in getattr(controller, metric).items():
+                records[metric, actor.name] = actor_records
+        runs.append((records, next(controller.env._sequence)))
+    # Each cross flow shares a congested link with the long flow, and trains
+    # must leave every metric exactly as it is packet by packet
+    (records, events), (train_records, train_events) = runs
+    assert records[('packet_loss', 'L1a')]
+    assert train_records == records
+    assert train_events < events
+
+
 def test_controller():
     controller_run_basic()
     controller_record_buffer_occupancy()
@@ -93,3 +135,9 @@ def test_controller():
     controller_record_packet_delay()
     controller_record_packet_loss()
     controller_record_window_size()
+    controller_delta_routing_updates()
+    directory = tempfile.mkdtemp()
+    try:
+        controller_packet_trains(directory)
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,54 @@
+from StringIO import StringIO
+
+from cs143sim.sweep import grid_points
+from cs143sim.sweep import run_point
+from cs143sim.sweep import sweep
+from cs143sim.sweep import write_table
+
+
+def sweep_grid_points():
+    points = grid_points({'buffer': [32, 64], 'algorithm': [0, 1]})
+    assert points == [{'algorithm': 0, 'buffer': 32}, {'algorithm': 0, 'buffer': 64},
+                      {'algorithm': 1, 'buffer': 32}, {'algorithm': 1, 'buffer': 64}]
+
+
+def sweep_unknown_parameter():
+    try:
+        grid_points({'colour': [1]})
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('unknown parameter was accepted')
+
+
+def sweep_run_point():
+    index, point, summary, error = run_point((3, 'cs143sim/cases/case0.txt',
+                                              {'buffer': 32, 'duration': 2}, 10, None))
+    assert (index, point, error) == (3, {'buffer': 32, 'duration': 2}, None)
+    assert summary['throughput'] > 0
+    assert summary['completed_flows'] == 0
+
+
+def sweep_isolated_failures():
+    results = sweep(case='cs143sim/cases/case0.txt',
+                    grid={'rate': ['fast', 10], 'duration': [1, 2]}, processes=2)
+    assert [point for point, _, _ in results] == [
+        {'duration': 1, 'rate': 'fast'}, {'duration': 1, 'rate': 10},
+        {'duration': 2, 'rate': 'fast'}, {'duration': 2, 'rate': 10}]
+    for point, summary, error in results:
+        if point['rate'] == 'fast':
+            assert summary is None and 'ValueError' in error
+        else:
+            assert summary is not None and error is None
+    table_file = StringIO()
+    write_table(results, table_file)
+    rows = table_file.getvalue().splitlines()
+    assert len(rows) == 5
+    assert rows[0].startswith('duration,rate,throughput,')
+
+
+def test_sweep():
+    sweep_grid_points()
+    sweep_unknown_parameter()
+    sweep_run_point()
+    sweep_isolated_failures()
@@ -0,0 +1,173 @@
+import os
+import shutil
+import tempfile
+
+from cs143sim.simulation import Controller
+from cs143sim.telemetry import Coalesce
+from cs143sim.telemetry import DiskSink
+from cs143sim.telemetry import EventSeries
+from cs143sim.telemetry import OnChange
+from cs143sim.telemetry import Probes
+from cs143sim.telemetry import RecordView
+from cs143sim.telemetry import SampleEvery
+from cs143sim.telemetry import Series
+from cs143sim.telemetry import TelemetryStore
+from cs143sim.telemetry import TimeAverage
+from cs143sim.telemetry import Total
+from cs143sim.telemetry import map_chunk
+from test_actors import basic_flow
+from test_actors import basic_link
+
+
+def series_records():
+    series = Series()
+    for time in range(5):
+        series.append(time, time * 2)
+    assert len(series) == 5
+    assert series.records() == [(time, time * 2) for time in range(5)]
+
+
+def event_series_records():
+    series = EventSeries()
+    series.append(1)
+    series.append(2)
+    assert series.records() == [(1, None), (2, None)]
+
+
+def record_view_hides_empty_series():
+    probes = Probes()
+    link = basic_link()
+    probes.register(link)
+    view = RecordView(probes)
+    assert link not in view
+    assert list(view.keys()) == []
+    probes[link].append(0, 1)
+    assert view[link] == [(0, 1)]
+    assert list(view.keys()) == [link]
+
+
+def record_view_assignment():
+    view = RecordView(Probes())
+    link = basic_link()
+    view[link] = [(0, 1), (1, 2)]
+    assert view[link] == [(0, 1), (1, 2)]
+
+
+def telemetry_store_registration():
+    store = TelemetryStore()
+    flow = basic_flow()
+    link = basic_link()
+    store.register_flow(flow)
+    store.register_link(link)
+    assert flow in store.window_size
+    assert link in store.buffer_occupancy
+    assert isinstance(store.packet_loss[link], EventSeries)
+
+
+def disk_sink_spills_chunks(directory):
+    sink = DiskSink(directory=directory, chunk_size=4, queue_size=1)
+    series = Series(metric='metric', name='actor', sink=sink)
+    events = EventSeries(metric='events', name='actor', sink=sink)
+    for time in range(10):
+        series.append(time, -time)
+        events.append(time)
+    assert len(series.times) == 2
+    assert series.spilled == [4, 4]
+    assert series.records() == [(time, -time) for time in range(10)]
+    assert events.records() == [(time, None) for time in range(10)]
+    chunk = map_chunk(sink.path('metric', 'actor', 1))
+    assert list(chunk[0]) == [4, 5, 6, 7]
+    assert list(chunk[1]) == [-4, -5, -6, -7]
+    sink.close()
+    assert os.path.isfile(os.path.join(directory, 'manifest.json'))
+
+
+def controller_run_directory(directory):
+    in_memory = Controller()
+    in_memory.run(until=2000)
+    on_disk = Controller(run_directory=directory)
+    on_disk.run(until=2000)
+    for link_name, link in in_memory.links.items():
+        on_disk_link = on_disk.links[link_name]
+        assert not on_disk.telemetry.link_rate[on_disk_link].times
+        assert in_memory.link_rate.get(link) == on_disk.link_rate.get(on_disk_link)
+    on_disk.telemetry.sink.close()
+
+
+def test_disk_sink():
+    directory = tempfile.mkdtemp()
+    try:
+        disk_sink_spills_chunks(os.path.join(directory, 'sink'))
+        controller_run_directory(os.path.join(directory, 'controller'))
+    finally:
+        shutil.rmtree(directory)
+
+
+def record_with_policy(policy, entries, end):
+    probe = policy.probe(Series())
+    for time, value in entries:
+        probe.append(time, value)
+    probe.finish(end)
+    return probe.series.records()
+
+
+def policy_coalesce():
+    entries = [(0, 1), (0, 2), (1, 3), (1, 4), (2, 5)]
+    assert record_with_policy(Coalesce(), entries, 3) == [(0, 2), (1, 4), (2, 5)]
+    assert record_with_policy(Coalesce(combine='sum'), entries, 3) == [(0, 3), (1, 7), (2, 5)]
+
+
+def policy_on_change():
+    entries = [(0, 1), (1, 1), (2, 2), (3, 2), (4, 1)]
+    assert record_with_policy(OnChange(), entries, 5) == [(0, 1), (2, 2), (4, 1)]
+
+
+def policy_sample_every():
+    entries = [(1, 1), (2, 2), (12, 3), (35, 4)]
+    assert record_with_policy(SampleEvery(interval=10), entries, 40) == [
+        (10, 2), (20, 3), (30, 3), (40, 4)]
+
+
+def policy_time_average():
+    entries = [(0, 2), (5, 4), (10, 0), (25, 1)]
+    assert record_with_policy(TimeAverage(interval=10), entries, 35) == [
+        (0, 3), (10, 0), (20, 0.5)]
+
+
+def policy_total():
+    entries = [(1, 1), (2, 2), (10, 3), (25, 1)]
+    assert record_with_policy(Total(interval=10), entries, 30) == [(0, 3), (10, 3), (20, 1)]
+
+
+def controller_recording_policies():
+    controller = Controller(recording_policies={'window_size': OnChange(),
+                                                'buffer_occupancy': TimeAverage(interval=100)})
+    controller.run(until=3000)
+    for records in controller.window_size.values():
+        values = [value for _, value in records]
+        assert all(a != b for a, b in zip(values, values[1:]))
+    for records in controller.buffer_occupancy.values():
+        assert [time for time, _ in records] == range(0, 3000, 100)
+
+
+def test_recording_policies():
+    policy_coalesce()
+    policy_on_change()
+    policy_sample_every()
+    policy_time_average()
+    policy_total()
+    controller_recording_policies()
+
+
+def test_series():
+    series_records()
+    event_series_records()
+
+
+def test_record_view():
+    record_view_hides_empty_series()
+    record_view_assignment()
+
+
+def test_telemetry_store():
+    telemetry_store_registration()
@@ -5,6 +5,85 @@ from cs143sim.tla import *
 from cs143sim.constants import *
 
 
+class TimeOutRecorder:
+    def __init__(self):
+        self.times = []
+
+    def react_to_time_out(self, event):
+        self.times.append(event.env.now)
+
+
+def retransmission_timer_reset():
+    env = Environment()
+    recorder = TimeOutRecorder()
+    timer = RetransmissionTimer(env=env, actor=recorder)
+    timer.reset(10)
+    env.run(until=5)
+    timer.reset(10)
+    env.run(until=20)
+    assert recorder.times == [15]
+    assert not timer.armed
+    assert len(env._queue) == 0
+
+
+def retransmission_timer_cancel():
+    env = Environment()
+    recorder = TimeOutRecorder()
+    timer = RetransmissionTimer(env=env, actor=recorder)
+    timer.reset(10)
+    for _ in range(100):
+        timer.reset(10)
+    assert len(env._queue) == 1
+    timer.cancel()
+    env.run(until=20)
+    assert recorder.times == []
+
+
+def retransmission_timer_earlier_deadline():
+    env = Environment()
+    recorder = TimeOutRecorder()
+    timer = RetransmissionTimer(env=env, actor=recorder)
+    timer.reset(10)
+    timer.reset(3)
+    env.run(until=20)
+    assert recorder.times == [3]
+
+
+def send_window():
+    window = SendWindow()
+    assert not window
+    for number in range(5, 10):
+        window.append(number)
+    assert (len(window), window[0], window[-1], list(window)) == (5, 5, 9, [5, 6, 7, 8, 9])
+    assert window.retire(5) == 0
+    assert window.retire(7) == 2
+    assert list(window) == [7, 8, 9]
+    window.truncate(2)
+    assert list(window) == [7, 8]
+    window.append(9)
+    try:
+        window.append(11)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('a gap in the window was accepted')
+    assert window.retire(20) == 3
+    assert not window
+    window.append(3)
+    window.clear()
+    assert list(window) == []
+
+
+def test_send_window():
+    send_window()
+
+
+def test_retransmission_timer():
+    retransmission_timer_reset()
+    retransmission_timer_cancel()
+    retransmission_timer_earlier_deadline()
+
+
 # def test_tla_tcp_tahoe():
 #     env=Environment()
 #     